@@ -2,7 +2,18 @@
 Storing i10 default value for various devices.
 """
 
+import os
+from pathlib import Path
+
 RASOR_DEFAULT_DET_NAME_EXTENSION = "-current"
 S5S6_OPENING_SIZE = 10
 DSD_DSU_OPENING_POS = 3
 PIN_HOLE_OPEING_POS = 69
+
+
+def look_up_table_dir() -> Path:
+    """Directory of the refined look up tables, SM_BLUESKY_LOOK_UP_TABLE_DIR or
+    ~/.sm_bluesky, read on every call so it can be changed in a session."""
+    return Path(
+        os.environ.get("SM_BLUESKY_LOOK_UP_TABLE_DIR", Path.home() / ".sm_bluesky")
+    )
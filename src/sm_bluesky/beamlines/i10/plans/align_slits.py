@@ -1,6 +1,10 @@
+import threading
 from collections.abc import Hashable
+from math import ceil
+from pathlib import Path
 
-from bluesky.plan_stubs import abs_set, mv, wait
+import bluesky.plan_stubs as bps
+from bluesky.plan_stubs import abs_set
 from dodal.beamlines.i10 import DetSlits, I10Slits
 from dodal.common import inject
 from dodal.common.types import MsgGenerator
@@ -9,36 +13,74 @@ from dodal.devices.motors import XYZStage
 from dodal.devices.slits import Slits
 from ophyd_async.core import StandardReadable
 
+from sm_bluesky.beamlines.i10.configuration.default_setting import look_up_table_dir
 from sm_bluesky.common.math_functions import cal_range_num
-from sm_bluesky.common.plan_stubs import move_motor_with_look_up
+from sm_bluesky.common.plan_stubs import (
+    Interpolation,
+    LookUpTableStore,
+    move_motor_with_look_up,
+)
 from sm_bluesky.common.plans import (
     StatPosition,
     align_slit_with_look_up,
+    fast_raster_and_move_fit,
     step_scan_and_move_fit,
 )
 from sm_bluesky.log import LOGGER
 
-"""I10 has fix/solid slit on a motor, this store the rough motor opening
- position against slit size in um"""
+# I10 has fix/solid slit on a motor, this store the rough motor opening
+# position against slit size in um.
 
 DSD = {"5000": 14.3, "1000": 19.3, "500": 26.5, "100": 29.3, "50": 34.3}
 DSU = {"5000": 16.7, "1000": 21.7, "500": 25.674, "100": 31.7, "50": 36.7}
 
+# Refined detector slit positions are kept between sessions, the tables above
+# are the starting values. One store per file, opened when a plan first uses it.
+# Sizes between entries are interpolated linearly, the positions fall
+# monotonically with size so a spline could only overshoot. The lock stops two
+# threads opening the same file twice.
+_STORES: dict[Path, LookUpTableStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def dsd_store() -> LookUpTableStore:
+    """The refined down stream detector slit table in the current
+    look_up_table_dir."""
+    return _detector_slit_store("i10_dsd.json", DSD)
+
+
+def dsu_store() -> LookUpTableStore:
+    """The refined up stream detector slit table in the current
+    look_up_table_dir."""
+    return _detector_slit_store("i10_dsu.json", DSU)
+
+
+def _detector_slit_store(
+    file_name: str, defaults: dict[str, float]
+) -> LookUpTableStore:
+    path = look_up_table_dir() / file_name
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = LookUpTableStore(
+                path, defaults, interpolation=Interpolation.LINEAR
+            )
+        return _STORES[path]
+
 
 def move_dsu(
     size: float,
-    slit_table: dict[str, float] = DSU,
+    slit_table: dict[str, float] | LookUpTableStore | None = None,
     use_motor_position: bool = False,
     wait: bool = True,
     group: Hashable | None = None,
     det_slits: DetSlits = inject("det_slits"),
 ) -> MsgGenerator:
     """Move up stream detector slit either by it size in slit motor table or by motor
-    position."""
+    position, the refined table dsu_store by default."""
     yield from move_motor_with_look_up(
         slit=det_slits.upstream,
         size=size,
-        motor_table=slit_table,
+        motor_table=dsu_store() if slit_table is None else slit_table,
         use_motor_position=use_motor_position,
         wait=wait,
         group=group,
@@ -47,18 +89,18 @@ def move_dsu(
 
 def move_dsd(
     size: float,
-    slit_table: dict[str, float] = DSD,
+    slit_table: dict[str, float] | LookUpTableStore | None = None,
     use_motor_position: bool = False,
     wait: bool = True,
     group: Hashable | None = None,
     det_slits: DetSlits = inject("det_slits"),
 ) -> MsgGenerator:
     """Move down stream detector slit either by it size in slit motor table or by motor
-    position."""
+    position, the refined table dsd_store by default."""
     yield from move_motor_with_look_up(
         slit=det_slits.downstream,
         size=size,
-        motor_table=slit_table,
+        motor_table=dsd_store() if slit_table is None else slit_table,
         use_motor_position=use_motor_position,
         wait=wait,
         group=group,
@@ -69,14 +111,17 @@ def align_dsu(
     size: float,
     det: StandardReadable = inject("rasor_femto_pa_scaler_det"),
     det_slits: DetSlits = inject("det_slits"),
+    group: Hashable | None = None,
 ) -> MsgGenerator:
-    """Align the up stream detector slit"""
+    """Align the up stream detector slit, moves already started in group finish
+    before the scan."""
     yield from align_slit_with_look_up(
         motor=det_slits.upstream,
         size=size,
-        slit_table=DSU,
+        slit_table=dsu_store(),
         det=det,
         centre_type=StatPosition.COM,
+        group=group,
     )
 
 
@@ -84,14 +129,17 @@ def align_dsd(
     size: float,
     det: StandardReadable = inject("rasor_femto_pa_scaler_det"),
     det_slits: DetSlits = inject("det_slits"),
+    group: Hashable | None = None,
 ) -> MsgGenerator:
-    """Align the down stream detector slit"""
+    """Align the down stream detector slit, moves already started in group finish
+    before the scan."""
     yield from align_slit_with_look_up(
         motor=det_slits.downstream,
         size=size,
-        slit_table=DSD,
+        slit_table=dsd_store(),
         det=det,
         centre_type=StatPosition.COM,
+        group=group,
     )
 
 
@@ -101,9 +149,14 @@ def align_pa_slit(
     det: StandardReadable = inject("rasor_femto_pa_scaler_det"),
     det_slits: DetSlits = inject("det_slits"),
 ) -> MsgGenerator:
-    """Align both detector slits"""
-    yield from move_dsd(5000, wait=True, det_slits=det_slits)
-    yield from align_dsu(dsu_size, det, det_slits)
+    """Align both detector slits.
+
+    dsd is opened while dsu moves to the start of its scan, only the dsu scan
+    waits for both. The dsu scan and move to its centre block the dsd scan.
+    """
+    group_wait = "pa slits group"
+    yield from move_dsd(5000, wait=False, group=group_wait, det_slits=det_slits)
+    yield from align_dsu(dsu_size, det, det_slits, group=group_wait)
     yield from align_dsd(dsd_size, det, det_slits)
 
 
@@ -112,6 +165,7 @@ def align_s5s6(
     slits: I10Slits = inject("slits"),
     diffractometer: Diffractometer = inject("diffractometer"),
     sample_stage: XYZStage = inject("sample_stage"),
+    raster: bool = False,
 ) -> MsgGenerator:
     """
     Plan to align the s5s6 slits with the straight through beam
@@ -128,8 +182,29 @@ def align_s5s6(
         Diffractometer to move out of beam.
     sample_stage (optional): XYZStage:
         sample stage to move out of beam.
+    raster (optional): bool
+        Align both centres of each slit with one fast raster, see align_slit.
+
+    Moves are started as early as possible in one bluesky group and each scan
+    only waits for the moves that block it:
+
+    =====================================  ==============================
+    Moves                                  Block
+    =====================================  ==============================
+    tth, th, sample y, s5 gaps, s5 y_cen   s5 x scan (or s5 raster)
+    s5 gaps                                s5 y scan
+    s5 final gaps, s6 gaps, s6 y_cen       s6 x scan (or s6 raster)
+    s6 gaps                                s6 y scan
+    s6 final gaps                          end of the plan
+    =====================================  ==============================
+
+    s5 shapes the beam seen by s6, so its final gaps must be set before s6
+    is scanned, but they move together with the s6 set up.
     """
-    yield from move_to_direct_beam_position(diffractometer, sample_stage)
+    group_wait = "s5s6 group"
+    yield from move_to_direct_beam_position(
+        diffractometer, sample_stage, wait=False, group=group_wait
+    )
 
     yield from align_slit(
         det=det,
@@ -144,6 +219,9 @@ def align_s5s6(
         y_open_size=4,
         y_range=2,
         y_cen=0,
+        raster=raster,
+        wait=False,
+        group=group_wait,
     )
     LOGGER.info("Aligning s6")
     yield from align_slit(
@@ -159,6 +237,8 @@ def align_s5s6(
         y_open_size=4,
         y_range=2,
         y_cen=0,
+        raster=raster,
+        group=group_wait,
     )
 
 
@@ -176,6 +256,11 @@ def align_slit(
     y_range: float,
     y_cen: float,
     centre_type: StatPosition = StatPosition.COM,
+    stop_fraction: float | None = None,
+    raster: bool = False,
+    motor_speed: float | None = None,
+    wait: bool = True,
+    group: Hashable | None = None,
 ) -> MsgGenerator:
     """
     Plan to align a pair of standard x-y slits,
@@ -211,13 +296,88 @@ def align_slit(
     centre_type: StatPosition = StatPosition.COM
         Where to move the slits, it goes to centre of mass by default.
         see StatPosition for other options.
+    stop_fraction: float | None = None
+        If given, each slit scan stops once the peak is found,
+        see step_scan_and_move_fit.
+    raster: bool = False
+        If True, find both centres with one fast raster of x_centre lines
+        stepped in y_centre, with both gaps at their scan size. The gap moves
+        overlap the move to the start of the first line and there is no
+        dependency on which axis is aligned first. centre_type must be COM
+        for the centroid or GAUSS_CEN for a 2D Gaussian fit, see
+        fast_raster_and_move_fit. x_open_size and y_open_size are not used.
+    motor_speed: float | None = None
+        Speed of x_centre along the raster lines, the current speed if None.
+    wait: bool = True
+        If False, the final gap moves are left running in the group, e.g. to
+        overlap them with the set up of the next slit.
+    group: Hashable | None = None
+        Bluesky group for all slit moves, moves already started in it, e.g.
+        moving other devices out of the beam, finish before the first scan.
     """
-    group_wait = "slits group"
+    group_wait = "slits group" if group is None else group
+    if raster:
+        x_start, x_end, _ = cal_range_num(x_cen, x_range, x_scan_size)
+        y_start, y_end, _ = cal_range_num(y_cen, y_range, y_scan_size)
+        yield from fast_raster_and_move_fit(
+            det=det,
+            step_motor=slit.y_centre,
+            scan_motor=slit.x_centre,
+            fitted_loc=centre_type,
+            detname_suffix="value",
+            step_start=y_start,
+            step_end=y_end,
+            num_step=ceil(abs(y_end - y_start) / y_scan_size) + 1,
+            scan_start=x_start,
+            scan_end=x_end,
+            motor_speed=motor_speed,
+            setup_moves={slit.x_gap: x_scan_size, slit.y_gap: y_scan_size},
+            group=group_wait,
+        )
+    else:
+        yield from _step_align_slit(
+            det,
+            slit,
+            x_scan_size,
+            x_open_size,
+            y_scan_size,
+            y_open_size,
+            x_range,
+            x_cen,
+            y_range,
+            y_cen,
+            centre_type,
+            stop_fraction,
+            group_wait,
+        )
+    yield from abs_set(slit.x_gap, x_final_size, group=group_wait)
+    yield from abs_set(slit.y_gap, y_final_size, group=group_wait)
+    if wait:
+        yield from bps.wait(group=group_wait)
+
+
+def _step_align_slit(
+    det: StandardReadable,
+    slit: Slits,
+    x_scan_size: float,
+    x_open_size: float,
+    y_scan_size: float,
+    y_open_size: float,
+    x_range: float,
+    x_cen: float,
+    y_range: float,
+    y_cen: float,
+    centre_type: StatPosition,
+    stop_fraction: float | None,
+    group_wait: Hashable,
+) -> MsgGenerator:
+    """Step scan x_centre then y_centre, each with only its own gap at the
+    scan size, see align_slit."""
     yield from abs_set(slit.x_gap, x_scan_size, group=group_wait)
     yield from abs_set(slit.y_gap, y_open_size, group=group_wait)
+    yield from abs_set(slit.y_centre, y_cen, group=group_wait)
     LOGGER.info(f"Moving to starting position for {slit.x_centre.name} alignment.")
-    yield from wait(group=group_wait)
-    yield from mv(slit.y_centre, y_cen, group=group_wait)  # type: ignore
+    yield from bps.wait(group=group_wait)
     start_pos, end_pos, num = cal_range_num(x_cen, x_range, x_scan_size)
     yield from step_scan_and_move_fit(
         det=det,
@@ -227,12 +387,13 @@ def align_slit(
         end=end_pos,
         fitted_loc=centre_type,
         num=num,
+        stop_fraction=stop_fraction,
     )
 
     yield from abs_set(slit.y_gap, y_scan_size, group=group_wait)
     yield from abs_set(slit.x_gap, x_open_size, group=group_wait)
     LOGGER.info(f"Moving to starting position for {slit.y_centre.name} alignment.")
-    yield from wait(group=group_wait)
+    yield from bps.wait(group=group_wait)
     start_pos, end_pos, num = cal_range_num(y_cen, y_range, y_scan_size)
     yield from step_scan_and_move_fit(
         det=det,
@@ -242,19 +403,21 @@ def align_slit(
         end=end_pos,
         fitted_loc=centre_type,
         num=num,
+        stop_fraction=stop_fraction,
     )
-    yield from abs_set(slit.x_gap, x_final_size, group=group_wait)
-    yield from abs_set(slit.y_gap, y_final_size, group=group_wait)
-    yield from wait(group=group_wait)
 
 
 def move_to_direct_beam_position(
     diffractometer: Diffractometer = inject("diffractometer"),
     sample_stage: XYZStage = inject("sample_stage"),
+    wait: bool = True,
+    group: Hashable | None = None,
 ) -> MsgGenerator:
-    """Remove everything in the way of the beam"""
-    group_wait = "diff group A"
+    """Remove everything in the way of the beam, if wait is False the moves
+    are left running in group."""
+    group_wait = "diff group A" if group is None else group
     yield from abs_set(diffractometer.tth, 0, group=group_wait)
     yield from abs_set(diffractometer.th, 0, group=group_wait)
     yield from abs_set(sample_stage.y, -3, group=group_wait)
-    yield from wait(group=group_wait)
+    if wait:
+        yield from bps.wait(group=group_wait)
@@ -20,8 +20,10 @@ def centre_tth(
     end: float = 1,
     num: int = 21,
     diffractometer: Diffractometer = inject("diffractometer"),
+    stop_fraction: float | None = None,
 ) -> MsgGenerator:
-    """Centre two theta using Rasor dector."""
+    """Centre two theta using Rasor dector, stop_fraction stops the scan once
+    the peak is found, see step_scan_and_move_fit."""
 
     yield from step_scan_and_move_fit(
         det=det,
@@ -31,6 +33,7 @@ def centre_tth(
         num=num,
         detname_suffix=det_name,
         fitted_loc=StatPosition.CEN,
+        stop_fraction=stop_fraction,
     )
 
 
@@ -41,8 +44,10 @@ def centre_alpha(
     end: float = 0.8,
     num: int = 21,
     diffractometer: Diffractometer = inject("diffractometer"),
+    stop_fraction: float | None = None,
 ) -> MsgGenerator:
-    """Centre rasor alpha using Rasor dector."""
+    """Centre rasor alpha using Rasor dector, stop_fraction stops the scan once
+    the peak is found, see step_scan_and_move_fit."""
     yield from step_scan_and_move_fit(
         det=det,
         motor=diffractometer.alpha,
@@ -51,6 +56,7 @@ def centre_alpha(
         num=num,
         detname_suffix=det_name,
         fitted_loc=StatPosition.CEN,
+        stop_fraction=stop_fraction,
     )
 
 
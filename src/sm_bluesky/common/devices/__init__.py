@@ -0,0 +1,15 @@
+from .instrument_server_client import (
+    InstrumentServerClient,
+    InstrumentServerConnection,
+    InstrumentServerSignalBackend,
+    PulseGeneratorClient,
+    server_signal_rw,
+)
+
+__all__ = [
+    "InstrumentServerClient",
+    "InstrumentServerConnection",
+    "InstrumentServerSignalBackend",
+    "PulseGeneratorClient",
+    "server_signal_rw",
+]
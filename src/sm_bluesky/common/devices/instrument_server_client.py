@@ -0,0 +1,358 @@
+import asyncio
+import re
+from collections.abc import Callable
+from itertools import count
+from typing import ClassVar, cast
+
+from bluesky.protocols import Reading
+from event_model import DataKey
+from ophyd_async.core import (
+    DEFAULT_TIMEOUT,
+    Callback,
+    Device,
+    DeviceMock,
+    SignalBackend,
+    SignalDatatypeT,
+    SignalRW,
+    SoftSignalBackend,
+)
+
+from sm_bluesky.log import LOGGER
+
+REQUEST_TIMEOUT = 5.0
+RECONNECT_DELAY = 0.5
+_NUMBER = re.compile(rb"[-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?")
+
+Argument = bytes | str | int | float
+
+
+class InstrumentServerConnection:
+    """
+    Persistent connection to an AbstractInstrumentServer, shared by every
+    client of the same host and port, see shared.
+
+    Requests carry a request ID, so any number of them can be on the wire at
+    once and each reply is matched to its request whatever the order. When
+    the connection drops, the requests in flight fail and the next request
+    connects again, a request that failed on a dropped connection is sent
+    again up to retries times.
+    """
+
+    _pool: ClassVar[dict[tuple[str, int], "InstrumentServerConnection"]] = {}
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout: float = REQUEST_TIMEOUT,
+        retries: int = 1,
+        reconnect_delay: float = RECONNECT_DELAY,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnect_delay = reconnect_delay
+        self._ids = count(1)
+        self._pending: dict[bytes, asyncio.Future[bytes]] = {}
+        self._reader_task: asyncio.Task | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._connect_lock: asyncio.Lock | None = None
+
+    @classmethod
+    def shared(cls, host: str, port: int) -> "InstrumentServerConnection":
+        """The pooled connection to host and port, created on first use."""
+        key = (host, port)
+        if key not in cls._pool:
+            cls._pool[key] = cls(host, port)
+        return cls._pool[key]
+
+    @property
+    def connected(self) -> bool:
+        return (
+            self._writer is not None
+            and not self._writer.is_closing()
+            and self._loop is _running_loop()
+        )
+
+    async def connect(self, timeout: float | None = None) -> None:
+        """Open the connection unless it is already open in this event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams and futures belong to one event loop, start afresh.
+            self._drop(ConnectionError("Connection moved to another event loop"))
+            self._loop = loop
+            self._connect_lock = asyncio.Lock()
+        assert self._connect_lock is not None
+        async with self._connect_lock:
+            if self.connected:
+                return
+            reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                timeout or self.timeout,
+            )
+            self._reader_task = loop.create_task(self._read_replies(reader))
+            LOGGER.info(f"Connected to instrument server {self.host}:{self.port}")
+
+    async def close(self) -> None:
+        """Close the connection, requests in flight fail."""
+        writer = self._writer if self._loop is _running_loop() else None
+        self._drop(ConnectionError("Connection closed"))
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def request(self, cmd: bytes | str, *args: Argument) -> bytes:
+        """
+        Send one command and return the payload of its reply.
+
+        Raises
+        ------
+        RuntimeError
+            If the server answered with an error.
+        TimeoutError
+            If there is no reply within timeout, the request is not sent
+            again.
+        ConnectionError
+            If the connection dropped more than retries times.
+        """
+        fields = [_to_field(cmd), *(_to_field(arg) for arg in args)]
+        attempt = 0
+        while True:
+            try:
+                await self.connect()
+                success, payload = await self._send(fields)
+                break
+            except TimeoutError as e:
+                # The command may have reached the server, never send it twice.
+                raise TimeoutError(
+                    f"No reply from instrument server {self.host}:{self.port}"
+                    f" within {self.timeout}s"
+                ) from e
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                if attempt >= self.retries:
+                    raise ConnectionError(
+                        f"Instrument server {self.host}:{self.port}: {e}"
+                    ) from e
+                attempt += 1
+                LOGGER.warning(f"Reconnecting to {self.host}:{self.port} after: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+        if not success:
+            raise RuntimeError(payload.decode(errors="replace"))
+        return payload
+
+    async def _send(self, fields: list[bytes]) -> tuple[bool, bytes]:
+        assert self._writer is not None and self._loop is not None
+        request_id = b"%d" % next(self._ids)
+        reply = self._loop.create_future()
+        self._pending[request_id] = reply
+        try:
+            self._writer.write(b"\t".join([b"#" + request_id, *fields]) + b"\n")
+            await self._writer.drain()
+            line = await asyncio.wait_for(reply, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        status, _, payload = line.partition(b"\t")
+        return status == b"1", payload
+
+    async def _read_replies(self, reader: asyncio.StreamReader) -> None:
+        """Hand each reply line to the request with the same ID."""
+        error: Exception = ConnectionError("Connection closed by server")
+        try:
+            while line := await reader.readline():
+                request_id, _, rest = line.rstrip(b"\r\n").partition(b"\t")
+                reply = self._pending.pop(request_id.removeprefix(b"#"), None)
+                if reply is None or reply.done():
+                    LOGGER.debug(f"Dropped reply without a request: {line!r}")
+                else:
+                    reply.set_result(rest)
+        except (OSError, ValueError) as e:
+            error = ConnectionError(str(e))
+        if self._reader_task is asyncio.current_task():
+            self._drop(error)
+
+    def _drop(self, error: Exception) -> None:
+        """Forget the current streams and fail the requests in flight. Those
+        of another event loop are only forgotten, they cannot be touched from
+        this one."""
+        if self._loop is _running_loop():
+            if self._writer is not None:
+                self._writer.close()
+            if self._reader_task not in (None, asyncio.current_task()):
+                self._reader_task.cancel()
+            for reply in self._pending.values():
+                if not reply.done():
+                    reply.set_exception(error)
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}
+
+
+class InstrumentServerSignalBackend(SignalBackend[SignalDatatypeT]):
+    """
+    Signal backend that writes with one server command and reads with
+    another, e.g. set_delay and get_delay.
+
+    Reads ask the server every time, parse turns the reply payload into the
+    value, by default the last number in it. Without get_cmd the last value
+    written is read back. The value is kept in a SoftSignalBackend, which is
+    not subclassed so that a mocked signal never reaches the server.
+    """
+
+    def __init__(
+        self,
+        datatype: type[SignalDatatypeT],
+        connection: InstrumentServerConnection,
+        set_cmd: bytes | None = None,
+        get_cmd: bytes | None = None,
+        parse: Callable[[bytes], SignalDatatypeT] | None = None,
+        units: str | None = None,
+    ) -> None:
+        self.connection = connection
+        self.set_cmd = set_cmd
+        self.get_cmd = get_cmd
+        self.parse = parse or cast(
+            Callable[[bytes], SignalDatatypeT], _last_number(datatype)
+        )
+        self._setpoint: SignalDatatypeT | None = None
+        self._soft = SoftSignalBackend(datatype, units=units)
+        super().__init__(datatype)
+
+    def source(self, name: str, read: bool) -> str:
+        cmd = self.get_cmd if read else self.set_cmd
+        return (
+            f"tcp://{self.connection.host}:{self.connection.port}/"
+            f"{(cmd or b'').decode()}"
+        )
+
+    async def connect(self, timeout: float) -> None:
+        await self.connection.connect(timeout)
+        if self.get_cmd is not None:
+            await self.get_reading()
+
+    async def put(self, value: SignalDatatypeT | None) -> None:
+        if self.set_cmd is None:
+            raise PermissionError(f"{self.source('', False)} is read only")
+        write_value = self._soft.initial_value if value is None else value
+        await self.connection.request(self.set_cmd, _to_field(write_value))
+        self._setpoint = write_value
+        if self.get_cmd is None:
+            self._soft.set_value(write_value)
+        else:
+            await self.get_reading()
+
+    async def get_datakey(self, source: str) -> DataKey:
+        await self.get_reading()
+        return await self._soft.get_datakey(source)
+
+    async def get_reading(self) -> Reading[SignalDatatypeT]:
+        if self.get_cmd is not None:
+            reply = await self.connection.request(self.get_cmd)
+            self._soft.set_value(self.parse(reply))
+        return await self._soft.get_reading()
+
+    async def get_value(self) -> SignalDatatypeT:
+        return (await self.get_reading())["value"]
+
+    async def get_setpoint(self) -> SignalDatatypeT:
+        if self._setpoint is None:
+            return await self.get_value()
+        return self._setpoint
+
+    def set_callback(self, callback: Callback[Reading[SignalDatatypeT]] | None) -> None:
+        self._soft.set_callback(callback)
+
+
+def server_signal_rw(
+    datatype: type[SignalDatatypeT],
+    connection: InstrumentServerConnection,
+    set_cmd: bytes,
+    get_cmd: bytes | None = None,
+    parse: Callable[[bytes], SignalDatatypeT] | None = None,
+    units: str | None = None,
+    name: str = "",
+) -> SignalRW[SignalDatatypeT]:
+    """A signal that is written with set_cmd and read with get_cmd."""
+    backend = InstrumentServerSignalBackend(
+        datatype, connection, set_cmd, get_cmd, parse, units
+    )
+    return SignalRW(backend, name=name)
+
+
+class InstrumentServerClient(Device):
+    """Base Device for AbstractInstrumentServer clients, the signals of one
+    device share the pooled connection to its server."""
+
+    def __init__(self, connection: InstrumentServerConnection, name: str = "") -> None:
+        self.connection = connection
+        super().__init__(name=name)
+
+    async def connect(
+        self,
+        mock: bool | DeviceMock = False,
+        timeout: float = DEFAULT_TIMEOUT,
+        force_reconnect: bool = False,
+    ) -> None:
+        """Connect to the server, in mock mode only the signals are mocked and
+        no server is needed."""
+        if not mock:
+            await self.connection.connect(timeout)
+        await super().connect(
+            mock=mock, timeout=timeout, force_reconnect=force_reconnect
+        )
+
+    async def request(self, cmd: bytes | str, *args: Argument) -> bytes:
+        """Send any server command, see InstrumentServerConnection.request."""
+        return await self.connection.request(cmd, *args)
+
+
+class PulseGeneratorClient(InstrumentServerClient):
+    """Client of GeneratorServerShanghaiTech, delay is in the pulse
+    generator's delay steps."""
+
+    def __init__(self, host: str, port: int, name: str = "") -> None:
+        connection = InstrumentServerConnection.shared(host, port)
+        self.delay = server_signal_rw(int, connection, b"set_delay", b"get_delay")
+        super().__init__(connection, name=name)
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _to_field(value: object) -> bytes:
+    """
+    The request field of a command or argument.
+
+    Raises
+    ------
+    ValueError
+        If it contains a tab or newline, which would split the request.
+    """
+    if isinstance(value, bytes):
+        field = value
+    elif isinstance(value, float):
+        field = repr(value).encode()
+    else:
+        field = str(value).encode()
+    if b"\t" in field or b"\n" in field:
+        raise ValueError(f"Request field {field!r} contains a tab or newline")
+    return field
+
+
+def _last_number(datatype: type) -> Callable[[bytes], object]:
+    """Parser for replies like b"DLSET=500", the last number in them."""
+
+    def parse(payload: bytes) -> object:
+        numbers = _NUMBER.findall(payload)
+        if not numbers:
+            raise ValueError(f"No number in reply {payload!r}")
+        return datatype(float(numbers[-1]))
+
+    return parse
@@ -1,3 +1,13 @@
 from .add_meta import add_default_metadata, add_extra_names_to_meta
+from .plan_duration import PlanDuration, estimate_duration
+from .stream_alignment import StreamAligner
+from .streaming_peak import StreamingPeakStats
 
-__all__ = ["add_default_metadata", "add_extra_names_to_meta"]
+__all__ = [
+    "add_default_metadata",
+    "add_extra_names_to_meta",
+    "estimate_duration",
+    "PlanDuration",
+    "StreamAligner",
+    "StreamingPeakStats",
+]
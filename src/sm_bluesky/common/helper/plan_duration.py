@@ -0,0 +1,417 @@
+import asyncio
+from collections import defaultdict
+from math import floor, sqrt
+from typing import Any, TypedDict
+
+from bluesky import Msg
+from bluesky.utils import MsgGenerator, maybe_await
+from ophyd_async.core import (
+    Device,
+    FlyMotorInfo,
+    SignalR,
+    SignalW,
+    StandardDetector,
+    StandardReadable,
+    TriggerInfo,
+)
+from ophyd_async.epics.pmac import PmacScanInfo
+from scanspec.core import Path, Slice
+
+from sm_bluesky.common.math_functions import FitFailedError
+from sm_bluesky.common.plan_stubs import PLAN_CLOCK, SESSION_CACHE, DeviceStateCache
+from sm_bluesky.log import LOGGER
+
+DURATION_BUCKETS = ("moves", "settling", "acquisition", "readout")
+BUCKET_PRIORITY = ("acquisition", "moves", "readout", "settling")
+EVENT_OVERHEAD = 0.001
+MAX_MESSAGES = 1_000_000
+# Awaitables that only query a device, the simulator runs these for real.
+QUERY_AWAITABLES = ("get_trigger_deadtime",)
+
+
+class PlanDuration(TypedDict):
+    """Predicted plan time in seconds, broken down by what the time is spent on."""
+
+    total: float
+    moves: float
+    settling: float
+    acquisition: float
+    readout: float
+    finished: bool
+
+
+class _SimStatus:
+    """Status for a simulated action, done once the simulated clock passes
+    the end of its last segment."""
+
+    def __init__(
+        self, timer: "_PlanTimer", segments: list[tuple[str, float, float]]
+    ) -> None:
+        self._timer = timer
+        self.segments = segments
+        self.finish = max((end for _, _, end in segments), default=timer.clock)
+
+    @property
+    def done(self) -> bool:
+        return self._timer.clock >= self.finish
+
+    @property
+    def success(self) -> bool:
+        return self.done
+
+    def add_callback(self, callback) -> None:
+        callback(self)
+
+    def exception(self, timeout: float | None = 0.0) -> None:
+        return None
+
+
+class _PlanTimer:
+    """Walk a plan, answering reads from the devices and simulating every
+    motion and acquisition on a clock instead of running it."""
+
+    def __init__(self, event_overhead: float) -> None:
+        self.clock = 0.0
+        self.durations: dict[str, float] = dict.fromkeys(DURATION_BUCKETS, 0.0)
+        self._event_overhead = event_overhead
+        self._values: dict[str, Any] = {}
+        self._groups: dict[Any, list[_SimStatus]] = defaultdict(list)
+        self._segments: list[tuple[str, float, float]] = []
+        self._fly_info: dict[str, Any] = {}
+        self._kickoff_time: dict[str, float] = {}
+        self._completing: list[_SimStatus] = []
+        self._last_save: float | None = None
+        self._paced = False
+
+    async def get(self, signal: SignalR) -> Any:
+        """Read a signal once, later reads come from the simulated state."""
+        if signal.name not in self._values:
+            self._values[signal.name] = await signal.get_value()
+        return self._values[signal.name]
+
+    async def cache_kinematics(self, device: Device) -> None:
+        if _is_motor(device):
+            for signal in (
+                device.user_readback,  # type: ignore
+                device.velocity,  # type: ignore
+                device.acceleration_time,  # type: ignore
+                device.max_velocity,  # type: ignore
+            ):
+                await self.get(signal)
+
+    async def handle(self, msg: Msg) -> Any:
+        handler = getattr(self, f"_{msg.command}", None)
+        if handler is None:
+            return None
+        return await handler(msg)
+
+    def _status(self, msg: Msg, segments: list[tuple[str, float, float]]):
+        status = _SimStatus(self, segments)
+        self._segments.extend(segments)
+        group = msg.kwargs.get("group")
+        if group is not None:
+            self._groups[group].append(status)
+        return status
+
+    def _advance(
+        self, finish: float, segments: list[tuple[str, float, float]] | None = None
+    ) -> None:
+        """Move the clock on. Where several actions overlap the time goes to
+        the first bucket in BUCKET_PRIORITY order, acquisition before moves
+        etc., so reading while flying counts as acquisition."""
+        self._segments.extend(segments or [])
+        if finish <= self.clock:
+            return
+        self._segments = [seg for seg in self._segments if seg[2] > self.clock]
+        edges = sorted(
+            {self.clock, finish}
+            | {
+                edge
+                for _, start, end in self._segments
+                for edge in (start, end)
+                if self.clock < edge < finish
+            }
+        )
+        for low, high in zip(edges[:-1], edges[1:], strict=False):
+            active = {b for b, start, end in self._segments if start <= low < end}
+            bucket = next(
+                (b for b in BUCKET_PRIORITY if b in active), BUCKET_PRIORITY[1]
+            )
+            self.durations[bucket] += high - low
+        self.clock = finish
+
+    async def _move_time(self, motor: Device, distance: float) -> float:
+        velocity = abs(await self.get(motor.velocity))  # type: ignore
+        acceleration_time = await self.get(motor.acceleration_time)  # type: ignore
+        if distance == 0:
+            return 0.0
+        if velocity <= 0:
+            raise ValueError(f"{motor.name} velocity is {velocity}, cannot move.")
+        if distance >= velocity * acceleration_time:
+            return distance / velocity + acceleration_time
+        # Never reaches full speed, triangular profile.
+        return 2 * sqrt(distance * acceleration_time / velocity)
+
+    async def _set(self, msg: Msg) -> _SimStatus:
+        obj, value = msg.obj, msg.args[0]
+        if _is_motor(obj):
+            readback = obj.user_readback  # type: ignore
+            start = await self.get(readback)
+            move_time = await self._move_time(obj, abs(value - start))  # type: ignore
+            self._values[readback.name] = value
+            self._values[obj.user_setpoint.name] = value  # type: ignore
+            return self._status(msg, [("moves", self.clock, self.clock + move_time)])
+        if isinstance(obj, SignalW):
+            self._values[obj.name] = value
+        return self._status(msg, [])
+
+    async def _prepare(self, msg: Msg) -> _SimStatus:
+        obj, value = msg.obj, msg.args[0]
+        if not isinstance(obj, Device):
+            # Plain holders, e.g. an analyser sequence, set no hardware and the
+            # plan reads back what they hold.
+            await obj.prepare(value)
+            return self._status(msg, [])
+        self._fly_info[obj.name] = value
+        segments = []
+        if _is_motor(obj) and isinstance(value, FlyMotorInfo):
+            readback = obj.user_readback  # type: ignore
+            acceleration_time = await self.get(obj.acceleration_time)  # type: ignore
+            run_up = value.ramp_up_start_pos(acceleration_time)
+            start = await self.get(readback)
+            move_time = await self._move_time(obj, abs(run_up - start))
+            segments = [("moves", self.clock, self.clock + move_time)]
+            self._values[readback.name] = run_up
+            self._values[obj.velocity.name] = abs(value.velocity)  # type: ignore
+        elif isinstance(value, PmacScanInfo):
+            self._fly_info[obj.name] = Path(value.spec.calculate()).consume()
+        return self._status(msg, segments)
+
+    async def _kickoff(self, msg: Msg) -> _SimStatus:
+        self._kickoff_time[msg.obj.name] = self.clock
+        return self._status(msg, [])
+
+    async def _complete(self, msg: Msg) -> _SimStatus:
+        obj = msg.obj
+        info = self._fly_info.get(obj.name)
+        start = self._kickoff_time.get(obj.name, self.clock)
+        segments = []
+        if isinstance(info, FlyMotorInfo) and _is_motor(obj):
+            acceleration_time = await self.get(obj.acceleration_time)  # type: ignore
+            line_end = start + acceleration_time + info.time_for_move
+            segments = [
+                ("moves", start, start + acceleration_time),
+                ("acquisition", start + acceleration_time, line_end),
+                ("moves", line_end, line_end + acceleration_time),
+            ]
+            self._values[obj.user_readback.name] = info.end_position  # type: ignore
+        elif isinstance(info, TriggerInfo):
+            events = info.number_of_events
+            total = events if isinstance(events, int) else sum(events)
+            livetime = total * (info.livetime or 0.0)
+            deadtime = total * (info.deadtime or 0.0)
+            segments = [
+                ("acquisition", start, start + livetime),
+                ("readout", start + livetime, start + livetime + deadtime),
+            ]
+        elif isinstance(info, Slice) and info.duration is not None:
+            segments = [("acquisition", start, start + float(sum(info.duration)))]
+        status = self._status(msg, segments)
+        self._completing.append(status)
+        return status
+
+    async def _trigger(self, msg: Msg) -> _SimStatus:
+        obj = msg.obj
+        acquire_time = 0.0
+        acquire_time_signal = _find_signal(obj, "acquire_time")
+        if acquire_time_signal is not None:
+            acquire_time = await self.get(acquire_time_signal) or 0.0
+        deadtime = 0.0
+        if isinstance(obj, StandardDetector):
+            _, deadtime = await obj.get_trigger_deadtime()
+            deadtime = deadtime or 0.0
+        end = self.clock + acquire_time
+        return self._status(
+            msg,
+            [
+                ("acquisition", self.clock, end),
+                ("readout", end, end + deadtime),
+            ],
+        )
+
+    async def _sleep(self, msg: Msg) -> None:
+        self._paced = True
+        finish = self.clock + msg.args[0]
+        self._advance(finish, [("settling", self.clock, finish)])
+
+    async def _wait(self, msg: Msg) -> bool:
+        statuses = self._groups.get(msg.kwargs.get("group"), [])
+        if not statuses:
+            return True
+        critical = max(statuses, key=lambda status: status.finish)
+        timeout = msg.kwargs.get("timeout")
+        finish = critical.finish
+        if timeout is not None:
+            self._paced = True
+            finish = min(finish, self.clock + timeout)
+        self._advance(finish)
+        if critical.done:
+            self._groups.pop(msg.kwargs.get("group"), None)
+        return critical.done
+
+    async def _locate(self, msg: Msg) -> dict[str, Any]:
+        obj = msg.obj
+        signal = obj.user_readback if _is_motor(obj) else obj
+        value = await self.get(signal)
+        return {"setpoint": value, "readback": value}
+
+    async def _read(self, msg: Msg) -> dict[str, Any]:
+        obj = msg.obj
+        if isinstance(obj, SignalR):
+            value = await self.get(obj)
+            return {obj.name: {"value": value, "timestamp": self.clock}}
+        if isinstance(obj, StandardDetector):
+            # Nothing was really prepared or triggered so there is no frame.
+            return {}
+        if isinstance(obj, StandardReadable):
+            # Skip read overrides, e.g. auto gain, they may set the device.
+            reading: dict[str, Any] = await StandardReadable.read(obj)
+        else:
+            reading = dict(await maybe_await(obj.read()))
+        for name in reading:
+            if name in self._values:
+                reading[name] = {**reading[name], "value": self._values[name]}
+        return reading
+
+    async def _wait_for(self, msg: Msg) -> list[asyncio.Future]:
+        futures = []
+        for func in msg.args[0]:
+            future = asyncio.get_running_loop().create_future()
+            # Signal snapshots follow the simulated state like any other read.
+            if hasattr(func, "signals"):
+                future.set_result([await self.get(sig) for sig in func.signals])
+            elif getattr(func, "__name__", None) in QUERY_AWAITABLES:
+                future.set_result(await func())
+            else:
+                LOGGER.debug(f"Not running {func} during duration estimate.")
+                future.set_result(None)
+            futures.append(future)
+        return futures
+
+    async def _save(self, msg: Msg) -> None:
+        finish = self.clock + self._event_overhead
+        self._advance(finish, [("readout", self.clock, finish)])
+        self._skip_repeated_reads()
+        self._last_save, self._paced = self.clock, False
+
+    def _skip_repeated_reads(self) -> None:
+        """
+        Simulate reads in bulk while a fly move runs. A plan that reads as
+        fast as it can until the move completes repeats the same events, once
+        one has been timed the clock jumps over all but the last that fit
+        before the move is done. Reads paced by sleeps or timeouts are not
+        skipped, the plan may schedule on the clock.
+        """
+        self._completing = [status for status in self._completing if not status.done]
+        if self._last_save is None or self._paced or not self._completing:
+            return
+        period = self.clock - self._last_save
+        finish = min(status.finish for status in self._completing)
+        repeats = floor((finish - self.clock) / period) - 1 if period > 0 else 0
+        if repeats > 0:
+            self._advance(self.clock + repeats * period)
+
+    async def _open_run(self, msg: Msg) -> str:
+        return "simulated-run"
+
+    async def _close_run(self, msg: Msg) -> str:
+        return "simulated-run"
+
+
+def _is_motor(obj: Any) -> bool:
+    return all(
+        hasattr(obj, attr)
+        for attr in ("user_readback", "user_setpoint", "velocity", "acceleration_time")
+    )
+
+
+def _find_signal(device: Any, name: str) -> SignalR | None:
+    """Find the first child signal with the given attribute name."""
+    if not isinstance(device, Device):
+        return None
+    for child_name, child in device.children():
+        if child_name == name and isinstance(child, SignalR):
+            return child
+        found = _find_signal(child, name)
+        if found is not None:
+            return found
+    return None
+
+
+async def estimate_duration(
+    plan: MsgGenerator,
+    *devices: Device,
+    event_overhead: float = EVENT_OVERHEAD,
+) -> PlanDuration:
+    """
+    Predict how long a plan takes without moving anything.
+
+    The plan is walked message by message, reads are answered from the devices
+    (each signal is read once and then follows the simulated state, detectors
+    that need a real trigger give no data) while moves,
+    fly scans, triggers and sleeps advance a simulated clock using the motor
+    velocity, acceleration_time and the detector acquire and dead time.
+
+    Plans that steer on measured data, e.g. moving to a fitted peak, see the
+    unmoved device data and may give up early with a FitFailedError. The
+    estimate up to that point is returned with finished set to False. Any
+    other error, e.g. a scan outside the motor limits, is raised as the plan
+    would raise it when run.
+
+    The plan runs on the simulated clock, see PLAN_CLOCK, and with its own
+    empty device state cache, see SESSION_CACHE, so simulated values never
+    reach the session cache. Reads repeated while a fly move runs are
+    simulated in bulk, see _PlanTimer._skip_repeated_reads.
+
+    Parameters
+    ----------
+    plan : MsgGenerator
+        The plan to estimate, e.g. grid_step_scan(...).
+    *devices : Device
+        Motors whose kinematics are cached up front, others are read when the
+        plan first uses them.
+    event_overhead : float, optional
+        Readout overhead added to every event, by default 1 ms.
+
+    Returns
+    -------
+    PlanDuration
+        Total predicted time and the time spent on moves, settling,
+        acquisition and readout.
+    """
+    timer = _PlanTimer(event_overhead)
+    for device in devices:
+        await timer.cache_kinematics(device)
+    finished = True
+    response: Any = None
+    clock_token = PLAN_CLOCK.set(lambda: timer.clock)
+    cache_token = SESSION_CACHE.set(DeviceStateCache(ttl=0))
+    try:
+        for _ in range(MAX_MESSAGES):
+            msg = plan.send(response)
+            response = await timer.handle(msg)
+        else:
+            raise RuntimeError(
+                f"Plan did not finish within {MAX_MESSAGES} simulated messages."
+            )
+    except StopIteration:
+        pass
+    except FitFailedError as e:
+        LOGGER.warning(f"Plan stopped during duration estimate: {e}")
+        finished = False
+    finally:
+        SESSION_CACHE.reset(cache_token)
+        PLAN_CLOCK.reset(clock_token)
+    LOGGER.info(f"Estimated plan duration {timer.clock:.2f}s: {timer.durations}")
+    durations = {bucket: float(time) for bucket, time in timer.durations.items()}
+    return PlanDuration(total=float(timer.clock), finished=finished, **durations)  # type: ignore
@@ -0,0 +1,84 @@
+from typing import Any
+
+import numpy as np
+from bluesky.callbacks.core import CallbackBase
+from event_model.documents import Event, EventDescriptor, RunStart
+from numpy.typing import NDArray
+
+
+class StreamAligner(CallbackBase):
+    """
+    Callback that stores the events of every stream in a run so streams read
+    at different rates, e.g. fast_scan_1d with det_groups, can be aligned.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._stream_names: dict[str, str] = {}
+        self.times: dict[str, list[float]] = {}
+        self.data: dict[str, dict[str, list[Any]]] = {}
+
+    def start(self, doc: RunStart) -> RunStart:
+        self._stream_names = {}
+        self.times = {}
+        self.data = {}
+        return doc
+
+    def descriptor(self, doc: EventDescriptor) -> EventDescriptor:
+        self._stream_names[doc["uid"]] = doc.get("name", "primary")
+        return doc
+
+    def event(self, doc: Event) -> Event:
+        name = self._stream_names[doc["descriptor"]]
+        self.times.setdefault(name, []).append(doc["time"])
+        stream = self.data.setdefault(name, {})
+        for key, value in doc["data"].items():
+            stream.setdefault(key, []).append(value)
+        return doc
+
+    def align(
+        self, reference: str = "primary", key: str | None = None
+    ) -> dict[str, NDArray]:
+        """
+        Linearly interpolate the data of every other stream onto the points of
+        the reference stream.
+
+        Parameters
+        ----------
+        reference : str
+            Name of the stream whose points are kept.
+        key : str, optional
+            Data key to align on, e.g. the scanned motor, it must be in every
+            stream and only makes sense for a single line. If None, the event
+            time is used.
+
+        Returns
+        -------
+        dict[str, NDArray]
+            Reference stream data with the other streams data added.
+        """
+        if reference not in self.data:
+            raise ValueError(f"No stream named {reference}, got {list(self.data)}")
+        ref_axis = self._axis(reference, key)
+        aligned = {
+            name: np.asarray(value) for name, value in self.data[reference].items()
+        }
+        for stream_name, stream in self.data.items():
+            if stream_name == reference:
+                continue
+            axis = self._axis(stream_name, key)
+            order = np.argsort(axis)
+            for data_key, value in stream.items():
+                if data_key in aligned:
+                    continue
+                aligned[data_key] = np.interp(
+                    ref_axis, axis[order], np.asarray(value, dtype=float)[order]
+                )
+        return aligned
+
+    def _axis(self, stream_name: str, key: str | None) -> NDArray:
+        if key is None:
+            return np.asarray(self.times[stream_name])
+        if key not in self.data[stream_name]:
+            raise ValueError(f"{key} is not in stream {stream_name}.")
+        return np.asarray(self.data[stream_name][key], dtype=float)
@@ -0,0 +1,170 @@
+from collections import deque
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+import bluesky.plan_stubs as bps
+import numpy as np
+from bluesky.callbacks.core import CallbackBase
+from bluesky.protocols import Movable, Readable
+from bluesky.utils import MsgGenerator
+from event_model.documents import Event, RunStart
+
+from sm_bluesky.log import LOGGER
+
+DERIVATIVE_WINDOW = 3
+STOP_PATIENCE = 2
+
+
+class StreamingPeakStats(CallbackBase):
+    """
+    Callback that keeps peak statistics up to date as each event arrives.
+
+    The centre of mass comes from running sums of x, y and x * y above the
+    running minimum, so it costs the same for every point. The derivative is
+    the least squares slope over the last few points. cen and fwhm use the
+    half maximum crossings as PeakStats does, they are only worked out when
+    asked for.
+
+    If stop_fraction is given the peak counts as found once it is bracketed,
+    a point before the maximum and stop_patience points in a row after it are
+    below stop_fraction of the way from the running minimum, taken as the
+    background, to the running maximum, see per_step.
+    """
+
+    def __init__(
+        self,
+        x: str,
+        y: str,
+        stop_fraction: float | None = None,
+        stop_patience: int = STOP_PATIENCE,
+        derivative_window: int = DERIVATIVE_WINDOW,
+    ) -> None:
+        super().__init__()
+        if stop_fraction is not None and not 0 < stop_fraction < 1:
+            raise ValueError(f"stop_fraction {stop_fraction} is not between 0 and 1.")
+        self.x = x
+        self.y = y
+        self.stop_fraction = stop_fraction
+        self.stop_patience = stop_patience
+        self.derivative_window = derivative_window
+        self._reset()
+
+    def _reset(self) -> None:
+        self.x_data: list[float] = []
+        self.y_data: list[float] = []
+        self._sum_x = self._sum_y = self._sum_xy = 0.0
+        self.max: tuple[float, float] | None = None
+        self.min: tuple[float, float] | None = None
+        self._min_before_max = np.inf
+        self._below_after_max = 0
+        self._window: deque[tuple[float, float]] = deque(maxlen=self.derivative_window)
+        self.derivative: float | None = None
+        self.derivative_max: tuple[float, float] | None = None
+        self.derivative_min: tuple[float, float] | None = None
+        self.done = False
+
+    def start(self, doc: RunStart) -> RunStart:
+        self._reset()
+        return doc
+
+    def event(self, doc: Event) -> Event:
+        data = doc["data"]
+        if self.x in data and self.y in data:
+            self.update(float(data[self.x]), float(data[self.y]))
+        return doc
+
+    def update(self, x: float, y: float) -> None:
+        """Add one point, everything but cen and fwhm is updated in place."""
+        self.x_data.append(x)
+        self.y_data.append(y)
+        self._sum_x += x
+        self._sum_y += y
+        self._sum_xy += x * y
+        min_so_far = np.inf if self.min is None else self.min[1]
+        if y < min_so_far:
+            self.min = (x, y)
+        if self.max is None or y > self.max[1]:
+            self.max = (x, y)
+            self._min_before_max = min_so_far
+            self._below_after_max = 0
+        elif self.stop_fraction is not None:
+            background = self.min[1] if self.min is not None else 0.0
+            threshold = background + self.stop_fraction * (self.max[1] - background)
+            below = y < threshold
+            self._below_after_max = self._below_after_max + 1 if below else 0
+            if (
+                self._below_after_max >= self.stop_patience
+                and self._min_before_max < threshold
+                and not self.done
+            ):
+                self.done = True
+                LOGGER.info(
+                    f"Peak in {self.y} bracketed at {self.x} = {x} after"
+                    f" {len(self.x_data)} points."
+                )
+        self._update_derivative(x, y)
+
+    def _update_derivative(self, x: float, y: float) -> None:
+        self._window.append((x, y))
+        if len(self._window) < 2:
+            return
+        xs, ys = np.array(self._window).T
+        dx = xs - xs.mean()
+        denominator = float(np.dot(dx, dx))
+        if denominator == 0:
+            return
+        self.derivative = float(np.dot(dx, ys - ys.mean()) / denominator)
+        centre = float(xs.mean())
+        if self.derivative_max is None or self.derivative > self.derivative_max[1]:
+            self.derivative_max = (centre, self.derivative)
+        if self.derivative_min is None or self.derivative < self.derivative_min[1]:
+            self.derivative_min = (centre, self.derivative)
+
+    @property
+    def com(self) -> float | None:
+        """Centre of mass above the running minimum."""
+        if self.min is None:
+            return None
+        weight = self._sum_y - len(self.x_data) * self.min[1]
+        if weight == 0:
+            return None
+        return (self._sum_xy - self.min[1] * self._sum_x) / weight
+
+    @property
+    def crossings(self) -> list[float]:
+        """Positions where the signal crosses half way between min and max."""
+        if self.max is None or self.min is None:
+            return []
+        x = np.asarray(self.x_data)
+        y = np.asarray(self.y_data) - (self.max[1] + self.min[1]) / 2
+        index = np.flatnonzero(np.diff((y > 0).astype(int)))
+        return list(x[index] - y[index] * (x[index + 1] - x[index]) / np.diff(y)[index])
+
+    @property
+    def cen(self) -> float | None:
+        crossings = self.crossings
+        return float(np.mean(crossings)) if crossings else None
+
+    @property
+    def fwhm(self) -> float | None:
+        crossings = self.crossings
+        return abs(crossings[-1] - crossings[0]) if len(crossings) >= 2 else None
+
+    def per_step(
+        self,
+        detectors: Sequence[Readable],
+        step: Mapping[Movable, Any],
+        pos_cache: dict[Movable, Any],
+        take_reading: bps.TakeReading | None = None,
+    ) -> MsgGenerator:
+        """A bluesky scan per_step that skips the rest of the scan once the
+        peak is found."""
+        if self.done:
+            return
+        yield from bps.one_nd_step(detectors, step, pos_cache, take_reading)
+
+    def __repr__(self) -> str:
+        return (
+            f"StreamingPeakStats(points={len(self.x_data)}, com={self.com},"
+            f" cen={self.cen}, fwhm={self.fwhm}, max={self.max}, done={self.done})"
+        )
@@ -1,3 +1,27 @@
-from .conversion import cal_range_num, step_size_to_step_num
+from .conversion import cal_range_num, cal_trigger_table, step_size_to_step_num
+from .fitting import (
+    FIT_MODELS,
+    Fit2DResult,
+    FitFailedError,
+    FitResult,
+    centroid_2d,
+    erf,
+    fit_gaussian_2d,
+    fit_peak,
+)
+from .peak_search import GoldenSectionSearch
 
-__all__ = ["cal_range_num", "step_size_to_step_num"]
+__all__ = [
+    "cal_range_num",
+    "cal_trigger_table",
+    "step_size_to_step_num",
+    "GoldenSectionSearch",
+    "FIT_MODELS",
+    "FitFailedError",
+    "FitResult",
+    "erf",
+    "fit_peak",
+    "Fit2DResult",
+    "centroid_2d",
+    "fit_gaussian_2d",
+]
@@ -1,5 +1,8 @@
 from math import ceil, floor
 
+from numpy import arange, floating
+from numpy.typing import NDArray
+
 
 def cal_range_num(cen: float, range: float, size: float) -> tuple[float, float, int]:
     """Calculate the start, end and the number of steps for a scan."""
@@ -28,3 +31,37 @@ def step_size_to_step_num(start: float, end: float, step_size: float) -> int:
     """
     step_range = abs(start - end)
     return floor(step_range / step_size)
+
+
+def cal_trigger_table(
+    start: float, end: float, speed: float, num: int
+) -> tuple[NDArray[floating], float]:
+    """Calculate the trigger positions and period for a time-based fly scan.
+
+    The line is divided into num equal exposures at constant speed, the
+    positions returned are the centre of each exposure.
+
+    Parameters
+    ----------
+    start : float
+        Starting position.
+    end : float
+        Ending position.
+    speed : float
+        Motor speed during the constant velocity part of the move.
+    num : int
+        Number of triggers.
+
+    Returns
+    -------
+    tuple[NDArray[floating], float]
+        The position of each trigger and the trigger period in seconds.
+    """
+    if num < 1:
+        raise ValueError(f"Number of triggers must be at least 1, got {num}")
+    if speed <= 0:
+        raise ValueError(f"Speed must be positive, got {speed}")
+    step = (end - start) / num
+    positions = start + step * (arange(num) + 0.5)
+    period = abs(end - start) / speed / num
+    return positions, period
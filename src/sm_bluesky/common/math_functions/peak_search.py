@@ -0,0 +1,92 @@
+from math import sqrt
+
+import numpy as np
+
+INV_PHI = (sqrt(5) - 1) / 2
+
+
+class GoldenSectionSearch:
+    """
+    Ask/tell golden-section search for the position of a single maximum.
+
+    A few evenly spaced seed points first find the neighbourhood of the
+    maximum, the bracket around the best seed point is then narrowed by the
+    golden ratio with one new point per step until it is smaller than the
+    tolerance. The seed points must be dense enough for at least one of them
+    to land on the peak.
+
+    Example
+    -------
+    >>> search = GoldenSectionSearch(-1.0, 1.0, tolerance=0.01)
+    >>> while (x := search.ask()) is not None:
+    ...     search.tell(x, -((x - 0.3) ** 2))
+    >>> round(search.result, 2)
+    0.3
+    """
+
+    def __init__(
+        self, start: float, end: float, tolerance: float, seed_points: int = 7
+    ) -> None:
+        if tolerance <= 0:
+            raise ValueError(f"Tolerance must be positive, got {tolerance}")
+        if seed_points < 3:
+            raise ValueError(f"Need at least 3 seed points, got {seed_points}")
+        self.tolerance = tolerance
+        self.positions: list[float] = []
+        self.values: list[float] = []
+        self._seeds = [float(x) for x in np.linspace(start, end, seed_points)]
+        self._bracket: list[float] | None = None
+        self._inner: list[float | None] = [None, None]
+
+    def ask(self) -> float | None:
+        """The next position to measure, None once the search is done."""
+        if len(self.positions) < len(self._seeds):
+            return self._seeds[len(self.positions)]
+        if self._bracket is None:
+            best = int(np.argmax(self.values))
+            low = self._seeds[max(best - 1, 0)]
+            high = self._seeds[min(best + 1, len(self._seeds) - 1)]
+            self._bracket = [
+                low,
+                high - INV_PHI * (high - low),
+                low + INV_PHI * (high - low),
+                high,
+            ]
+        low, left, right, high = self._bracket
+        if abs(high - low) < self.tolerance:
+            return None
+        return left if self._inner[0] is None else right
+
+    def tell(self, x: float, value: float) -> None:
+        """Record a measurement and narrow the bracket once both inner points
+        are known, only one of them is new after the first step."""
+        self.positions.append(x)
+        self.values.append(value)
+        if self._bracket is None:
+            return
+        low, left, right, high = self._bracket
+        if x == left:
+            self._inner[0] = value
+        elif x == right:
+            self._inner[1] = value
+        f_left, f_right = self._inner
+        if f_left is None or f_right is None:
+            return
+        if f_left > f_right:
+            high, right = right, left
+            left = high - INV_PHI * (high - low)
+            self._inner = [None, f_left]
+        else:
+            low, left = left, right
+            right = low + INV_PHI * (high - low)
+            self._inner = [f_right, None]
+        self._bracket = [low, left, right, high]
+
+    @property
+    def result(self) -> float:
+        """Centre of the current bracket, the best point before it exists."""
+        if self._bracket is None:
+            if not self.values:
+                raise ValueError("No points measured.")
+            return self.positions[int(np.argmax(self.values))]
+        return (self._bracket[0] + self._bracket[-1]) / 2
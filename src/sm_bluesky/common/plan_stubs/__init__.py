@@ -1,19 +1,74 @@
 from .detectors import set_area_detector_acquire_time
-from .motions import (
+from .look_up_table import (
+    Interpolation,
+    LookUpEntry,
+    LookUpTable,
+    LookUpTableStore,
     MotorTable,
+    as_look_up_table,
+    look_up_position,
+)
+from .motions import (
     check_within_limit,
+    check_within_snapshot_limit,
     get_motor_positions,
     get_velocity_and_step_size,
     move_motor_with_look_up,
     set_slit_size,
 )
+from .plan_clock import PLAN_CLOCK, plan_time
+from .snapshot import (
+    DEVICE_STATE_CACHE,
+    LIMIT_ATTRS,
+    MOTOR_SETPOINT_ATTRS,
+    MOTOR_STATE_ATTRS,
+    SESSION_CACHE,
+    DeviceStateCache,
+    MotorSnapshot,
+    read_device_state,
+    read_signals,
+    snapshot_motors,
+)
+from .trajectory_limits import (
+    MotorTrajectory,
+    check_trajectory_within_limit,
+    check_trajectory_within_snapshot_limit,
+    fly_line_trajectory,
+    grid_trajectory,
+    spec_trajectory,
+)
 
 __all__ = [
     "set_area_detector_acquire_time",
     "MotorTable",
+    "LookUpEntry",
+    "LookUpTableStore",
+    "Interpolation",
+    "LookUpTable",
+    "as_look_up_table",
+    "look_up_position",
     "move_motor_with_look_up",
     "set_slit_size",
+    "PLAN_CLOCK",
+    "plan_time",
     "check_within_limit",
+    "check_within_snapshot_limit",
     "get_motor_positions",
     "get_velocity_and_step_size",
+    "DEVICE_STATE_CACHE",
+    "DeviceStateCache",
+    "LIMIT_ATTRS",
+    "MOTOR_SETPOINT_ATTRS",
+    "MOTOR_STATE_ATTRS",
+    "SESSION_CACHE",
+    "MotorSnapshot",
+    "read_device_state",
+    "read_signals",
+    "snapshot_motors",
+    "MotorTrajectory",
+    "check_trajectory_within_limit",
+    "check_trajectory_within_snapshot_limit",
+    "fly_line_trajectory",
+    "grid_trajectory",
+    "spec_trajectory",
 ]
@@ -0,0 +1,334 @@
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_right
+from collections.abc import Iterator, Mapping
+from datetime import UTC, datetime
+from enum import StrEnum
+from pathlib import Path
+from typing import Any, TypedDict
+
+import numpy as np
+from pydantic import RootModel
+
+from sm_bluesky.log import LOGGER
+
+SCHEMA_VERSION = 1
+HISTORY_LENGTH = 20
+
+
+class MotorTable(RootModel):
+    """RootModel for motor tables"""
+
+    root: dict[str, float]
+
+
+class Interpolation(StrEnum):
+    """How LookUpTable treats a key between two entries."""
+
+    EXACT = "exact"
+    LINEAR = "linear"
+    SPLINE = "spline"
+
+
+class LookUpTable(Mapping[str, float]):
+    """
+    A motor table validated once and compiled into sorted key and value
+    arrays for fast look up between entries.
+
+    Keys are read as numbers, e.g. slit sizes in um. Between entries the
+    value is interpolated linearly or with a natural cubic spline, the two
+    neighbouring entries are found by bisection. Nothing is extrapolated
+    beyond the first and last key.
+
+    Example
+    -------
+    >>> table = LookUpTable({"50": 36.7, "100": 31.7, "500": 25.674}, "linear")
+    >>> table(100), round(table(300), 3)
+    (31.7, 28.687)
+    """
+
+    def __init__(
+        self,
+        table: Mapping[str, float],
+        interpolation: Interpolation | str = Interpolation.EXACT,
+    ) -> None:
+        self._table = MotorTable.model_validate(dict(table)).root
+        self.interpolation = Interpolation(interpolation)
+        try:
+            pairs = sorted((float(key), value) for key, value in self._table.items())
+        except ValueError as e:
+            raise ValueError(f"Look up table keys must be numbers: {e}") from e
+        self._keys = [key for key, _ in pairs]
+        self.keys_array = np.array(self._keys)
+        self.values_array = np.array([value for _, value in pairs])
+        if len(set(self._keys)) != len(self._keys):
+            raise ValueError(f"Look up table has duplicate keys: {list(table)}")
+        self._curvature = (
+            _natural_spline_curvature(self.keys_array, self.values_array)
+            if self.interpolation is Interpolation.SPLINE
+            else np.zeros(len(self._keys))
+        )
+
+    def __call__(self, key: float) -> float:
+        """
+        The value at key, interpolated between entries if allowed.
+
+        Raises
+        ------
+        ValueError
+            If key is not in an exact table or outside the table range.
+        """
+        index = bisect_right(self._keys, key) - 1
+        if index >= 0 and self._keys[index] == key:
+            return float(self.values_array[index])
+        if self.interpolation is Interpolation.EXACT:
+            raise ValueError(f"No entry for {key} in look up table.")
+        if index < 0 or index >= len(self._keys) - 1:
+            raise ValueError(
+                f"{key} is outside the look up table range"
+                f" {self._keys[0]} to {self._keys[-1]}."
+            )
+        x0, x1 = self._keys[index], self._keys[index + 1]
+        y0, y1 = self.values_array[index], self.values_array[index + 1]
+        width = x1 - x0
+        a = (x1 - key) / width
+        b = 1 - a
+        value = a * y0 + b * y1
+        if self.interpolation is Interpolation.SPLINE:
+            m0, m1 = self._curvature[index], self._curvature[index + 1]
+            value += ((a**3 - a) * m0 + (b**3 - b) * m1) * width**2 / 6
+        return float(value)
+
+    def __getitem__(self, key: str) -> float:
+        return self._table[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __repr__(self) -> str:
+        return f"LookUpTable({self._table}, {self.interpolation.value})"
+
+
+class LookUpEntry(TypedDict):
+    """One refined look up table value and the quality of the fit it came from."""
+
+    centre: float
+    fwhm: float | None
+    cen_error: float | None
+    timestamp: str
+    version: int
+
+
+class LookUpTableStore(Mapping[str, float]):
+    """
+    Look up table of motor positions kept in a local JSON file.
+
+    It reads like the plain dict tables, keys that were never refined fall
+    back to the defaults. Each record keeps the refined centre with the FWHM
+    and centre error of the fit, the UTC time and the table version, which
+    goes up by one on every write. The last history_length records of each
+    key are kept.
+
+    Every write replaces the whole file with a temporary file from the same
+    directory, so the file is never half written. The file is only read again
+    when its modification time changes, and a lock makes the store safe to
+    share between threads. Writes from other processes are merged on the
+    next record but not locked against.
+
+    Example
+    -------
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     store = LookUpTableStore(f"{directory}/dsu.json", {"50": 36.7})
+    ...     before = store["50"]
+    ...     entry = store.record("50", 36.9, fwhm=0.05)
+    ...     print(before, store["50"], entry["version"])
+    36.7 36.9 1
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        defaults: Mapping[str, float] | None = None,
+        history_length: int = HISTORY_LENGTH,
+        interpolation: Interpolation | str = Interpolation.EXACT,
+    ) -> None:
+        self.defaults = MotorTable.model_validate(dict(defaults or {})).root
+        self.history_length = history_length
+        self.interpolation = Interpolation(interpolation)
+        self._lock = threading.RLock()
+        self.path = Path(path)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @path.setter
+    def path(self, path: str | os.PathLike[str]) -> None:
+        with self._lock:
+            self._path = Path(path)
+            self._entries: dict[str, list[LookUpEntry]] = {}
+            self._version = 0
+            self._stamp: tuple[int, int] | None = None
+            self._compiled: LookUpTable | None = None
+
+    @property
+    def version(self) -> int:
+        """Number of records written to the file so far."""
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def table(self) -> LookUpTable:
+        """The current values compiled with the store interpolation, it is
+        only compiled again after a record or a change of the file."""
+        with self._lock:
+            self._refresh()
+            if self._compiled is None:
+                self._compiled = LookUpTable(
+                    {key: self[key] for key in self}, self.interpolation
+                )
+            return self._compiled
+
+    def entry(self, key: str) -> LookUpEntry | None:
+        """The latest record of key, None if it only has a default."""
+        history = self.history(key)
+        return history[-1] if history else None
+
+    def history(self, key: str) -> list[LookUpEntry]:
+        """The kept records of key, oldest first."""
+        with self._lock:
+            self._refresh()
+            return list(self._entries.get(key, []))
+
+    def record(
+        self,
+        key: str,
+        centre: float,
+        fwhm: float | None = None,
+        cen_error: float | None = None,
+    ) -> LookUpEntry:
+        """Add a refined centre for key and write the table to file."""
+        with self._lock:
+            self._refresh()
+            self._version += 1
+            entry = LookUpEntry(
+                centre=float(centre),
+                fwhm=None if fwhm is None else float(fwhm),
+                cen_error=None if cen_error is None else float(cen_error),
+                timestamp=datetime.now(UTC).isoformat(),
+                version=self._version,
+            )
+            history = self._entries.setdefault(key, [])
+            history.append(entry)
+            del history[: -self.history_length]
+            self._write()
+            self._compiled = None
+        LOGGER.info(f"{self.path.name}[{key}] = {centre} version {entry['version']}.")
+        return entry
+
+    def __getitem__(self, key: str) -> float:
+        entry = self.entry(key)
+        if entry is not None:
+            return entry["centre"]
+        return self.defaults[key]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._refresh()
+            return iter(sorted({*self.defaults, *self._entries}, key=_size_order))
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+    def __repr__(self) -> str:
+        return f"LookUpTableStore({self.path}, {dict(self)})"
+
+    def _refresh(self) -> None:
+        """Read the file again if it changed since it was last read."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        try:
+            content: dict[str, Any] = json.loads(self.path.read_text())
+            if content.get("schema") != SCHEMA_VERSION:
+                raise ValueError(f"unknown schema {content.get('schema')}")
+            self._entries = {
+                key: [LookUpEntry(**entry) for entry in history]
+                for key, history in content["entries"].items()
+            }
+            self._version = int(content["version"])
+            self._compiled = None
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Look up table {self.path} is corrupt: {e}") from e
+        self._stamp = stamp
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = {
+            "schema": SCHEMA_VERSION,
+            "version": self._version,
+            "entries": self._entries,
+        }
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path.parent, prefix=f".{self.path.name}.", delete=False
+        ) as file:
+            json.dump(content, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, self.path)
+        stat = self.path.stat()
+        self._stamp = (stat.st_mtime_ns, stat.st_size)
+
+
+def as_look_up_table(
+    table: Mapping[str, float] | LookUpTableStore | LookUpTable,
+) -> LookUpTable:
+    """Compile any of the table types, a LookUpTable is returned as it is."""
+    if isinstance(table, LookUpTable):
+        return table
+    if isinstance(table, LookUpTableStore):
+        return table.table()
+    return LookUpTable(table)
+
+
+def look_up_position(table: LookUpTable, size: float) -> float:
+    """The position for a slit size, exact tables match the whole number part
+    of the size as the plain dict tables always have."""
+    if table.interpolation is Interpolation.EXACT:
+        return table(int(size))
+    return table(size)
+
+
+def _natural_spline_curvature(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Second derivatives at the knots of the natural cubic spline through
+    x, y, zero at both ends."""
+    n = len(x)
+    curvature = np.zeros(n)
+    if n < 3:
+        return curvature
+    h = np.diff(x)
+    slope = np.diff(y) / h
+    inner = np.arange(n - 2)
+    system = np.zeros((n - 2, n - 2))
+    system[inner, inner] = 2 * (h[:-1] + h[1:])
+    system[inner[1:], inner[:-1]] = h[1:-1]
+    system[inner[:-1], inner[1:]] = h[1:-1]
+    curvature[1:-1] = np.linalg.solve(system, 6 * np.diff(slope))
+    return curvature
+
+
+def _size_order(key: str) -> tuple[float, str]:
+    """Numeric keys in numeric order."""
+    try:
+        return float(key), key
+    except ValueError:
+        return float("inf"), key
@@ -8,17 +8,22 @@ from bluesky.utils import MsgGenerator, plan
 from dodal.devices.slits import Slits
 from ophyd_async.core import SignalRW
 from ophyd_async.epics.motor import Motor
-from pydantic import RootModel
 
+from sm_bluesky.common.plan_stubs.look_up_table import (
+    LookUpTable,
+    LookUpTableStore,
+    as_look_up_table,
+    look_up_position,
+)
+from sm_bluesky.common.plan_stubs.snapshot import (
+    LIMIT_ATTRS,
+    MotorSnapshot,
+    read_device_state,
+    read_signals,
+)
 from sm_bluesky.log import LOGGER
 
 
-class MotorTable(RootModel):
-    """RootModel for motor tables"""
-
-    root: dict[str, float]
-
-
 class HighLowLimitsDevice(HasName, Protocol):
     low_limit_travel: SignalRW[float]
     high_limit_travel: SignalRW[float]
@@ -28,7 +33,7 @@ class HighLowLimitsDevice(HasName, Protocol):
 def move_motor_with_look_up(
     slit: Movable[float],
     size: float,
-    motor_table: dict[str, float],
+    motor_table: dict[str, float] | LookUpTableStore | LookUpTable,
     use_motor_position: bool = False,
     wait: bool = True,
     group: Hashable | None = None,
@@ -43,8 +48,10 @@ def move_motor_with_look_up(
         Motor devices that is being centre.
     size: float
         The motor position or name in the motor_table.
-    motor_table: dict[str, float],
-        Look up table for motor position,
+    motor_table: dict[str, float] | LookUpTableStore | LookUpTable,
+        Look up table for motor position, a LookUpTableStore gives the last
+        refined position. A compiled LookUpTable is not validated again and
+        can interpolate between sizes.
     use_motor_position: bool = False,
         If Ture it will take motor position as size.
     wait: bool = True,
@@ -53,15 +60,17 @@ def move_motor_with_look_up(
         Bluesky group identifier used by ‘wait’.
 
     """
-    MotorTable.model_validate(motor_table)
+    table = as_look_up_table(motor_table)
     if use_motor_position:
         yield from abs_set(slit, size, wait=wait, group=group)
-    elif str(int(size)) in motor_table:
-        yield from abs_set(slit, motor_table[str(int(size))], wait=wait, group=group)
-    else:
+        return
+    try:
+        position = look_up_position(table, size)
+    except ValueError as e:
         raise ValueError(
-            f"No slit with size={size}. Available slit size: {motor_table}"
-        )
+            f"No slit with size={size}. Available slit size: {dict(motor_table)}"
+        ) from e
+    yield from abs_set(slit, position, wait=wait, group=group)
 
 
 @plan
@@ -103,6 +112,8 @@ def set_slit_size(
 @plan
 def check_within_limit(values: list[float], device: HighLowLimitsDevice):
     """Check if the given values are within the limits of the device.
+    The limits are kept in the session DeviceStateCache.
+
     Parameters
     ----------
     values : List[float]
@@ -115,13 +126,28 @@ def check_within_limit(values: list[float], device: HighLowLimitsDevice):
     ValueError
         If any value is outside the device's limits.
     """
-    LOGGER.info(f"Check {device.name} limits.")
-    lower_limit = yield from bps.rd(device.low_limit_travel)
-    high_limit = yield from bps.rd(device.high_limit_travel)
+    limits = yield from read_device_state([device], LIMIT_ATTRS)  # type: ignore
+    check_within_snapshot_limit(values, device.name, limits[device.name])
+
+
+def check_within_snapshot_limit(
+    values: list[float], name: str, limits: MotorSnapshot | dict[str, float]
+) -> None:
+    """Same as check_within_limit but with limits that have already been read,
+    e.g. from snapshot_motors.
+
+    Raises
+    ------
+    ValueError
+        If any value is outside the limits.
+    """
+    LOGGER.info(f"Check {name} limits.")
+    lower_limit = limits["low_limit_travel"]
+    high_limit = limits["high_limit_travel"]
     for value in values:
         if not lower_limit < value < high_limit:
             raise ValueError(
-                f"{device.name} move request of {value} is beyond limits:"
+                f"{name} move request of {value} is beyond limits:"
                 f"{lower_limit} < {high_limit}"
             )
 
@@ -140,10 +166,10 @@ def get_motor_positions(*arg: Motor) -> Iterator[tuple[str, float]]:
     Iterator[Tuple[str, float]]
         An iterator of tuples containing the motor name and its position.
     """
+    positions = yield from read_signals(*(motor.user_readback for motor in arg))  # type: ignore
     motor_position = []
-    for motor in arg:
+    for motor, position in zip(arg, positions, strict=True):
         motor_position.append(motor)
-        position = yield from bps.rd(motor)  # type: ignore
         motor_position.append(position)
 
     LOGGER.info(f"Stored motor, position  = {motor_position}.")
@@ -151,7 +177,10 @@ def get_motor_positions(*arg: Motor) -> Iterator[tuple[str, float]]:
 
 
 def get_velocity_and_step_size(
-    scan_motor: Motor, ideal_velocity: float, ideal_step_size: float
+    scan_motor: Motor,
+    ideal_velocity: float,
+    ideal_step_size: float,
+    max_velocity: float | None = None,
 ) -> Iterator[Any]:
     """
     Adjust the step size if the required velocity is higher than the max value.
@@ -164,6 +193,9 @@ def get_velocity_and_step_size(
         The desired velocity.
     ideal_step_size : float
         The non-scanning motor step size.
+    max_velocity : float, optional
+        Scan motor maximum velocity if already known, read from the motor if
+        None.
 
     Returns
     -------
@@ -172,10 +204,12 @@ def get_velocity_and_step_size(
     """
     if ideal_velocity <= 0.0:
         raise ValueError(f"{scan_motor.name} speed: {ideal_velocity} <= 0")
-    max_velocity = yield from bps.rd(scan_motor.max_velocity)  # type: ignore
+    if max_velocity is None:
+        max_velocity = yield from bps.rd(scan_motor.max_velocity)  # type: ignore
+    max_vel: float = max_velocity  # type: ignore
     # if motor does not move fast enough increase step_motor step size
-    if ideal_velocity > max_velocity:
-        ideal_step_size = ideal_step_size * (ideal_velocity / max_velocity)
-        ideal_velocity = round(max_velocity, 3)
+    if ideal_velocity > max_vel:
+        ideal_step_size = ideal_step_size * (ideal_velocity / max_vel)
+        ideal_velocity = round(max_vel, 3)
 
     return ideal_velocity, ideal_step_size
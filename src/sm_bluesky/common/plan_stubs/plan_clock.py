@@ -0,0 +1,23 @@
+from collections.abc import Callable
+from contextvars import ContextVar
+from time import monotonic
+
+# Clock that plans pace themselves on, set it to run a plan on another time
+# source, e.g. a simulated clock, and reset it with the token afterwards.
+PLAN_CLOCK: ContextVar[Callable[[], float]] = ContextVar(
+    "PLAN_CLOCK", default=monotonic
+)
+
+
+def plan_time() -> float:
+    """
+    The time now on PLAN_CLOCK, in seconds.
+
+    Example
+    -------
+    >>> token = PLAN_CLOCK.set(lambda: 12.5)
+    >>> plan_time()
+    12.5
+    >>> PLAN_CLOCK.reset(token)
+    """
+    return PLAN_CLOCK.get()()
@@ -0,0 +1,288 @@
+import asyncio
+from collections.abc import Callable, Sequence
+from contextvars import ContextVar
+from functools import partial
+from time import monotonic
+from typing import Any, TypedDict
+from weakref import ref
+
+import bluesky.plan_stubs as bps
+from bluesky.protocols import Reading
+from bluesky.utils import MsgGenerator, plan
+from ophyd_async.core import Device, SignalR
+from ophyd_async.epics.motor import Motor
+
+from sm_bluesky.log import LOGGER
+
+
+class MotorSnapshot(TypedDict):
+    """Motor position, kinematics and soft limits read in one go."""
+
+    position: float
+    velocity: float
+    acceleration_time: float
+    max_velocity: float
+    low_limit_travel: float
+    high_limit_travel: float
+
+
+MOTOR_SNAPSHOT_SIGNALS = {
+    "position": "user_readback",
+    "velocity": "velocity",
+    "acceleration_time": "acceleration_time",
+    "max_velocity": "max_velocity",
+    "low_limit_travel": "low_limit_travel",
+    "high_limit_travel": "high_limit_travel",
+}
+# Set by plans, e.g. to fly a line, so they are never served from the cache.
+MOTOR_SETPOINT_ATTRS = ["velocity"]
+MOTOR_STATE_ATTRS = [
+    attr
+    for attr in MOTOR_SNAPSHOT_SIGNALS.values()
+    if attr != "user_readback" and attr not in MOTOR_SETPOINT_ATTRS
+]
+LIMIT_ATTRS = ["low_limit_travel", "high_limit_travel"]
+
+
+class SignalSnapshot:
+    """Awaitable factory that reads all the signals concurrently, the signals
+    are kept so a simulator can answer it without touching the hardware."""
+
+    def __init__(self, signals: Sequence[SignalR]) -> None:
+        self.signals = list(signals)
+
+    async def __call__(self) -> list[Any]:
+        return list(await asyncio.gather(*(sig.get_value() for sig in self.signals)))
+
+
+@plan
+def read_signals(*signals: SignalR) -> MsgGenerator[list[Any]]:
+    """
+    Read any number of signals concurrently in a single plan message.
+
+    Parameters
+    ----------
+    *signals : SignalR
+        Signals to read.
+
+    Returns
+    -------
+    list[Any]
+        The signal values in the order given.
+    """
+    (task,) = yield from bps.wait_for([SignalSnapshot(signals)])
+    return task.result()
+
+
+class DeviceStateCache:
+    """
+    Per session cache of slowly changing device signals such as motor limits
+    and kinematics, keyed by device name. Signals that plans set, such as the
+    motor velocity, do not belong in it, see MOTOR_SETPOINT_ATTRS.
+
+    Entries expire after ttl seconds and are dropped as soon as any cached
+    signal reports a new value, so a changed limit is never served stale.
+    Devices are only weakly referenced, an entry goes when its device does,
+    and unwatch removes the subscriptions.
+    """
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        self.ttl = ttl
+        self._entries: dict[str, tuple[ref[Device], float, dict[str, Any]]] = {}
+        self._watched: dict[
+            str, tuple[ref[Device], list[tuple[ref[SignalR], Callable]]]
+        ] = {}
+
+    def lookup(self, device: Device, attrs: Sequence[str]) -> dict[str, Any] | None:
+        """Return the cached values, None if any is missing or expired."""
+        entry = self._entries.get(device.name)
+        if entry is None:
+            return None
+        cached_device, stored, values = entry
+        if cached_device() is not device or monotonic() - stored > self.ttl:
+            self.invalidate(device.name)
+            return None
+        if not all(attr in values for attr in attrs):
+            return None
+        return {attr: values[attr] for attr in attrs}
+
+    def store(self, device: Device, values: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        entry = self._entries.get(device.name)
+        if entry is not None and entry[0]() is device:
+            values = {**entry[2], **values}
+        self._entries[device.name] = (self._ref(device), monotonic(), values)
+
+    def invalidate(self, name: str | None = None) -> None:
+        """Drop the entry for one device, or everything if name is None."""
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+    def unwatched(self, device: Device, attrs: Sequence[str]) -> list[str]:
+        watched = self._watched.get(device.name)
+        if watched is None or watched[0]() is not device:
+            return list(attrs)
+        names = {signal.name for sig, _ in watched[1] if (signal := sig()) is not None}
+        return [attr for attr in attrs if getattr(device, attr).name not in names]
+
+    async def watch(self, device: Device, attrs: Sequence[str]) -> None:
+        """Subscribe to the signals so a change invalidates the entry."""
+        watched = self._watched.get(device.name)
+        if watched is None or watched[0]() is not device:
+            self._unsubscribe(device.name)
+            watched = (self._ref(device), [])
+            self._watched[device.name] = watched
+        for attr in attrs:
+            sig: SignalR = getattr(device, attr)
+            callback = partial(self._on_update, watched[0], attr)
+            sig.subscribe_reading(callback)
+            watched[1].append((ref(sig), callback))
+
+    def unwatch(self, name: str | None = None) -> None:
+        """
+        Remove the subscriptions of one device, or of all if name is None,
+        and drop their entries as changes are no longer noticed.
+        """
+        for device_name in list(self._watched) if name is None else [name]:
+            self._unsubscribe(device_name)
+            self.invalidate(device_name)
+
+    def _unsubscribe(self, name: str) -> None:
+        _, subscriptions = self._watched.pop(name, (None, []))
+        for sig, callback in subscriptions:
+            if (signal := sig()) is not None:
+                signal.clear_sub(callback)
+
+    def _ref(self, device: Device) -> ref[Device]:
+        name = device.name
+        return ref(device, partial(self._forget, name))
+
+    def _forget(self, name: str, device: ref[Device]) -> None:
+        """Drop what is kept for a device that has been garbage collected."""
+        if (entry := self._entries.get(name)) is not None and entry[0] is device:
+            del self._entries[name]
+        if (watched := self._watched.get(name)) is not None and watched[0] is device:
+            del self._watched[name]
+
+    def _on_update(
+        self, device: ref[Device], attr: str, reading: dict[str, Reading]
+    ) -> None:
+        target = device()
+        if target is None:
+            return
+        entry = self._entries.get(target.name)
+        if entry is None or entry[0]() is not target or attr not in entry[2]:
+            return
+        (value,) = (r["value"] for r in reading.values())
+        if value != entry[2][attr]:
+            LOGGER.debug(f"{target.name} {attr} changed, dropping cached state.")
+            self.invalidate(target.name)
+
+
+DEVICE_STATE_CACHE = DeviceStateCache()
+# Cache that plans use by default, set it to give plans another one, e.g. a
+# simulation that must not see or change the session state.
+SESSION_CACHE: ContextVar[DeviceStateCache] = ContextVar(
+    "SESSION_CACHE", default=DEVICE_STATE_CACHE
+)
+
+
+@plan
+def read_device_state(
+    devices: Sequence[Device],
+    attrs: Sequence[str],
+    uncached: Sequence[str] = (),
+    cache: DeviceStateCache | None = DEVICE_STATE_CACHE,
+) -> MsgGenerator[dict[str, dict[str, Any]]]:
+    """
+    Read signal attributes of several devices in a single plan message, using
+    the cache for attrs that have been read before.
+
+    Parameters
+    ----------
+    devices : Sequence[Device]
+        Devices to read.
+    attrs : Sequence[str]
+        Slowly changing signal attributes that may come from the cache,
+        e.g. "high_limit_travel".
+    uncached : Sequence[str], optional
+        Signal attributes that are always read, e.g. "user_readback".
+    cache : DeviceStateCache | None, optional
+        Cache to use, the session cache by default, see SESSION_CACHE, None to
+        always read.
+
+    Returns
+    -------
+    dict[str, dict[str, Any]]
+        Values for each device keyed by device name then attribute.
+    """
+    if cache is DEVICE_STATE_CACHE:
+        cache = SESSION_CACHE.get()
+    results: dict[str, dict[str, Any]] = {}
+    to_read: list[tuple[Device, str]] = []
+    for device in devices:
+        hit = cache.lookup(device, attrs) if cache is not None else None
+        results[device.name] = hit or {}
+        to_read += [(device, attr) for attr in uncached]
+        if hit is None:
+            to_read += [(device, attr) for attr in attrs]
+    if to_read:
+        values = yield from read_signals(*(getattr(d, attr) for d, attr in to_read))
+        for (device, attr), value in zip(to_read, values, strict=True):
+            results[device.name][attr] = value
+    if cache is not None and cache.ttl > 0:
+        for device in devices:
+            cache.store(device, {attr: results[device.name][attr] for attr in attrs})
+        new_watches = [
+            (device, missing)
+            for device in devices
+            if (missing := cache.unwatched(device, attrs))
+        ]
+        if new_watches:
+            yield from bps.wait_for(
+                [
+                    partial(cache.watch, device, missing)
+                    for device, missing in new_watches
+                ]
+            )
+    return results
+
+
+@plan
+def snapshot_motors(
+    *motors: Motor, cache: DeviceStateCache | None = DEVICE_STATE_CACHE
+) -> MsgGenerator[dict[str, MotorSnapshot]]:
+    """
+    Read the position, kinematics and limits of all motors in one round trip.
+    Kinematics and limits, but not the velocity, come from the session cache
+    when they are known.
+
+    Parameters
+    ----------
+    *motors : Motor
+        Motors to read.
+    cache : DeviceStateCache | None, optional
+        Cache to use, the session cache by default, None to always read.
+
+    Returns
+    -------
+    dict[str, MotorSnapshot]
+        Snapshot for each motor keyed by motor name.
+    """
+    states = yield from read_device_state(
+        motors,
+        MOTOR_STATE_ATTRS,
+        uncached=["user_readback", *MOTOR_SETPOINT_ATTRS],
+        cache=cache,
+    )
+    snapshots = {
+        name: MotorSnapshot(
+            **{key: state[attr] for key, attr in MOTOR_SNAPSHOT_SIGNALS.items()}
+        )
+        for name, state in states.items()
+    }
+    LOGGER.debug(f"Motor snapshot: {snapshots}")
+    return snapshots
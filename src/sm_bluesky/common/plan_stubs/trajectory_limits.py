@@ -0,0 +1,228 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, TypedDict
+
+import numpy as np
+from bluesky.utils import MsgGenerator, plan
+from ophyd_async.epics.motor import Motor
+from scanspec.core import Path
+from scanspec.specs import Spec
+
+from sm_bluesky.common.plan_stubs.snapshot import MOTOR_STATE_ATTRS, read_device_state
+from sm_bluesky.log import LOGGER
+
+
+class MotorTrajectory(TypedDict):
+    """
+    Everything one motor does during a scan, as flat arrays.
+
+    positions are the points the motor passes through in order, including
+    run-up and run-down overshoot. velocities[i] is the constant velocity
+    between positions[i] and positions[i + 1], NaN where the motor record
+    picks its own speed. accelerations are the commanded changes of velocity
+    along the trajectory, NaN where not known.
+    """
+
+    positions: np.ndarray
+    velocities: np.ndarray
+    accelerations: np.ndarray
+
+
+def fly_line_trajectory(
+    start: float, end: float, velocity: float, acceleration_time: float
+) -> MotorTrajectory:
+    """One fly scan line with the run-up and run-down the motor adds, see
+    FlyMotorInfo.ramp_up_start_pos."""
+    return _fly_lines(np.array([start]), np.array([end]), velocity, acceleration_time)
+
+
+def grid_trajectory(
+    step_motor: Motor,
+    steps: Sequence[float] | np.ndarray,
+    scan_motor: Motor,
+    scan_start: float,
+    scan_end: float,
+    motor_speed: float,
+    acceleration_time: float,
+    snake_axes: bool = False,
+) -> dict[Motor, MotorTrajectory]:
+    """
+    The trajectory of a fast grid, one fly line of the scan motor for each
+    step motor position, see fast_scan_grid.
+
+    Every line is four points: run-up start, line start, line end and
+    run-down end, the step motor holds its position along each line.
+    """
+    steps = np.asarray(steps, dtype=float)
+    reverse = np.zeros(len(steps), dtype=bool)
+    if snake_axes:
+        reverse[1::2] = True
+    starts = np.where(reverse, scan_end, scan_start)
+    ends = np.where(reverse, scan_start, scan_end)
+    step_positions = np.repeat(steps, 4)
+    return {
+        scan_motor: _fly_lines(starts, ends, motor_speed, acceleration_time),
+        step_motor: MotorTrajectory(
+            positions=step_positions,
+            velocities=np.full(len(step_positions) - 1, np.nan),
+            accelerations=np.array([]),
+        ),
+    }
+
+
+def spec_trajectory(
+    spec: Spec[Motor], acceleration_times: Mapping[str, float] | None = None
+) -> dict[Motor, MotorTrajectory]:
+    """
+    The trajectory of every axis in a scanspec Spec.
+
+    Each frame is flown from its lower to upper bound in its duration. Where
+    the path is not continuous the motion controller ramps down and up again,
+    that overshoot is added using each motor's acceleration time.
+    """
+    if acceleration_times is None:
+        acceleration_times = {}
+    path = Path(spec.calculate()).consume()
+    duration = path.duration
+    gap_before = np.asarray(path.gap, dtype=bool)
+    gap_after = np.append(gap_before[1:], True)
+    trajectories: dict[Motor, MotorTrajectory] = {}
+    for motor, lower in path.lower.items():
+        upper = path.upper[motor]
+        if duration is None:
+            frame_velocity = np.full(len(lower), np.nan)
+        else:
+            frame_velocity = (upper - lower) / duration
+        run = (
+            np.nan_to_num(frame_velocity) * acceleration_times.get(motor.name, 0.0) / 2
+        )
+        positions = np.column_stack(
+            [
+                lower - np.where(gap_before, run, 0.0),
+                lower,
+                upper,
+                upper + np.where(gap_after, run, 0.0),
+            ]
+        ).ravel()
+        velocities = np.full(len(positions) - 1, np.nan)
+        velocities[1::4] = frame_velocity
+        accelerations = np.full(max(len(lower) - 1, 0), np.nan)
+        if duration is not None and len(lower) > 1:
+            mean_duration = (duration[1:] + duration[:-1]) / 2
+            accelerations = np.where(
+                gap_before[1:],
+                np.nan,
+                np.diff(frame_velocity) / mean_duration,
+            )
+        trajectories[motor] = MotorTrajectory(
+            positions=positions, velocities=velocities, accelerations=accelerations
+        )
+    return trajectories
+
+
+def check_trajectory_within_snapshot_limit(
+    trajectory: Mapping[Any, MotorTrajectory],
+    states: Mapping[str, Mapping[str, float]],
+) -> None:
+    """
+    Check a whole trajectory against limits and kinematics that have already
+    been read, e.g. with read_device_state.
+
+    Every position must be within the soft limits, every velocity within
+    max_velocity and every acceleration within max_velocity /
+    acceleration_time. A max_velocity or acceleration_time of 0 means no
+    envelope, as for the EPICS motor record.
+
+    Raises
+    ------
+    ValueError
+        At the first violating point of the first failing check.
+    """
+    LOGGER.info(f"Check trajectory limits of {[m.name for m in trajectory]}.")
+    checks = (
+        ("positions", "point {} position", _beyond_limits),
+        ("velocities", "segment {} velocity", _beyond_velocity),
+        ("accelerations", "segment {} acceleration", _beyond_acceleration),
+    )
+    for key, label, beyond in checks:
+        first: tuple[int, str, float, str] | None = None
+        for motor, motor_trajectory in trajectory.items():
+            values = np.asarray(motor_trajectory[key], dtype=float)
+            bad, envelope = beyond(values, states[motor.name])
+            index = np.flatnonzero(bad)
+            if index.size and (first is None or index[0] < first[0]):
+                first = (int(index[0]), motor.name, float(values[index[0]]), envelope)
+        if first is not None:
+            index, name, value, envelope = first
+            raise ValueError(
+                f"{name} trajectory {label.format(index)} of {value} is beyond"
+                f" {envelope}"
+            )
+
+
+@plan
+def check_trajectory_within_limit(
+    trajectory: Mapping[Motor, MotorTrajectory] | Spec[Motor],
+) -> MsgGenerator:
+    """
+    Check a whole planned trajectory against the soft limits, maximum velocity
+    and acceleration of every motor in one pass, before anything moves.
+
+    Parameters
+    ----------
+    trajectory : Mapping[Motor, MotorTrajectory] | Spec[Motor]
+        The trajectory, e.g. from grid_trajectory, or a scanspec Spec.
+
+    Raises
+    ------
+    ValueError
+        At the first violating point, see
+        check_trajectory_within_snapshot_limit.
+    """
+    motors = list(trajectory.axes() if isinstance(trajectory, Spec) else trajectory)
+    states = yield from read_device_state(motors, MOTOR_STATE_ATTRS)
+    if isinstance(trajectory, Spec):
+        trajectory = spec_trajectory(
+            trajectory,
+            {name: state["acceleration_time"] for name, state in states.items()},
+        )
+    check_trajectory_within_snapshot_limit(trajectory, states)
+
+
+def _fly_lines(
+    starts: np.ndarray, ends: np.ndarray, velocity: float, acceleration_time: float
+) -> MotorTrajectory:
+    """Run-up start, start, end and run-down end of every line."""
+    direction = np.sign(ends - starts)
+    run = direction * abs(velocity) * acceleration_time / 2
+    positions = np.column_stack([starts - run, starts, ends, ends + run]).ravel()
+    velocities = np.full(len(positions) - 1, np.nan)
+    velocities[1::4] = direction * abs(velocity)
+    return MotorTrajectory(
+        positions=positions, velocities=velocities, accelerations=np.array([])
+    )
+
+
+def _beyond_limits(
+    values: np.ndarray, state: Mapping[str, float]
+) -> tuple[np.ndarray, str]:
+    low, high = state["low_limit_travel"], state["high_limit_travel"]
+    return ~((low < values) & (values < high)), f"limits:{low} < {high}"
+
+
+def _beyond_velocity(
+    values: np.ndarray, state: Mapping[str, float]
+) -> tuple[np.ndarray, str]:
+    max_velocity = state["max_velocity"]
+    if max_velocity <= 0:
+        return np.zeros(len(values), dtype=bool), ""
+    return np.abs(values) > max_velocity, f"max velocity:{max_velocity}"
+
+
+def _beyond_acceleration(
+    values: np.ndarray, state: Mapping[str, float]
+) -> tuple[np.ndarray, str]:
+    max_velocity, acceleration_time = state["max_velocity"], state["acceleration_time"]
+    if max_velocity <= 0 or acceleration_time <= 0:
+        return np.zeros(len(values), dtype=bool), ""
+    max_acceleration = max_velocity / acceleration_time
+    return np.abs(values) > max_acceleration, f"max acceleration:{max_acceleration}"
@@ -7,12 +7,16 @@ Bluesky plans common for S&M beamline.
 
 from .ad_plans import trigger_img
 from .alignments import (
+    AlignmentPass,
     StatPosition,
     align_slit_with_look_up,
+    coarse_to_fine_align,
+    fast_raster_and_move_fit,
     fast_scan_and_move_fit,
+    golden_search_and_move,
     step_scan_and_move_fit,
 )
-from .fast_scan import fast_scan_1d, fast_scan_grid
+from .fast_scan import TrajectoryFlyer, fast_scan_1d, fast_scan_grid
 from .grid_scan import grid_fast_scan, grid_step_scan
 
 __all__ = [
@@ -20,9 +24,14 @@ __all__ = [
     "step_scan_and_move_fit",
     "StatPosition",
     "align_slit_with_look_up",
+    "AlignmentPass",
+    "coarse_to_fine_align",
+    "golden_search_and_move",
+    "fast_raster_and_move_fit",
     "fast_scan_1d",
     "fast_scan_grid",
     "grid_fast_scan",
     "grid_step_scan",
     "trigger_img",
+    "TrajectoryFlyer",
 ]
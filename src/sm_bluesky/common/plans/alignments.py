@@ -1,21 +1,40 @@
-from collections.abc import Callable
+from collections.abc import Callable, Hashable, Mapping
 from enum import Enum
 from functools import wraps
-from typing import ParamSpec, TypeVar
+from math import ceil
+from typing import Any, ParamSpec, TypedDict, TypeVar
 
+import bluesky.plan_stubs as bps
+import numpy as np
 from bluesky import preprocessors as bpp
 from bluesky.callbacks.fitting import PeakStats
 from bluesky.plan_stubs import abs_set, read
 from bluesky.plans import scan
-from bluesky.utils import MsgGenerator, plan
-from ophyd_async.core import StandardReadable
+from bluesky.protocols import Movable
+from bluesky.utils import MsgGenerator, plan, short_uid
+from ophyd_async.core import FlyMotorInfo, StandardReadable
 from ophyd_async.epics.motor import Motor
 
-from sm_bluesky.common.math_functions import cal_range_num
-from sm_bluesky.common.plan_stubs import MotorTable
+from sm_bluesky.common.helper import StreamingPeakStats
+from sm_bluesky.common.math_functions import (
+    FIT_MODELS,
+    FitFailedError,
+    FitResult,
+    GoldenSectionSearch,
+    cal_range_num,
+    centroid_2d,
+    fit_gaussian_2d,
+    fit_peak,
+)
+from sm_bluesky.common.plan_stubs import (
+    LookUpTable,
+    LookUpTableStore,
+    as_look_up_table,
+    look_up_position,
+)
 from sm_bluesky.log import LOGGER
 
-from .fast_scan import fast_scan_1d
+from .fast_scan import fast_scan_1d, fast_scan_grid
 
 
 class StatPosition(tuple, Enum):
@@ -26,6 +45,8 @@ class StatPosition(tuple, Enum):
     MIN: Minimum value\n
     MAX: Maximum value\n
     D: Differential\n
+    GAUSS/LORENTZ/VOIGT_CEN: Centre of a least squares peak fit\n
+    EDGE: Centre of a least squares erf fit of a knife edge\n
     """
 
     COM = ("stats", "com")
@@ -36,8 +57,30 @@ class StatPosition(tuple, Enum):
     D_CEN = ("derivative_stats", "cen")
     D_MIN = ("derivative_stats", "min")
     D_MAX = ("derivative_stats", "max")
+    GAUSS_CEN = ("gaussian", "cen")
+    LORENTZ_CEN = ("lorentzian", "cen")
+    VOIGT_CEN = ("pseudo_voigt", "cen")
+    EDGE = ("erf", "cen")
 
 
+class AlignmentPass(TypedDict):
+    """Result of one pass of coarse_to_fine_align."""
+
+    scan: str
+    start: float
+    end: float
+    num: int | None
+    centre: float
+    fwhm: float
+
+
+FINE_RANGE = 3.0
+POINTS_PER_FWHM = 5
+MAX_FINE_PASSES = 3
+SEARCH_SEED_POINTS = 7
+MAX_SEARCH_READS = 50
+ALIGNMENT_STREAM = "alignment"
+
 P = ParamSpec("P")
 T = TypeVar("T")
 TCallable = Callable[
@@ -97,6 +140,7 @@ def step_scan_and_move_fit(
     start: float,
     end: float,
     num: int,
+    stop_fraction: float | None = None,
 ) -> MsgGenerator:
     """
     Perform a step scan and move to the fitted position.
@@ -117,6 +161,9 @@ def step_scan_and_move_fit(
         The ending position for the scan.
     num : int
         The number of steps in the scan.
+    stop_fraction : float, optional
+        If given, stop the scan early once the peak is bracketed and the signal
+        has stayed below this fraction of the maximum, see StreamingPeakStats.
 
     Returns
     -------
@@ -127,7 +174,15 @@ def step_scan_and_move_fit(
         f"Step scanning {motor.name} with {det.name}-{detname_suffix}\
             pro-scan move to {fitted_loc}"
     )
-    return scan([det], motor, start, end, num=num)
+    if stop_fraction is None:
+        return scan([det], motor, start, end, num=num)
+    live_stats = StreamingPeakStats(
+        motor.name, f"{det.name}-{detname_suffix}", stop_fraction=stop_fraction
+    )
+    return bpp.subs_wrapper(
+        scan([det], motor, start, end, num=num, per_step=live_stats.per_step),
+        live_stats,
+    )
 
 
 @plan
@@ -169,62 +224,474 @@ def fast_scan_and_move_fit(
     )
 
 
+@plan
+def coarse_to_fine_align(
+    det: StandardReadable,
+    motor: Motor,
+    fitted_loc: StatPosition,
+    detname_suffix: str,
+    start: float,
+    end: float,
+    motor_speed: float | None = None,
+    tolerance: float | None = None,
+    fine_range: float = FINE_RANGE,
+    points_per_fwhm: int = POINTS_PER_FWHM,
+    max_fine_passes: int = MAX_FINE_PASSES,
+    md: dict[str, Any] | None = None,
+) -> MsgGenerator[list[AlignmentPass]]:
+    """
+    Find the peak with a fast coarse scan, then step scan around it with the
+    step size set by the measured peak width until the centre stops moving.
+
+    In this plan:
+    1) fast_scan_1d from start to end, fit the centre and FWHM.
+    2) Step scan fine_range * FWHM around the centre with points_per_fwhm
+        points per FWHM, fit again.
+    3) Repeat 2) until the centre moves less than tolerance or
+        max_fine_passes is reached.
+    4) Move to the last centre in a short run of its own, which reads the
+        motor at the centre into the "alignment" stream.
+
+    Every run has the passes so far in its metadata under "alignment", so
+    the final run has the whole history, fine result included.
+
+    Parameters
+    ----------
+    det, motor, fitted_loc, detname_suffix:
+        See step_scan_and_move_fit.
+    start, end: float
+        Range of the coarse scan.
+    motor_speed: float, optional
+        Speed of the coarse scan, the current speed if None.
+    tolerance: float, optional
+        Centre stability to stop at, half a fine step if None.
+    fine_range: float
+        Width of the fine scans in units of FWHM.
+    points_per_fwhm: int
+        Density of the fine scans.
+    max_fine_passes: int
+        Maximum number of fine scans.
+    md: dict, optional
+        Metadata added to every run.
+
+    Returns
+    -------
+    list[AlignmentPass]
+        The convergence history, coarse pass first.
+    """
+    if md is None:
+        md = {}
+    history: list[AlignmentPass] = []
+
+    def pass_md() -> dict[str, Any]:
+        return {
+            **md,
+            "alignment": {"plan": "coarse_to_fine_align", "passes": list(history)},
+        }
+
+    centre, fwhm, _ = yield from _scan_and_fit(
+        fast_scan_1d([det], motor, start, end, motor_speed, md=pass_md()),
+        det,
+        motor,
+        fitted_loc,
+        detname_suffix,
+    )
+    history.append(
+        AlignmentPass(
+            scan="coarse", start=start, end=end, num=None, centre=centre, fwhm=fwhm
+        )
+    )
+    for cnt in range(max_fine_passes):
+        step = fwhm / points_per_fwhm
+        num = ceil(fine_range * points_per_fwhm) + 1
+        fine_start = centre - step * (num - 1) / 2
+        fine_end = centre + step * (num - 1) / 2
+        new_centre, fwhm, _ = yield from _scan_and_fit(
+            scan([det], motor, fine_start, fine_end, num=num, md=pass_md()),
+            det,
+            motor,
+            fitted_loc,
+            detname_suffix,
+        )
+        history.append(
+            AlignmentPass(
+                scan=f"fine {cnt + 1}",
+                start=fine_start,
+                end=fine_end,
+                num=num,
+                centre=new_centre,
+                fwhm=fwhm,
+            )
+        )
+        shift = abs(new_centre - centre)
+        centre = new_centre
+        LOGGER.info(
+            f"{motor.name} fine pass {cnt + 1}: centre {centre}, moved {shift}."
+        )
+        if shift <= (tolerance if tolerance is not None else step / 2):
+            break
+    else:
+        LOGGER.warning(
+            f"{motor.name} centre not stable after {max_fine_passes} fine passes."
+        )
+
+    @bpp.run_decorator(
+        md={"plan_name": "coarse_to_fine_align", "motors": [motor.name], **pass_md()}
+    )
+    def move_to_centre() -> MsgGenerator:
+        yield from abs_set(motor, centre, wait=True)
+        yield from bps.trigger_and_read([motor], name=ALIGNMENT_STREAM)
+
+    yield from move_to_centre()
+    return history
+
+
+@plan
+def golden_search_and_move(
+    det: StandardReadable,
+    motor: Motor,
+    detname_suffix: str,
+    start: float,
+    end: float,
+    tolerance: float,
+    seed_points: int = SEARCH_SEED_POINTS,
+    max_reads: int = MAX_SEARCH_READS,
+    md: dict[str, Any] | None = None,
+) -> MsgGenerator[float]:
+    """
+    Find a single maximum by choosing every next motor position from the
+    reads so far, see GoldenSectionSearch, and move to it.
+
+    It needs far fewer points than a linear scan for the same precision, e.g.
+    7 seed points and 14 golden steps narrow a range of 10 to 0.01, which
+    suits detectors that are cheap to read on motors that are slow to move.
+
+    Parameters
+    ----------
+    det : StandardReadable
+        The detector to use for alignment.
+    motor : Motor
+        The motor to centre.
+    detname_suffix : str
+        The suffix for the detector name.
+    start, end : float
+        The search range.
+    tolerance : float
+        Width of the final bracket around the maximum.
+    seed_points : int
+        Number of evenly spaced points to find the neighbourhood of the peak,
+        it must be dense enough to land at least one point on the peak.
+    max_reads : int
+        The search stops after this many points even if the bracket is wider
+        than tolerance.
+    md : dict, optional
+        Metadata for the run.
+
+    Returns
+    -------
+    float
+        The centre the motor was moved to.
+    """
+    search = GoldenSectionSearch(start, end, tolerance, seed_points)
+    data_key = f"{det.name}-{detname_suffix}"
+    _md = {
+        "plan_name": "golden_search_and_move",
+        "motors": [motor.name],
+        "detectors": [det.name],
+        **(md or {}),
+    }
+
+    @bpp.stage_decorator([det])
+    @bpp.run_decorator(md=_md)
+    def inner_golden_search() -> MsgGenerator:
+        while (position := search.ask()) is not None:
+            if len(search.positions) >= max_reads:
+                LOGGER.warning(f"{motor.name} search stopped after {max_reads} reads.")
+                break
+            yield from bps.mv(motor, position)
+            reading = yield from bps.trigger_and_read([det, motor])
+            if data_key not in reading:
+                raise ValueError(f"{data_key} is not read by {det.name}.")
+            search.tell(position, float(reading[data_key]["value"]))
+
+    yield from inner_golden_search()
+    centre = search.result
+    LOGGER.info(
+        f"{motor.name} maximum of {data_key} at {centre}"
+        f" after {len(search.positions)} reads."
+    )
+    yield from abs_set(motor, centre, wait=True)
+    return centre
+
+
+@plan
+def fast_raster_and_move_fit(
+    det: StandardReadable,
+    step_motor: Motor,
+    scan_motor: Motor,
+    fitted_loc: StatPosition,
+    detname_suffix: str,
+    step_start: float,
+    step_end: float,
+    num_step: int,
+    scan_start: float,
+    scan_end: float,
+    motor_speed: float | None = None,
+    snake_axes: bool = True,
+    setup_moves: Mapping[Movable, Any] | None = None,
+    group: Hashable | None = None,
+    md: dict[str, Any] | None = None,
+) -> MsgGenerator[tuple[float, float]]:
+    """
+    Find the centre of a beam in two axes at once with a fast raster, see
+    fast_scan_grid, and move both motors to it.
+
+    Other moves needed before the raster, e.g. setting slit gaps, are started
+    together with the move of both motors to the run-up start of the first
+    line, so the raster begins as soon as the slowest of them is done.
+
+    Parameters
+    ----------
+    det : StandardReadable
+        The detector to use for alignment.
+    step_motor, scan_motor : Motor
+        The motors stepped between lines and flown along each line.
+    fitted_loc : StatPosition
+        StatPosition.COM for the centroid or StatPosition.GAUSS_CEN for a 2D
+        Gaussian fit, see centroid_2d and fit_gaussian_2d.
+    detname_suffix : str
+        The suffix for the detector name.
+    step_start, step_end : float
+        Range of the step motor.
+    num_step : int
+        Number of lines.
+    scan_start, scan_end : float
+        Range of the scan motor.
+    motor_speed : float, optional
+        Speed of the scan motor, the current speed if None.
+    snake_axes : bool
+        Fly every other line backwards, saving the return move.
+    setup_moves : Mapping[Movable, Any], optional
+        Moves to finish before the first line.
+    group : Hashable, optional
+        Bluesky group for the set up moves, moves already started in it also
+        finish before the first line.
+    md : dict, optional
+        Metadata for the run.
+
+    Returns
+    -------
+    tuple[float, float]
+        The step motor and scan motor centres the motors were moved to.
+    """
+    if fitted_loc not in (StatPosition.COM, StatPosition.GAUSS_CEN):
+        raise ValueError(
+            f"Raster alignment only supports COM and GAUSS_CEN, got {fitted_loc}."
+        )
+    data_key = f"{det.name}-{detname_suffix}"
+    data: dict[str, list[float]] = {
+        key: [] for key in (step_motor.name, scan_motor.name, data_key)
+    }
+
+    def collect(name: str, doc: dict[str, Any]) -> None:
+        if name == "event" and all(key in doc["data"] for key in data):
+            for key, values in data.items():
+                values.append(float(doc["data"][key]))
+
+    speed: float = motor_speed or (yield from bps.rd(scan_motor.velocity))
+    if group is None:
+        group = short_uid("raster_setup")
+    for device, value in (setup_moves or {}).items():
+        yield from abs_set(device, value, group=group)
+    yield from abs_set(step_motor, step_start, group=group)
+    yield from bps.prepare(
+        scan_motor,
+        FlyMotorInfo(
+            start_position=scan_start,
+            end_position=scan_end,
+            time_for_move=abs(scan_end - scan_start) / speed,
+        ),
+        group=group,
+    )
+    LOGGER.info(f"Waiting for set up moves before raster of {data_key}.")
+    yield from bps.wait(group=group)
+    yield from bpp.subs_wrapper(
+        fast_scan_grid(
+            [det],
+            step_motor,
+            step_start,
+            step_end,
+            num_step,
+            scan_motor,
+            scan_start,
+            scan_end,
+            motor_speed=speed,
+            snake_axes=snake_axes,
+            md=md,
+        ),
+        collect,
+    )
+    if not data[data_key]:
+        raise FitFailedError("Fitting failed, check devices name are correct.")
+    step_data, scan_data, signal = data.values()
+    if fitted_loc is StatPosition.GAUSS_CEN:
+        fit = fit_gaussian_2d(step_data, scan_data, signal)
+        LOGGER.info(f"2D gaussian fit {fit['params']} errors {fit['errors']}")
+        step_centre, scan_centre = fit["cen"]
+    else:
+        step_centre, scan_centre = centroid_2d(step_data, scan_data, signal)
+    if not (
+        min(step_data) <= step_centre <= max(step_data)
+        and min(scan_data) <= scan_centre <= max(scan_data)
+    ):
+        raise FitFailedError("Fitting failed, no peak within scan range.")
+    LOGGER.info(
+        f"{data_key} centre at {step_motor.name} = {step_centre},"
+        f" {scan_motor.name} = {scan_centre}."
+    )
+    group = short_uid("raster_centre")
+    yield from abs_set(step_motor, step_centre, group=group)
+    yield from abs_set(scan_motor, scan_centre, group=group)
+    yield from bps.wait(group=group)
+    return step_centre, scan_centre
+
+
+def _scan_and_fit(
+    scan_plan: MsgGenerator,
+    det: StandardReadable,
+    motor: Motor,
+    fitted_loc: StatPosition,
+    detname_suffix: str,
+) -> MsgGenerator[tuple[float, float, float | None]]:
+    """Run the scan with a PeakStats callback, return the fitted position, the
+    FWHM and the centre error of least squares fits."""
+    ps = PeakStats(
+        f"{motor.name}", f"{det.name}-{detname_suffix}", calc_derivative_and_stats=True
+    )
+    yield from bpp.subs_wrapper(scan_plan, ps)
+    if fitted_loc.value[0] in FIT_MODELS:
+        fit = _fit(ps, fitted_loc)
+        return fit["cen"], fit["fwhm"], fit["cen_error"]
+    position = get_stat_loc(ps, fitted_loc)
+    return position, float(ps[fitted_loc.value[0]]._asdict()["fwhm"]), None
+
+
 def get_stat_loc(ps: PeakStats, loc: StatPosition) -> float:
     """Helper to check the fit was done correctly and
     return requested stats position."""
+    if loc.value[0] in FIT_MODELS:
+        return _fit(ps, loc)["cen"]
     peak_stat = ps[loc.value[0]]
     if not peak_stat:
-        raise ValueError("Fitting failed, check devices name are correct.")
+        raise FitFailedError("Fitting failed, check devices name are correct.")
     peak_stat = peak_stat._asdict()
 
     if not peak_stat["fwhm"]:
-        raise ValueError("Fitting failed, no peak within scan range.")
+        raise FitFailedError("Fitting failed, no peak within scan range.")
 
     stat_pos = peak_stat[loc.value[1]]
     return stat_pos if isinstance(stat_pos, float) else stat_pos[0]
 
 
+def _fit(ps: PeakStats, loc: StatPosition) -> FitResult:
+    """Least squares fit of the scan data collected by PeakStats."""
+    if not ps["stats"]:
+        raise FitFailedError("Fitting failed, check devices name are correct.")
+    fit = fit_peak(ps.x_data, ps.y_data, model=loc.value[0])
+    LOGGER.info(f"{fit['model']} fit {fit['params']} errors {fit['errors']}")
+    stat_pos = fit["cen"]
+    if (
+        not np.isfinite(stat_pos)
+        or not fit["fwhm"]
+        or not min(ps.x_data) <= stat_pos <= max(ps.x_data)
+    ):
+        raise FitFailedError("Fitting failed, no peak within scan range.")
+    return fit
+
+
 @plan
 def align_slit_with_look_up(
     motor: Motor,
     size: float,
-    slit_table: dict[str, float],
+    slit_table: dict[str, float] | LookUpTableStore | LookUpTable,
     det: StandardReadable,
     centre_type: StatPosition,
-) -> MsgGenerator:
+    group: Hashable | None = None,
+) -> MsgGenerator[float]:
     """Perform a step scan with therange and starting motor position
       given/calculated by using a look up table(dictionary).
       Move to the peak position after the scan and update the lookup table.
 
+    If the table is a LookUpTableStore with a refined entry for the size, the
+    scan only covers FINE_RANGE times the FWHM of the last fit around the last
+    centre with POINTS_PER_FWHM points per FWHM, when that is smaller. The new
+    centre is recorded in the store with the FWHM and centre error of the fit.
+
     Parameters
     ----------
     motor: Motor
         Motor devices that is being centre.
     size: float,
         The size/name in the motor_table.
-    motor_table: dict[str, float],
+    slit_table: dict[str, float] | LookUpTableStore | LookUpTable,
         Look up table for motor position, the str part should be the size of
-        the slit in um.
+        the slit in um. An interpolating LookUpTable gives a starting centre
+        for sizes between its entries, it is not updated.
     det: StandardReadable,
         Detector to be use for alignment.
     centre_type: StatPosition
         Which fitted position to move to see StatPosition.
+    group: Hashable | None = None
+        If given, the motor moves to the scan start in this group and moves
+        already started in it, e.g. opening other slits, finish before the
+        scan.
+
+    Returns
+    -------
+    float
+        The refined centre.
     """
-    MotorTable.model_validate(slit_table)
-    if str(int(size)) in slit_table:
-        start_pos, end_pos, num = cal_range_num(
-            cen=slit_table[str(size)], range=size / 1000 * 3, size=size / 5000.0
-        )
-    else:
-        raise ValueError(f"Size of {size} is not in {slit_table.keys}")
-    yield from step_scan_and_move_fit(
-        det=det,
-        motor=motor,
-        start=start_pos,
-        detname_suffix="value",
-        end=end_pos,
-        fitted_loc=centre_type,
-        num=num,
+    key = str(int(size))
+    table = as_look_up_table(slit_table)
+    try:
+        centre = look_up_position(table, size)
+    except ValueError as e:
+        raise ValueError(f"Size of {size} is not in {list(slit_table.keys())}") from e
+    entry = None
+    if isinstance(slit_table, LookUpTableStore):
+        entry = slit_table.entry(key)
+    start_pos, end_pos, num = cal_range_num(
+        cen=centre, range=size / 1000 * 3, size=size / 5000.0
+    )
+    if entry is not None and entry["fwhm"]:
+        fine_num = ceil(FINE_RANGE * POINTS_PER_FWHM) + 1
+        half_range = entry["fwhm"] / POINTS_PER_FWHM * (fine_num - 1) / 2
+        if 2 * half_range < abs(end_pos - start_pos):
+            LOGGER.info(
+                f"Scanning {motor.name} around centre version {entry['version']}"
+                f" from {entry['timestamp']}."
+            )
+            start_pos = entry["centre"] - half_range
+            end_pos = entry["centre"] + half_range
+            num = fine_num
+    if group is not None:
+        yield from abs_set(motor, start_pos, group=group)
+        yield from bps.wait(group=group)
+    LOGGER.info(
+        f"Step scanning {motor.name} with {det.name}-value move to {centre_type}"
+    )
+    centre, fwhm, cen_error = yield from _scan_and_fit(
+        scan([det], motor, start_pos, end_pos, num=num),
+        det,
+        motor,
+        centre_type,
+        "value",
     )
+    yield from abs_set(motor, centre, wait=True)
     temp = yield from read(motor.user_readback)
-    slit_table[str(size)] = temp[f"{motor.name}"]["value"]
+    position = temp[f"{motor.name}"]["value"]
+    if isinstance(slit_table, LookUpTableStore):
+        slit_table.record(key, position, fwhm=fwhm, cen_error=cen_error)
+    elif isinstance(slit_table, dict):
+        slit_table[key] = position
+    return position
@@ -1,21 +1,81 @@
-from typing import Any
+from math import ceil
+from time import time
+from typing import Any, Protocol, TypedDict
 
 import bluesky.plan_stubs as bps
 import bluesky.preprocessors as bpp
 from bluesky.preprocessors import (
     finalize_wrapper,
 )
-from bluesky.protocols import Readable
-from bluesky.utils import MsgGenerator, plan, short_uid
+from bluesky.protocols import (
+    Flyable,
+    Preparable,
+    Readable,
+    Reading,
+    Status,
+    Triggerable,
+)
+from bluesky.utils import (
+    MsgGenerator,
+    RunEngineControlException,
+    make_decorator,
+    plan,
+    short_uid,
+)
 from dodal.plan_stubs.data_session import attach_data_session_metadata_decorator
+from event_model import DataKey
 from numpy import linspace
-from ophyd_async.core import FlyMotorInfo
+from ophyd_async.core import (
+    DetectorTrigger,
+    FlyMotorInfo,
+    StandardDetector,
+    TriggerInfo,
+)
 from ophyd_async.epics.motor import Motor
+from ophyd_async.epics.pmac import PmacScanInfo
+from scanspec.specs import Fly, Linspace, Spec
 
 from sm_bluesky.common.helper import add_extra_names_to_meta
-from sm_bluesky.common.plan_stubs import check_within_limit
+from sm_bluesky.common.math_functions import cal_trigger_table
+from sm_bluesky.common.plan_stubs import (
+    MOTOR_SETPOINT_ATTRS,
+    MOTOR_STATE_ATTRS,
+    check_trajectory_within_limit,
+    check_trajectory_within_snapshot_limit,
+    fly_line_trajectory,
+    grid_trajectory,
+    plan_time,
+    read_device_state,
+)
 from sm_bluesky.log import LOGGER
 
+FLY_STREAM = "primary"
+SAMPLE_RATE_STREAM = "sample_rate"
+FLY_POSITIONS_STREAM = "fly_positions"
+TRAJECTORY_FLUSH_PERIOD = 0.5
+
+
+class SampleRate(TypedDict):
+    """Book keeping for rate limited software triggering."""
+
+    requested_period: float
+    reads: int
+    intervals: int
+    skipped: int
+    elapsed: float
+
+
+class DetectorGroup(TypedDict):
+    """Detectors that are triggered and read together on their own cadence."""
+
+    dets: list[Readable]
+    period: float
+
+
+class TrajectoryFlyer(Flyable, Preparable, Protocol):
+    """A motion controller that flies a scanspec trajectory in one move,
+    e.g. PmacTrajectoryTriggerLogic or SimTrajectoryController."""
+
 
 @plan
 @attach_data_session_metadata_decorator()
@@ -25,6 +85,10 @@ def fast_scan_1d(
     start: float,
     end: float,
     motor_speed: float | None = None,
+    num_points: int | None = None,
+    sample_period: float | None = None,
+    target_spacing: float | None = None,
+    det_groups: dict[str, DetectorGroup] | None = None,
     md: dict[str, Any] | None = None,
 ) -> MsgGenerator:
     """
@@ -43,6 +107,21 @@ def fast_scan_1d(
     motor_speed : Optional[float], optional
         The speed of the motor during the scan. If None,
         the motor's current speed is used.
+    num_points : Optional[int], optional
+        If given, the detectors are hardware timed to take this many evenly
+        spaced points and collected at the end of the line, see _fly_scan_1d.
+        If None, the detectors are software triggered.
+    sample_period : Optional[float], optional
+        Minimum time in seconds between software triggered reads. The
+        achieved rate is read into the sample_rate stream at the end.
+    target_spacing : Optional[float], optional
+        Minimum motor distance between software triggered reads, converted
+        to a sample period using the motor speed.
+    det_groups : Optional[dict[str, DetectorGroup]], optional
+        Extra detectors that are triggered and read on their own period into
+        a stream named by the key, without waiting for dets. Every stream
+        includes the motor position so they can be aligned afterwards, see
+        StreamAligner.
 
     Returns
     -------
@@ -50,11 +129,14 @@ def fast_scan_1d(
         A Bluesky generator for the scan.
     """
 
-    if md is None:
-        md = {}
+    md = dict(md or {})
+    if num_points is not None:
+        check_flyable(dets)
+    sample_rate = make_sample_rate(md, sample_period, target_spacing)
+    check_det_groups(det_groups)
 
-    @bpp.stage_decorator(dets)
-    @bpp.run_decorator(md=md)
+    @bpp.stage_decorator(dets + group_dets(det_groups))
+    @sampled_run_decorator(md=md, sample_rate=sample_rate)
     def inner_fast_scan_1d(
         dets: list[Any],
         motor: Motor,
@@ -62,8 +144,43 @@ def fast_scan_1d(
         end: float,
         motor_speed: float | None = None,
     ):
-        yield from check_within_limit([start, end], motor)
-        yield from _fast_scan_1d(dets, motor, start, end, motor_speed)
+        states = yield from read_device_state(
+            [motor], MOTOR_STATE_ATTRS, uncached=MOTOR_SETPOINT_ATTRS
+        )
+        state = states[motor.name]
+        check_trajectory_within_snapshot_limit(
+            {
+                motor: fly_line_trajectory(
+                    start,
+                    end,
+                    motor_speed or state["velocity"],
+                    state["acceleration_time"],
+                )
+            },
+            states,
+        )
+        if num_points is None:
+            yield from _fast_scan_1d(
+                dets,
+                motor,
+                start,
+                end,
+                motor_speed,
+                target_spacing,
+                sample_rate,
+                det_groups,
+            )
+        else:
+            yield from _fly_scan_1d(
+                dets,
+                motor,
+                start,
+                end,
+                num_points,
+                motor_speed,
+                declare_stream=True,
+                acceleration_time=state["acceleration_time"],
+            )
 
     yield from finalize_wrapper(
         plan=inner_fast_scan_1d(dets, motor, start, end, motor_speed),
@@ -84,6 +201,11 @@ def fast_scan_grid(
     scan_end: float,
     motor_speed: float | None = None,
     snake_axes: bool = False,
+    num_points: int | None = None,
+    sample_period: float | None = None,
+    target_spacing: float | None = None,
+    det_groups: dict[str, DetectorGroup] | None = None,
+    trajectory: TrajectoryFlyer | None = None,
     md: dict[str, Any] | None = None,
 ) -> MsgGenerator:
     """
@@ -112,17 +234,37 @@ def fast_scan_grid(
         If None, it will use current speed.
     snake_axes:
         If Ture. Scan motor will start an other line where it ended.
+    num_points: int optional.
+        If given, the detectors are hardware timed to take this many evenly
+        spaced points per line. If None, the detectors are software triggered.
+    sample_period: float optional.
+        Minimum time in seconds between software triggered reads.
+    target_spacing: float optional.
+        Minimum scan motor distance between software triggered reads.
+    det_groups: dict[str, DetectorGroup] optional.
+        Extra detectors read on their own period into their own stream.
+    trajectory: TrajectoryFlyer optional.
+        If given, the whole grid is flown as one continuous PVT trajectory
+        by this motion controller, see _trajectory_scan_grid. Requires
+        num_points and detectors that take edge triggers from it.
     md:
         place holder for meta data for future.
 
     """
-    if md is None:
-        md = {}
+    md = dict(md or {})
+    if trajectory is not None and num_points is None:
+        raise ValueError("Trajectory scan requires num_points.")
+    if num_points is not None:
+        check_flyable(dets)
+    sample_rate = make_sample_rate(md, sample_period, target_spacing)
+    check_det_groups(det_groups)
     md = add_extra_names_to_meta(md, "detectors", [det.name for det in dets])
     md = add_extra_names_to_meta(md, "motors", [scan_motor.name, step_motor.name])
 
-    @bpp.stage_decorator(dets)
-    @bpp.run_decorator(md=md)
+    trajectory_flyer = [trajectory] if trajectory is not None else []
+
+    @bpp.stage_decorator(dets + group_dets(det_groups) + trajectory_flyer)
+    @sampled_run_decorator(md=md, sample_rate=sample_rate)
     def inner_fast_scan_grid(
         dets: list[Any],
         step_motor: Motor,
@@ -135,34 +277,63 @@ def fast_scan_grid(
         motor_speed: float | None = None,
         snake_axes: bool = False,
     ):
-        yield from check_within_limit([step_start, step_end], step_motor)
-        yield from check_within_limit([scan_start, scan_end], scan_motor)
+        if trajectory is not None and num_points is not None:
+            yield from _trajectory_scan_grid(
+                dets,
+                trajectory,
+                step_motor,
+                step_start,
+                step_end,
+                num_step,
+                scan_motor,
+                scan_start,
+                scan_end,
+                num_points,
+                motor_speed,
+                snake_axes,
+            )
+            return
         steps = linspace(step_start, step_end, num_step, endpoint=True)
-        if snake_axes:
-            for cnt, step in enumerate(steps):
-                yield from bps.abs_set(step_motor, step)
-                if cnt % 2 == 0:
-                    yield from _fast_scan_1d(
-                        dets + [step_motor],
-                        scan_motor,
-                        scan_start,
-                        scan_end,
-                        motor_speed,
-                    )
-                else:
-                    yield from _fast_scan_1d(
-                        dets + [step_motor],
-                        scan_motor,
-                        scan_end,
-                        scan_start,
-                        motor_speed,
-                    )
-        else:
-            for step in steps:
-                yield from bps.abs_set(step_motor, step)
-                yield from _fast_scan_1d(
-                    dets + [step_motor], scan_motor, scan_start, scan_end, motor_speed
+        states = yield from read_device_state(
+            [step_motor, scan_motor], MOTOR_STATE_ATTRS, uncached=MOTOR_SETPOINT_ATTRS
+        )
+        scan_state = states[scan_motor.name]
+        check_trajectory_within_snapshot_limit(
+            grid_trajectory(
+                step_motor,
+                steps,
+                scan_motor,
+                scan_start,
+                scan_end,
+                motor_speed or scan_state["velocity"],
+                scan_state["acceleration_time"],
+                snake_axes,
+            ),
+            states,
+        )
+        line_groups = None
+        if det_groups:
+            line_groups = {
+                name: DetectorGroup(
+                    dets=group["dets"] + [step_motor], period=group["period"]
                 )
+                for name, group in det_groups.items()
+            }
+        yield from _fast_scan_grid_lines(
+            dets,
+            step_motor,
+            list(steps),
+            scan_motor,
+            scan_start,
+            scan_end,
+            motor_speed,
+            snake_axes,
+            num_points,
+            target_spacing,
+            sample_rate,
+            line_groups,
+            scan_state["acceleration_time"],
+        )
 
     yield from finalize_wrapper(
         plan=inner_fast_scan_grid(
@@ -194,6 +365,191 @@ def clean_up():
     yield from bps.null()
 
 
+def check_flyable(dets: list[Any]) -> None:
+    """Check all detectors can be hardware timed and collected."""
+    not_flyable = [det.name for det in dets if not isinstance(det, StandardDetector)]
+    if not_flyable:
+        raise ValueError(
+            f"Hardware timed fast scan requires StandardDetector, got {not_flyable}"
+        )
+
+
+def check_det_groups(det_groups: dict[str, DetectorGroup] | None) -> None:
+    """Check detector groups have their own stream and a valid period."""
+    if not det_groups:
+        return
+    if FLY_STREAM in det_groups:
+        raise ValueError(f"Stream name '{FLY_STREAM}' is reserved for dets.")
+    if SAMPLE_RATE_STREAM in det_groups:
+        raise ValueError(f"Stream name '{SAMPLE_RATE_STREAM}' is reserved.")
+    for name, group in det_groups.items():
+        if group["period"] < 0:
+            raise ValueError(f"Detector group {name} period must not be negative.")
+
+
+def group_dets(det_groups: dict[str, DetectorGroup] | None) -> list[Readable]:
+    """All the detectors in the detector groups."""
+    if not det_groups:
+        return []
+    return [det for group in det_groups.values() for det in group["dets"]]
+
+
+def make_sample_rate(
+    md: dict[str, Any],
+    sample_period: float | None = None,
+    target_spacing: float | None = None,
+) -> SampleRate | None:
+    """Record the requested read rate in the metadata and start book keeping."""
+    if sample_period is not None and target_spacing is not None:
+        raise ValueError("Only one of sample_period and target_spacing can be given.")
+    if sample_period is None and target_spacing is None:
+        return None
+    if sample_period is not None:
+        if sample_period <= 0:
+            raise ValueError(f"sample_period must be positive, got {sample_period}")
+        md["sample_period"] = sample_period
+    elif target_spacing is not None:
+        if target_spacing <= 0:
+            raise ValueError(f"target_spacing must be positive, got {target_spacing}")
+        md["target_spacing"] = target_spacing
+    return {
+        "requested_period": sample_period or 0.0,
+        "reads": 0,
+        "intervals": 0,
+        "skipped": 0,
+        "elapsed": 0.0,
+    }
+
+
+def sampled_run_wrapper(
+    plan: MsgGenerator,
+    md: dict[str, Any] | None = None,
+    sample_rate: SampleRate | None = None,
+) -> MsgGenerator:
+    """
+    Same as bluesky run_wrapper but, after a successful plan, read the
+    achieved software trigger rate against the requested rate into the
+    SAMPLE_RATE_STREAM stream before closing the run.
+    """
+    rs_uid = yield from bps.open_run(md)
+
+    def except_plan(e: Exception) -> MsgGenerator:
+        if isinstance(e, RunEngineControlException):
+            yield from bps.close_run(exit_status=e.exit_status)  # type: ignore
+        else:
+            yield from bps.close_run(exit_status="fail", reason=str(e))
+
+    def else_plan() -> MsgGenerator:
+        if sample_rate is not None:
+            LOGGER.info(sample_rate_report(sample_rate))
+            yield from bps.trigger_and_read(
+                [SampleRateReadout(sample_rate)], name=SAMPLE_RATE_STREAM
+            )
+        yield from bps.close_run()
+
+    yield from bpp.contingency_wrapper(
+        plan, except_plan=except_plan, else_plan=else_plan
+    )
+    return rs_uid
+
+
+sampled_run_decorator = make_decorator(sampled_run_wrapper)
+
+
+def sample_rate_summary(sample_rate: SampleRate) -> dict[str, float]:
+    """Achieved and requested read rate in Hz, with the read and skip counts."""
+    requested = sample_rate["requested_period"]
+    if sample_rate["elapsed"] > 0:
+        achieved_hz = sample_rate["intervals"] / sample_rate["elapsed"]
+    else:
+        achieved_hz = 0.0
+    return {
+        "achieved_hz": achieved_hz,
+        "requested_hz": 1 / requested if requested else 0.0,
+        "reads": sample_rate["reads"],
+        "skipped": sample_rate["skipped"],
+    }
+
+
+def sample_rate_report(sample_rate: SampleRate) -> str:
+    """Summarise achieved and requested read rate."""
+    summary = sample_rate_summary(sample_rate)
+    return (
+        f"Achieved {summary['achieved_hz']:.3g} Hz, "
+        f"requested {summary['requested_hz']:.3g} Hz, "
+        f"{summary['reads']} reads, {summary['skipped']} skipped."
+    )
+
+
+class SampleRateReadout:
+    """Readable view of the sample_rate_summary of a SampleRate."""
+
+    def __init__(self, sample_rate: SampleRate, name: str = "sample_rate") -> None:
+        self.sample_rate = sample_rate
+        self._name = name
+        self.parent = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def read(self) -> dict[str, Reading]:
+        timestamp = time()
+        return {
+            f"{self.name}-{key}": {"value": value, "timestamp": timestamp}
+            for key, value in sample_rate_summary(self.sample_rate).items()
+        }
+
+    def describe(self) -> dict[str, DataKey]:
+        return {
+            f"{self.name}-{key}": {
+                "source": f"plan:{self.name}",
+                "dtype": "number" if isinstance(value, float) else "integer",
+                "shape": [],
+            }
+            for key, value in sample_rate_summary(self.sample_rate).items()
+        }
+
+
+class TriggerTableReadout:
+    """
+    Readable view of the trigger table of one hardware timed line, frame n of
+    the line was taken at index n of the scan motor positions. Other values,
+    e.g. the step motor position of a grid line, are single numbers. One
+    readout is kept for the run and its table replaced for every line.
+    """
+
+    def __init__(
+        self,
+        table: dict[str, list[float] | float] | None = None,
+        name: str = FLY_POSITIONS_STREAM,
+    ) -> None:
+        self.table = table or {}
+        self._name = name
+        self.parent = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def read(self) -> dict[str, Reading]:
+        timestamp = time()
+        return {
+            f"{self.name}-{key}": {"value": value, "timestamp": timestamp}
+            for key, value in self.table.items()
+        }
+
+    def describe(self) -> dict[str, DataKey]:
+        return {
+            f"{self.name}-{key}": {
+                "source": f"plan:{self.name}",
+                "dtype": "array" if isinstance(value, list) else "number",
+                "shape": [len(value)] if isinstance(value, list) else [],
+            }
+            for key, value in self.table.items()
+        }
+
+
 @plan
 def _fast_scan_1d(
     dets: list[Any],
@@ -201,6 +557,9 @@ def _fast_scan_1d(
     start: float,
     end: float,
     motor_speed: float | None = None,
+    target_spacing: float | None = None,
+    sample_rate: SampleRate | None = None,
+    det_groups: dict[str, DetectorGroup] | None = None,
 ) -> MsgGenerator:
     """
     The logic for one axis fast scan, used in fast_scan_1d and fast_scan_grid
@@ -231,6 +590,15 @@ def _fast_scan_1d(
 
     motor_speed: Optional[float] = None,
         The speed of the motor during scan
+    target_spacing: Optional[float] = None,
+        Minimum motor distance between reads, it sets the sample period of
+        sample_rate using the motor speed.
+    sample_rate: Optional[SampleRate] = None,
+        If given, reads are scheduled on PLAN_CLOCK at the requested
+        period, reads that fall behind skip to the next free slot.
+    det_groups: Optional[dict[str, DetectorGroup]] = None,
+        If given, dets and each group are triggered concurrently on their own
+        period, see _read_det_groups.
     """
 
     # read the current speed and store it
@@ -252,22 +620,567 @@ def _fast_scan_1d(
         )
 
         grp = short_uid("prepare")
-        fly_info = FlyMotorInfo(
-            start_position=start,
-            end_position=end,
-            time_for_move=abs(start - end) / motor_speed,
-        )
-        yield from bps.prepare(motor, fly_info, group=grp, wait=True)
+        yield from _prepare_line(motor, start, end, motor_speed, group=grp)
         yield from bps.wait(group=grp)
         yield from bps.kickoff(motor, group=grp, wait=True)
         LOGGER.info(f"flying motor =  {motor.name} at speed = {motor_speed}")
-        done = yield from bps.complete(motor)
+        yield from _read_line(
+            dets, motor, motor_speed, target_spacing, sample_rate, det_groups
+        )
+
+    yield from finalize_wrapper(
+        plan=inner_fast_scan_1d(dets, motor, start, end, motor_speed),
+        final_plan=reset_speed(old_speed, motor),
+    )
+
+
+def _prepare_line(
+    motor: Motor,
+    start: float,
+    end: float,
+    motor_speed: float,
+    group: str,
+) -> MsgGenerator:
+    """Move the motor to the run-up position and set the fly velocity."""
+    fly_info = FlyMotorInfo(
+        start_position=start,
+        end_position=end,
+        time_for_move=abs(start - end) / motor_speed,
+    )
+    yield from bps.prepare(motor, fly_info, group=group)
+
+
+def _read_line(
+    dets: list[Any],
+    motor: Motor,
+    motor_speed: float,
+    target_spacing: float | None = None,
+    sample_rate: SampleRate | None = None,
+    det_groups: dict[str, DetectorGroup] | None = None,
+) -> MsgGenerator:
+    """Software trigger and read the detectors until the kicked off motor is done."""
+    done = yield from bps.complete(motor)
+    if target_spacing is not None and sample_rate is not None:
+        sample_rate["requested_period"] = target_spacing / motor_speed
+    if det_groups:
+        period = sample_rate["requested_period"] if sample_rate else 0.0
+        groups = {FLY_STREAM: DetectorGroup(dets=dets, period=period)}
+        groups.update(det_groups)
+        reads, span = yield from _read_det_groups(groups, motor, done)
+        if sample_rate is not None:
+            sample_rate["reads"] += reads[FLY_STREAM]
+            sample_rate["intervals"] += max(reads[FLY_STREAM] - 1, 0)
+            sample_rate["elapsed"] += span.get(FLY_STREAM, 0.0)
+        return
+    if sample_rate is None:
         yield from bps.trigger_and_read(dets + [motor])
         while not done.done:
             yield from bps.trigger_and_read(dets + [motor])
             yield from bps.checkpoint()
+        return
+    period = sample_rate["requested_period"]
+    line_start = last_read = next_read = plan_time()
+    yield from bps.trigger_and_read(dets + [motor])
+    reads = 1
+    while not done.done:
+        next_read += period
+        now = plan_time()
+        if now > next_read:
+            # The last read overran the period, drop the slots it covered.
+            missed = ceil((now - next_read) / period)
+            sample_rate["skipped"] += missed
+            next_read += missed * period
+        yield from bps.sleep(next_read - now)
+        if done.done:
+            break
+        last_read = plan_time()
+        yield from bps.trigger_and_read(dets + [motor])
+        yield from bps.checkpoint()
+        reads += 1
+    sample_rate["reads"] += reads
+    sample_rate["intervals"] += reads - 1
+    sample_rate["elapsed"] += last_read - line_start
+
+
+def _read_det_groups(
+    groups: dict[str, DetectorGroup], motor: Motor, done: Status
+) -> MsgGenerator[tuple[dict[str, int], dict[str, float]]]:
+    """
+    Trigger and read each detector group on its own period until done.
+
+    Triggers are issued without waiting, so a slow detector in one group does
+    not hold up the others. Once all triggers of a group have finished the
+    group is read, together with the motor, into the stream of the same name.
+    Every group is read at least once. In between, the plan waits on the
+    triggers of the pending group with the shortest period, or sleeps, until
+    the next group is due.
+
+    Returns
+    -------
+    tuple[dict[str, int], dict[str, float]]
+        Number of reads per stream and time between first and last read.
+    """
+    next_due = dict.fromkeys(groups, plan_time())
+    pending: dict[str, str] = {}
+    reads = dict.fromkeys(groups, 0)
+    first_read: dict[str, float] = {}
+    last_read: dict[str, float] = {}
+    while True:
+        for name, group in groups.items():
+            if name in pending:
+                continue
+            now = plan_time()
+            if name in first_read and (done.done or now < next_due[name]):
+                continue
+            first_read.setdefault(name, now)
+            last_read[name] = now
+            # Skip any slots missed while the previous trigger was running.
+            next_due[name] = max(next_due[name] + group["period"], now)
+            pending[name] = short_uid(name)
+            for obj in group["dets"]:
+                if isinstance(obj, Triggerable):
+                    yield from bps.trigger(obj, group=pending[name])
+        for name in list(pending):
+            finished = yield from bps.wait(
+                pending[name], timeout=0, error_on_timeout=False
+            )
+            if finished:
+                del pending[name]
+                yield from bps.create(name=name)
+                for obj in groups[name]["dets"] + [motor]:
+                    yield from bps.read(obj)
+                yield from bps.save()
+                reads[name] += 1
+        if done.done and not pending:
+            break
+        idle_due = [due for name, due in next_due.items() if name not in pending]
+        wake = max(min(idle_due) - plan_time(), 0) if idle_due else None
+        if pending:
+            fastest = min(pending, key=lambda name: groups[name]["period"])
+            yield from bps.wait(
+                pending[fastest],
+                timeout=None if done.done else wake,
+                error_on_timeout=False,
+            )
+        elif wake is not None:
+            yield from bps.checkpoint()
+            yield from bps.sleep(wake)
+    span = {name: last_read[name] - first_read[name] for name in first_read}
+    return reads, span
+
+
+@plan
+def _fly_scan_1d(
+    dets: list[StandardDetector],
+    motor: Motor,
+    start: float,
+    end: float,
+    num_points: int,
+    motor_speed: float | None = None,
+    declare_stream: bool = False,
+    acceleration_time: float | None = None,
+) -> MsgGenerator:
+    """
+    The hardware timed alternative to _fast_scan_1d.
+
+    In this scan:
+    1) A trigger table of evenly spaced points is calculated from the line
+        length, motor speed and the slowest detector deadtime.
+    2) The detectors are armed with the trigger table and the motor moves to
+        the run-up position, both at the same time.
+    3) The motor is set in motion and the detectors are kicked off once the
+        motor is up to speed.
+    4) When both are complete the frames are collected in bulk and the
+        trigger positions of the line are read into the fly_positions stream.
+    5) Clean up, reset motor speed.
+
+    Note: The detectors time their own exposures so the point spacing depends
+    on the motor keeping a constant speed rather than on the RunEngine.
+
+    Parameters
+    ----------
+    dets : list[StandardDetector]
+        Detectors that can be prepared, kicked off and collected.
+    motor : Motor (moveable, readable)
+
+    start: float
+        starting position.
+    end: float,
+        ending position
+    num_points: int
+        Number of points to take along the line.
+    motor_speed: Optional[float] = None,
+        The speed of the motor during scan
+    declare_stream: bool = False,
+        If True, declare the collect stream, it must be done once per run
+        after the detectors are prepared.
+    acceleration_time: Optional[float] = None,
+        The motor acceleration time if already known, e.g. from
+        read_device_state, otherwise it is read.
+    """
+
+    old_speed: float = yield from bps.rd(motor.velocity)
+    run_up_time: float = (
+        (yield from bps.rd(motor.acceleration_time))
+        if acceleration_time is None
+        else acceleration_time
+    )
+
+    def inner_fly_scan_1d(
+        dets: list[StandardDetector],
+        motor: Motor,
+        start: float,
+        end: float,
+        num_points: int,
+        motor_speed: float | None = None,
+    ):
+        if not motor_speed:
+            motor_speed = old_speed
+        trigger_info = yield from _fly_trigger_info(
+            dets, start, end, num_points, motor_speed
+        )
+        LOGGER.info(
+            f"Starting 1d hardware timed fly scan with {motor.name}:"
+            + f" start position = {start}, end position = {end}."
+        )
+        grp = short_uid("prepare")
+        for det in dets:
+            yield from bps.prepare(det, trigger_info, group=grp)
+        yield from _prepare_line(motor, start, end, motor_speed, group=grp)
+        yield from bps.wait(group=grp)
+        if declare_stream:
+            yield from bps.declare_stream(*dets, name=FLY_STREAM, collect=True)
+        yield from _fly_line(dets, motor, motor_speed, run_up_time)
+        yield from bps.collect(*dets, name=FLY_STREAM)
+        yield from _read_trigger_table(
+            TriggerTableReadout(), motor, start, end, motor_speed, num_points
+        )
 
     yield from finalize_wrapper(
-        plan=inner_fast_scan_1d(dets, motor, start, end, motor_speed),
+        plan=inner_fly_scan_1d(dets, motor, start, end, num_points, motor_speed),
         final_plan=reset_speed(old_speed, motor),
     )
+
+
+def _fly_trigger_info(
+    dets: list[StandardDetector],
+    start: float,
+    end: float,
+    num_points: int,
+    motor_speed: float,
+    num_lines: int = 1,
+    trigger: DetectorTrigger = DetectorTrigger.INTERNAL,
+) -> MsgGenerator[TriggerInfo]:
+    """Work out the detector trigger table for one line of a fly scan, or for
+    num_lines lines of a trajectory scan triggered by the motion controller."""
+    _, period = cal_trigger_table(start, end, motor_speed, num_points)
+    tasks = yield from bps.wait_for([det.get_trigger_deadtime for det in dets])
+    for det, task in zip(dets, tasks, strict=True):
+        if trigger not in task.result()[0]:
+            raise ValueError(f"{det.name} does not support {trigger.value} triggers.")
+    deadtime = max(task.result()[1] or 0.0 for task in tasks)
+    if period <= deadtime:
+        raise ValueError(
+            f"Trigger period {period} is shorter than detector deadtime "
+            f"{deadtime}, reduce num_points or motor_speed."
+        )
+    LOGGER.info(f"{num_points} points every {period} s.")
+    return TriggerInfo(
+        trigger=trigger,
+        number_of_events=num_points * num_lines,
+        livetime=period - deadtime,
+        deadtime=deadtime,
+    )
+
+
+def _read_trigger_table(
+    readout: TriggerTableReadout,
+    motor: Motor,
+    start: float,
+    end: float,
+    motor_speed: float,
+    num_points: int,
+    **values: float,
+) -> MsgGenerator:
+    """Read the trigger positions of one line, and any values that hold for
+    the whole line, into the fly_positions stream."""
+    positions, period = cal_trigger_table(start, end, motor_speed, num_points)
+    readout.table = {motor.name: positions.tolist(), "period": period, **values}
+    yield from bps.trigger_and_read([readout], name=FLY_POSITIONS_STREAM)
+
+
+def _fly_line(
+    dets: list[StandardDetector],
+    motor: Motor,
+    motor_speed: float,
+    acceleration_time: float,
+) -> MsgGenerator:
+    """Kickoff the prepared motor, then the detectors once it is up to speed,
+    and wait for all of them to complete."""
+    yield from bps.kickoff(motor, wait=True)
+    yield from bps.sleep(acceleration_time)
+    yield from bps.kickoff_all(*dets, wait=True)
+    LOGGER.info(f"flying motor =  {motor.name} at speed = {motor_speed}")
+    yield from bps.complete_all(motor, *dets, wait=True)
+
+
+@plan
+def _fast_scan_grid_lines(
+    dets: list[Any],
+    step_motor: Motor,
+    steps: list[float],
+    scan_motor: Motor,
+    scan_start: float,
+    scan_end: float,
+    motor_speed: float | None = None,
+    snake_axes: bool = False,
+    num_points: int | None = None,
+    target_spacing: float | None = None,
+    sample_rate: SampleRate | None = None,
+    det_groups: dict[str, DetectorGroup] | None = None,
+    acceleration_time: float | None = None,
+) -> MsgGenerator:
+    """
+    The line engine for fast_scan_grid with pipelined line turnaround.
+
+    In this scan:
+    1) The scan motor speed is read once for the whole grid.
+    2) The step motor move and the scan motor run-up to the start of the line
+        are started together, the next line begins once both are done.
+    3) The line is flown and read out as in _fast_scan_1d, or _fly_scan_1d
+        if num_points is given, with the step motor position of the line in
+        the fly_positions stream.
+    4) As soon as the scan motor finishes a line the step motor move and
+        run-up for the next line are started, in fly mode this overlaps with
+        the bulk collect of the finished line.
+    5) Clean up, reset scan motor speed once at the end of the grid.
+
+    Parameters
+    ----------
+    dets : list
+        list of 'readable' objects, StandardDetector if num_points is given.
+    step_motor : Motor
+        Motor stepped between lines.
+    steps : list[float]
+        Step motor position for each line.
+    scan_motor : Motor
+        The motor that will not stop during measurements.
+    scan_start: float
+        Scan motor starting position.
+    scan_end: float
+        Scan motor ending position.
+    motor_speed: Optional[float] = None,
+        Speed of the scanning motor during measurements.
+    snake_axes: bool = False,
+        If True, every other line is flown from scan_end to scan_start.
+    num_points: Optional[int] = None,
+        If given, hardware timed points per line.
+    target_spacing, sample_rate, det_groups:
+        Software trigger options, see _fast_scan_1d.
+    acceleration_time: Optional[float] = None,
+        The scan motor acceleration time if already known, otherwise it is
+        read once for the whole grid.
+    """
+
+    old_speed: float = yield from bps.rd(scan_motor.velocity)
+    run_up_time: float = (
+        (yield from bps.rd(scan_motor.acceleration_time))
+        if acceleration_time is None
+        else acceleration_time
+    )
+
+    def inner_fast_scan_grid_lines(motor_speed: float | None = None):
+        if not motor_speed:
+            motor_speed = old_speed
+        lines = [
+            (scan_end, scan_start) if snake_axes and cnt % 2 else (scan_start, scan_end)
+            for cnt in range(len(steps))
+        ]
+        trigger_info = None
+        flyers: list[StandardDetector] = []
+        trigger_table = TriggerTableReadout()
+        if num_points is not None:
+            trigger_info = yield from _fly_trigger_info(
+                dets, scan_start, scan_end, num_points, motor_speed
+            )
+            flyers = dets
+
+        grp = short_uid("turnaround")
+        yield from bps.abs_set(step_motor, steps[0], group=grp)
+        yield from _prepare_line(scan_motor, *lines[0], motor_speed, group=grp)
+        for det in flyers:
+            yield from bps.prepare(det, trigger_info, group=grp)
+
+        for cnt, (line_start, line_end) in enumerate(lines):
+            yield from bps.wait(group=grp)
+            LOGGER.info(
+                f"Line {cnt + 1}/{len(lines)}: {step_motor.name} = {steps[cnt]},"
+                f" {scan_motor.name} from {line_start} to {line_end}."
+            )
+            if not flyers:
+                yield from bps.kickoff(scan_motor, wait=True)
+                yield from _read_line(
+                    dets + [step_motor],
+                    scan_motor,
+                    motor_speed,
+                    target_spacing,
+                    sample_rate,
+                    det_groups,
+                )
+            else:
+                if cnt == 0:
+                    yield from bps.declare_stream(
+                        *flyers, name=FLY_STREAM, collect=True
+                    )
+                yield from _fly_line(flyers, scan_motor, motor_speed, run_up_time)
+
+            # Start the turnaround as soon as the scan motor is done.
+            last_line = cnt + 1 == len(lines)
+            if not last_line:
+                grp = short_uid("turnaround")
+                yield from bps.abs_set(step_motor, steps[cnt + 1], group=grp)
+                yield from _prepare_line(
+                    scan_motor, *lines[cnt + 1], motor_speed, group=grp
+                )
+            if flyers:
+                yield from bps.collect(*flyers, name=FLY_STREAM)
+                yield from _read_trigger_table(
+                    trigger_table,
+                    scan_motor,
+                    line_start,
+                    line_end,
+                    motor_speed,
+                    num_points or 1,
+                    **{step_motor.name: steps[cnt]},
+                )
+                if not last_line:
+                    for det in flyers:
+                        yield from bps.prepare(det, trigger_info, group=grp)
+
+    yield from finalize_wrapper(
+        plan=inner_fast_scan_grid_lines(motor_speed),
+        final_plan=reset_speed(old_speed, scan_motor),
+    )
+
+
+@plan
+def _trajectory_scan_grid(
+    dets: list[StandardDetector],
+    trajectory: TrajectoryFlyer,
+    step_motor: Motor,
+    step_start: float,
+    step_end: float,
+    num_step: int,
+    scan_motor: Motor,
+    scan_start: float,
+    scan_end: float,
+    num_points: int,
+    motor_speed: float | None = None,
+    snake_axes: bool = False,
+) -> MsgGenerator:
+    """
+    The continuous alternative to _fast_scan_grid_lines.
+
+    In this scan:
+    1) The grid is described as a scanspec Spec, step axis times scan axis,
+        snaked if requested, with the frame duration from the motor speed.
+        Every frame and turnaround is checked against the motor limits and
+        kinematics before anything moves.
+    2) The motion controller calculates the PVT trajectory and moves to the
+        start while the detectors are armed for an edge trigger per frame.
+    3) The detectors are kicked off, so they are waiting for the first
+        trigger, then the trajectory is kicked off.
+    4) Frames are collected while the trajectory runs, there are no stops
+        between lines.
+
+    Note: The controller sends a trigger at every frame of the trajectory and
+    none during ramps or turnarounds, so frame n is always grid point n.
+
+    Parameters
+    ----------
+    dets : list[StandardDetector]
+        Detectors that take an edge trigger from the motion controller.
+    trajectory : TrajectoryFlyer
+        Motion controller that flies the scanspec trajectory.
+    step_motor, step_start, step_end, num_step:
+        Slow axis, see fast_scan_grid.
+    scan_motor, scan_start, scan_end:
+        Fast axis, see fast_scan_grid.
+    num_points: int
+        Number of frames per line.
+    motor_speed: Optional[float] = None,
+        Speed of the scanning motor during measurements.
+    snake_axes: bool = False,
+        If True, every other line is flown from scan_end to scan_start.
+    """
+
+    # The controller runs its own motion program, the motor velocity is only
+    # read as the default speed and never changed, so there is nothing to reset.
+    speed: float = motor_speed or (yield from bps.rd(scan_motor.velocity))
+    trigger_info = yield from _fly_trigger_info(
+        dets,
+        scan_start,
+        scan_end,
+        num_points,
+        speed,
+        num_lines=num_step,
+        trigger=DetectorTrigger.EXTERNAL_EDGE,
+    )
+    spec = _grid_spec(
+        step_motor,
+        step_start,
+        step_end,
+        num_step,
+        scan_motor,
+        scan_start,
+        scan_end,
+        num_points,
+        speed,
+        snake_axes,
+    )
+    yield from check_trajectory_within_limit(spec)
+    LOGGER.info(
+        f"Starting trajectory scan with {step_motor.name} and"
+        f" {scan_motor.name}: {num_step} lines of {num_points} points."
+    )
+    grp = short_uid("prepare")
+    for det in dets:
+        yield from bps.prepare(det, trigger_info, group=grp)
+    yield from bps.prepare(
+        trajectory,
+        PmacScanInfo(spec=spec, ramp_time=None, turnaround_time=None),
+        group=grp,
+    )
+    yield from bps.wait(group=grp)
+    yield from bps.declare_stream(*dets, name=FLY_STREAM, collect=True)
+    yield from bps.kickoff_all(*dets, wait=True)
+    yield from bps.kickoff(trajectory, wait=True)
+    yield from bps.collect_while_completing(
+        flyers=[trajectory, *dets],
+        dets=dets,
+        flush_period=TRAJECTORY_FLUSH_PERIOD,
+        stream_name=FLY_STREAM,
+    )
+
+
+def _grid_spec(
+    step_motor: Motor,
+    step_start: float,
+    step_end: float,
+    num_step: int,
+    scan_motor: Motor,
+    scan_start: float,
+    scan_end: float,
+    num_points: int,
+    motor_speed: float,
+    snake_axes: bool,
+) -> Spec[Motor]:
+    """Build the scanspec for a grid, the scan axis frames are centred on the
+    trigger positions so the frame edges are scan_start and scan_end."""
+    positions, period = cal_trigger_table(scan_start, scan_end, motor_speed, num_points)
+    scan_line = Linspace(
+        scan_motor, float(positions[0]), float(positions[-1]), num_points
+    )
+    step_line = Linspace(step_motor, step_start, step_end, num_step)
+    grid = step_line * ~scan_line if snake_axes else step_line * scan_line
+    return Fly(period @ grid)
@@ -1,9 +1,10 @@
 from collections.abc import Sequence
-from math import floor, sqrt
+from math import floor, inf, sqrt
 from typing import Any, TypedDict
 
 import bluesky.plan_stubs as bps
 import bluesky.plans as bp
+import numpy as np
 from bluesky.preprocessors import finalize_wrapper
 from bluesky.protocols import Readable
 from bluesky.utils import MsgGenerator, plan
@@ -13,12 +14,12 @@ from ophyd_async.epics.motor import Motor
 
 from sm_bluesky.common.math_functions import step_size_to_step_num
 from sm_bluesky.common.plan_stubs import (
-    check_within_limit,
-    get_motor_positions,
+    check_within_snapshot_limit,
     get_velocity_and_step_size,
     set_area_detector_acquire_time,
+    snapshot_motors,
 )
-from sm_bluesky.common.plans.fast_scan import fast_scan_grid
+from sm_bluesky.common.plans.fast_scan import TrajectoryFlyer, fast_scan_grid
 from sm_bluesky.log import LOGGER
 
 
@@ -28,6 +29,16 @@ class CleanUpArgs(TypedDict, total=False):
     """Dictionary to store clean up options."""
 
 
+class GridEstimate(TypedDict):
+    """Predicted grid size and wall time for a fast grid scan."""
+
+    points_per_unit_dist: float
+    step_points: int
+    scan_points: int
+    line_time: float
+    grid_time: float
+
+
 @plan
 def grid_step_scan(
     dets: Sequence[Readable],
@@ -82,16 +93,21 @@ def grid_step_scan(
     MsgGenerator
         A Bluesky generator for the scan.
     """
-    # Check limits before doing anything
-    yield from check_within_limit([x_step_start, x_step_end], x_step_motor)
-    yield from check_within_limit([y_step_start, y_step_end], y_step_motor)
+    # Check limits before doing anything, with one read of both motors.
+    snapshot = yield from snapshot_motors(x_step_motor, y_step_motor)
+    x_state, y_state = snapshot[x_step_motor.name], snapshot[y_step_motor.name]
+    check_within_snapshot_limit([x_step_start, x_step_end], x_step_motor.name, x_state)
+    check_within_snapshot_limit([y_step_start, y_step_end], y_step_motor.name, y_state)
 
     clean_up_arg: CleanUpArgs = {"Home": home}
     if home:
         # Store original positions to return to after scan
-        clean_up_arg["Origin"] = yield from get_motor_positions(
-            x_step_motor, y_step_motor
-        )  # type: ignore
+        clean_up_arg["Origin"] = [
+            x_step_motor,
+            x_state["position"],
+            y_step_motor,
+            y_state["position"],
+        ]
 
     main_det = dets[0]
     if isinstance(main_det, AndorDetector | SingleTriggerDetector):
@@ -134,6 +150,7 @@ def grid_fast_scan(
     step_size: float | None = None,
     home: bool = False,
     snake_axes: bool = True,
+    trajectory: TrajectoryFlyer | None = None,
     md: dict[str, Any] | None = None,
 ) -> MsgGenerator:
     """
@@ -170,6 +187,11 @@ def grid_fast_scan(
         If True, move back to the original position after the scan, by default False.
     snake_axes : bool, optional
         If True, perform a snake scan, by default True.
+    trajectory : TrajectoryFlyer, optional
+        If given, fly the whole grid as one continuous trajectory with this
+        motion controller, with points spaced by the step size along the
+        scan axis, the detectors must take edge triggers from it, by default
+        None.
     md : dict, optional
         Metadata for the scan, by default None.
 
@@ -179,17 +201,24 @@ def grid_fast_scan(
         A Bluesky generator for the scan.
     """
     clean_up_arg: CleanUpArgs = {"Home": home}
-    yield from check_within_limit([scan_start, scan_end], scan_motor)
-    yield from check_within_limit([step_start, step_end], step_motor)
+    snapshot = yield from snapshot_motors(scan_motor, step_motor)
+    scan_state, step_state = snapshot[scan_motor.name], snapshot[step_motor.name]
+    check_within_snapshot_limit([scan_start, scan_end], scan_motor.name, scan_state)
+    check_within_snapshot_limit([step_start, step_end], step_motor.name, step_state)
 
     if home:
-        clean_up_arg["Origin"] = yield from get_motor_positions(scan_motor, step_motor)  # type: ignore
+        clean_up_arg["Origin"] = [
+            scan_motor,
+            scan_state["position"],
+            step_motor,
+            step_state["position"],
+        ]
 
-    scan_acc = yield from bps.rd(scan_motor.acceleration_time)
-    scan_motor_speed = yield from bps.rd(scan_motor.velocity)
-    scan_motor_max_vel = yield from bps.rd(scan_motor.max_velocity)
-    step_motor_speed = yield from bps.rd(step_motor.velocity)
-    step_acc = yield from bps.rd(step_motor.acceleration_time)
+    scan_acc = scan_state["acceleration_time"]
+    scan_motor_speed = scan_state["velocity"]
+    scan_motor_max_vel = scan_state["max_velocity"]
+    step_motor_speed = step_state["velocity"]
+    step_acc = step_state["acceleration_time"]
 
     main_det = dets[0]
     if isinstance(main_det, AndorDetector):
@@ -222,12 +251,18 @@ def grid_fast_scan(
         scan_motor,
         ideal_velocity,
         ideal_step_size,
+        max_velocity=scan_motor_max_vel,
     )
     num_of_step = step_size_to_step_num(step_start, step_end, ideal_step_size)
     LOGGER.info(
         f"Step size = {ideal_step_size}, {scan_motor.name}: velocity = {velocity}, "
         f"number of steps = {num_of_step}."
     )
+    num_points = None
+    if trajectory is not None:
+        num_points = max(
+            1, step_size_to_step_num(scan_start, scan_end, ideal_step_size)
+        )
     yield from finalize_wrapper(
         plan=fast_scan_grid(
             dets,
@@ -240,6 +275,8 @@ def grid_fast_scan(
             scan_end,
             velocity,
             snake_axes=snake_axes,
+            num_points=num_points,
+            trajectory=trajectory,
             md=md,
         ),
         final_plan=clean_up(clean_up_arg),
@@ -275,7 +312,7 @@ def estimate_speed_steps(
     step_range = abs(step_start - step_end)
     scan_range = abs(scan_start - scan_end)
 
-    points_per_unit_dist = estimate_axis_points(
+    grid_estimate = estimate_axis_points(
         plan_time=plan_time,
         deadtime=deadtime,
         step_range=step_range,
@@ -285,7 +322,9 @@ def estimate_speed_steps(
         scan_acceleration=scan_acceleration,
         scan_speed=scan_speed,
         snake_axes=snake_axes,
+        scan_max_vel=scan_max_vel,
     )
+    points_per_unit_dist = grid_estimate["points_per_unit_dist"]
 
     point_per_step_axis = max(1, round(points_per_unit_dist * correction * step_range))
     point_per_scan_axis = max(1, round(points_per_unit_dist * correction * scan_range))
@@ -295,6 +334,8 @@ def estimate_speed_steps(
         if step_size == 0:
             raise ValueError("Step_size is 0")
         ideal_step_size = abs(step_size)
+        # The scan axis has the given step size too, not the estimated one.
+        point_per_scan_axis = max(1, round(scan_range / ideal_step_size))
     else:
         ideal_step_size = step_range / point_per_step_axis
 
@@ -322,52 +363,95 @@ def estimate_axis_points(
     scan_acceleration: float,
     scan_speed: float,
     snake_axes: bool = True,
-) -> float:
-    """
-    Estimate the number of points per axis for a scan.
+    scan_max_vel: float = inf,
+) -> GridEstimate:
     """
-    iteration_limit = 18  # Prevent infinite loop
+    Estimate the densest grid that fits within plan_time.
+
+    The grid time for a given number of lines is
+    lines * (line time + scan run-up and stop) + (lines - 1) * turnaround,
+    where the line time is the scan axis points * deadtime, or the time to
+    cover the line at scan_max_vel if that is longer, and the turnaround is
+    the slower of the step move and, without snaking, the scan motor flyback
+    (the two happen together, see fast_scan_grid). For a fixed number of lines
+    the grid time is linear in the point density so it is solved in closed
+    form for every candidate number of lines at once, the densest grid that
+    fits is returned. The number of lines is the density times step_range
+    rounded, as in estimate_speed_steps. A scan range of 0 is a single point
+    per line, the density then only sets the number of lines, or is 1 if
+    both ranges are 0.
 
-    total_estimated_points = plan_time / deadtime
-    num_points_per_axis = (
-        sqrt(total_estimated_points / (scan_range * step_range))
-        if (scan_range * step_range) > 0
-        else 1.0
-    )
-
-    for _ in range(iteration_limit):
-        old_points = num_points_per_axis
+    Parameters
+    ----------
+    plan_time : float
+        Time available for the grid in seconds.
+    deadtime : float
+        Time per point in seconds.
+    step_range, step_acceleration, step_speed : float
+        Step axis range, acceleration time and speed.
+    scan_range, scan_acceleration, scan_speed : float
+        Scan axis range, acceleration time and speed.
+    snake_axes : bool, optional
+        If False, the scan motor flies back to the start after every line.
+    scan_max_vel : float, optional
+        Scan motor maximum velocity, by default unlimited.
 
-        # Motion overhead
-        point_step_axis = max(1, floor(num_points_per_axis * step_range))
-        step_mv_time = point_step_axis * (step_acceleration * 2) + (
-            step_range / step_speed
+    Returns
+    -------
+    GridEstimate
+        Points per unit distance, grid size and predicted times.
+    """
+    if deadtime <= 0:
+        raise ValueError(f"Deadtime must be larger than 0, got {deadtime}.")
+    if scan_range < 0 or step_range < 0:
+        raise ValueError(
+            f"Ranges must not be negative, got {step_range} and {scan_range}."
         )
 
-        if snake_axes:
-            scan_mv_time = point_step_axis * (scan_acceleration * 2)
-        else:
-            point_scan_axis = max(1, floor(num_points_per_axis * scan_range))
-            scan_mv_time = point_scan_axis * (scan_acceleration * 2) + (
-                point_scan_axis - 1
-            ) * ((scan_range / scan_speed) + (scan_acceleration * 2))
-
-        # Recalculate points with available time
-        available_time = plan_time - step_mv_time - scan_mv_time
-        if available_time <= 0:
-            num_points_per_axis = old_points * 0.5
-            if num_points_per_axis < 1:
-                raise ValueError(
-                    f"Plan execution window is physically too short for overhead. "
-                    f"Requested: {plan_time}s, Min Overhead: Step={step_mv_time:.2f}s."
-                )
-            continue
-
-        corrected_total_points = available_time / deadtime
-        num_points_per_axis = sqrt(corrected_total_points / (scan_range * step_range))
-
-        # Break if the improvement is less than 1/20 of a point
-        if abs(num_points_per_axis - old_points) <= 0.05:
-            break
-
-    return num_points_per_axis
+    # Upper bound on lines, all the time spent acquiring at the lowest density.
+    if scan_range > 0:
+        max_lines = sqrt(max(plan_time, 0) * step_range / (scan_range * deadtime))
+    else:
+        max_lines = max(plan_time, 0) / deadtime
+    max_lines = max(1, floor(max_lines) + 2)
+    min_line_time = scan_range / scan_max_vel if scan_max_vel > 0 else 0.0
+    lines = np.arange(1, max_lines + 1, dtype=float)
+
+    step_move = np.zeros_like(lines)
+    step_move[1:] = 2 * step_acceleration + step_range / ((lines[1:] - 1) * step_speed)
+    flyback = 0.0 if snake_axes else scan_range / scan_speed + 2 * scan_acceleration
+    turnaround = np.where(lines > 1, np.maximum(step_move, flyback), 0.0)
+    overhead = lines * 2 * scan_acceleration + (lines - 1) * turnaround
+    acquire_time = plan_time - overhead
+
+    # round(density * step_range) == lines, any density works for 1d.
+    if step_range > 0:
+        low = np.where(lines > 1, (lines - 0.5) / step_range * (1 + 1e-9), 0.0)
+        high = (lines + 0.5) / step_range * (1 - 1e-9)
+    else:
+        low = np.zeros_like(lines)
+        high = np.full_like(lines, inf if scan_range > 0 else 1.0)
+    if scan_range > 0:
+        density = np.minimum(acquire_time / (lines * scan_range * deadtime), high)
+        feasible = (acquire_time >= lines * min_line_time) & (density >= low)
+    else:
+        density = high
+        feasible = acquire_time >= lines * deadtime
+    if not feasible.any():
+        raise ValueError(
+            f"Plan execution window is physically too short for overhead. "
+            f"Requested: {plan_time}s, Min Overhead: {overhead[0]:.2f}s."
+        )
+    best = int(np.argmax(np.where(feasible, density, -inf)))
+    points_per_unit_dist = float(density[best])
+    if scan_range > 0:
+        line_time = max(points_per_unit_dist * scan_range * deadtime, min_line_time)
+    else:
+        line_time = deadtime
+    return GridEstimate(
+        points_per_unit_dist=points_per_unit_dist,
+        step_points=int(lines[best]),
+        scan_points=max(1, round(points_per_unit_dist * scan_range)),
+        line_time=line_time + 2 * scan_acceleration,
+        grid_time=float(lines[best] * line_time + overhead[best]),
+    )
@@ -1,4 +1,37 @@
 from .abstract_instrument_server import AbstractInstrumentServer
+from .binary_protocol import (
+    BinaryFramer,
+    FrameTooLongError,
+    decode_request,
+    decode_response,
+    encode_request,
+    encode_response,
+)
+from .fake_serial import FakeSerial
+from .line_framing import LineFramer, LineTooLongError, StreamBuffer
 from .pulse_generator_shanghai_tech import GeneratorServerShanghaiTech
+from .serial_instrument_server import (
+    SerialArgument,
+    SerialCommand,
+    SerialInstrumentServer,
+)
+from .serial_worker import SerialWorker
 
-__all__ = ["AbstractInstrumentServer", "GeneratorServerShanghaiTech"]
+__all__ = [
+    "AbstractInstrumentServer",
+    "BinaryFramer",
+    "FakeSerial",
+    "FrameTooLongError",
+    "GeneratorServerShanghaiTech",
+    "LineFramer",
+    "LineTooLongError",
+    "SerialArgument",
+    "SerialCommand",
+    "SerialInstrumentServer",
+    "SerialWorker",
+    "StreamBuffer",
+    "decode_request",
+    "decode_response",
+    "encode_request",
+    "encode_response",
+]
@@ -1,11 +1,42 @@
+import asyncio
 import socket
 from abc import ABC, abstractmethod
-from collections.abc import Callable
-from contextlib import contextmanager
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
 from time import time
 
+from sm_bluesky.common.server.binary_protocol import (
+    BINARY_HANDSHAKE,
+    MAX_FRAME_LENGTH,
+    Argument,
+    BinaryFramer,
+    FrameTooLongError,
+    decode_request,
+    encode_response,
+    peek_request_id,
+)
+from sm_bluesky.common.server.line_framing import (
+    BUFFER_SIZE,
+    MAX_LINE_LENGTH,
+    LineFramer,
+    LineTooLongError,
+)
 from sm_bluesky.log import LOGGER, logging
 
+# Responses of the command being handled for one client of serve, handlers
+# write here instead of to the single blocking connection.
+_RESPONSE_SINK: ContextVar[bytearray | None] = ContextVar(
+    "_RESPONSE_SINK", default=None
+)
+# Request ID of the command being handled, echoed in front of its responses.
+_REQUEST_ID: ContextVar[bytes | int | None] = ContextVar("_REQUEST_ID", default=None)
+# Whether the client of the command being handled switched to binary frames.
+_BINARY: ContextVar[bool] = ContextVar("_BINARY", default=False)
+
+REQUEST_ID_PREFIX = b"#"
+BATCH_SEPARATOR = b";"
+
 
 class AbstractInstrumentServer(ABC):
     """
@@ -13,11 +44,39 @@ class AbstractInstrumentServer(ABC):
 
     Handles socket lifecycle, connection management, and buffered command
     parsing. Subclasses must implement hardware-specific control logic.
+
+    start serves one client at a time. serve, or start_concurrent, serves
+    many clients at once with asyncio: hardware commands run one at a time in
+    a worker thread behind a lock, while the commands in
+    concurrent_commands, ping and command_list, are answered straight away.
+
+    Clients may pipeline commands, all complete lines received together are
+    run in order and their responses sent in one write. A line may start with
+    a request ID, e.g. "#12\tget_delay", which is echoed in front of each of
+    its responses. "batch" runs several commands, separated by a lone ";"
+    field, without any other command in between and skips the rest after
+    the first failure.
+
+    A client that sends the line "binary" gets "1\tbinary" back and from
+    then on talks length-prefixed frames with typed arguments and request
+    IDs, see binary_protocol. Handlers then get int, float or bytes
+    arguments instead of bytes only.
     """
 
-    def __init__(self, host: str, port: int, ipv6: bool = False):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ipv6: bool = False,
+        buffer_size: int = BUFFER_SIZE,
+        max_line_length: int = MAX_LINE_LENGTH,
+        max_frame_length: int = MAX_FRAME_LENGTH,
+    ):
         self.host: str = host
         self.port: int = port
+        self.buffer_size: int = buffer_size
+        self.max_line_length: int = max_line_length
+        self.max_frame_length: int = max_frame_length
         self._is_running: bool = False
         self._hardware_connected: bool = False
         self._server_socket: socket.socket
@@ -31,7 +90,14 @@ class AbstractInstrumentServer(ABC):
             b"ping": self._send_ack,
             b"shutdown": self.stop,
             b"command_list": self._send_command_list,
+            b"batch": self._batch,
         }
+        # Commands that never touch the hardware, answered without the lock.
+        self.concurrent_commands: set[bytes] = {b"ping", b"command_list"}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop_event: asyncio.Event | None = None
+        self._hardware_lock = asyncio.Lock()
+        self._clients: set[asyncio.StreamWriter] = set()
 
     def start(self) -> None:
         """Initializes the server, connects hardware, and enters the listening loop."""
@@ -62,6 +128,111 @@ class AbstractInstrumentServer(ABC):
                 LOGGER.error(f"Error in server loop: {e}")
                 self._is_running = False
 
+    def start_concurrent(self) -> None:
+        """Blocking entry point of serve."""
+        asyncio.run(self.serve())
+
+    async def serve(self) -> None:
+        """
+        Connect hardware and serve many clients at once until stop is called.
+
+        Each client's commands are handled in the order they arrive. Hardware
+        commands from all clients are serialised by a lock and run in a worker
+        thread so the event loop keeps answering the other clients.
+        """
+        self._hardware_connected = self.connect_hardware()
+        if not self._hardware_connected:
+            self._is_running = False
+            LOGGER.error("Failed to connect hardware")
+            raise RuntimeError("Failed to connect hardware")
+        LOGGER.info("Hardware connected successfully")
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._hardware_lock = asyncio.Lock()
+        self._clients = set()
+        server = await asyncio.start_server(
+            self._serve_client_async, self.host, self.port, family=self.address_type
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._is_running = True
+        LOGGER.info(f"Server started listening on {self.host}:{self.port}")
+        try:
+            await self._stop_event.wait()
+        finally:
+            server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await server.wait_closed()
+            self._loop = None
+            if self._is_running:
+                self.stop()
+
+    async def _serve_client_async(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Reads one client's lines and writes back each command's responses."""
+        addr = writer.get_extra_info("peername")
+        self._clients.add(writer)
+        LOGGER.info(f"Client {addr} connected, {len(self._clients)} connected.")
+        framer = LineFramer(self.buffer_size, self.max_line_length)
+        binary: BinaryFramer | None = None
+        binary_token = None
+        try:
+            while self._is_running:
+                stream = binary or framer
+                chunk = await reader.read(len(stream.room()))
+                if not chunk:
+                    break
+                stream.feed(chunk)
+                sink = bytearray()
+                token = _RESPONSE_SINK.set(sink)
+                try:
+                    if binary is None:
+                        for line in self._lines(framer):
+                            if line == BINARY_HANDSHAKE:
+                                binary = self._switch_to_binary(framer)
+                                binary_token = _BINARY.set(True)
+                                break
+                            await self._execute(line)
+                    if binary is not None:
+                        for body in binary.frames():
+                            await self._execute_frame(body)
+                except FrameTooLongError as e:
+                    self._error_helper(message="Bad request", error=e)
+                    break
+                finally:
+                    _RESPONSE_SINK.reset(token)
+                    if sink:
+                        writer.write(sink)
+                        await writer.drain()
+        except OSError as e:
+            LOGGER.error(f"Client {addr} connection lost unexpectedly: {e}")
+        finally:
+            if binary_token is not None:
+                _BINARY.reset(binary_token)
+            self._clients.discard(writer)
+            writer.close()
+            LOGGER.info(f"Client {addr} disconnected.")
+
+    async def _execute(self, line: bytes) -> None:
+        """Dispatch one command line, hardware commands wait for the lock."""
+        if _split_request(line)[1] in self.concurrent_commands:
+            self._dispatch_command(line)
+        else:
+            async with self._hardware_lock:
+                await asyncio.to_thread(self._dispatch_command, line)
+
+    async def _execute_frame(self, body: bytes) -> None:
+        """Dispatch one binary frame, hardware commands wait for the lock."""
+        request = self._decode_frame(body)
+        if request is None:
+            return
+        if request[1] in self.concurrent_commands:
+            self._run_request(*request)
+        else:
+            async with self._hardware_lock:
+                await asyncio.to_thread(self._run_request, *request)
+
     @contextmanager
     def _manage_connection(self, client_info: tuple[socket.socket, str]):
         """Manages the lifecycle of a client connection with automatic cleanup."""
@@ -94,6 +265,11 @@ class AbstractInstrumentServer(ABC):
             self.disconnect_hardware()
             self._hardware_connected = False
         self._is_running = False
+        if self._loop is not None and self._stop_event is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                LOGGER.warning("Event loop already closed")
         LOGGER.info("Server stopped successfully")
 
     def _disconnect_client(self) -> None:
@@ -107,70 +283,198 @@ class AbstractInstrumentServer(ABC):
         if self._conn is None:
             LOGGER.error("No client connection available to run command loop")
             return
-        buffer = b""
-        while self._is_running:
-            try:
-                chunk = self._conn.recv(1024)
-                if not chunk:
+        framer = LineFramer(self.buffer_size, self.max_line_length)
+        binary: BinaryFramer | None = None
+        binary_token = None
+        try:
+            while self._is_running:
+                try:
+                    if not (binary or framer).recv_into(self._conn):
+                        break
+                    sink = bytearray()
+                    token = _RESPONSE_SINK.set(sink)
+                    try:
+                        if binary is None:
+                            for line in self._lines(framer):
+                                if line == BINARY_HANDSHAKE:
+                                    binary = self._switch_to_binary(framer)
+                                    binary_token = _BINARY.set(True)
+                                    break
+                                self._dispatch_command(line)
+                        if binary is not None:
+                            for body in binary.frames():
+                                self._dispatch_frame(body)
+                    except FrameTooLongError as e:
+                        self._error_helper(message="Bad request", error=e)
+                        break
+                    finally:
+                        _RESPONSE_SINK.reset(token)
+                        if sink and self._conn:
+                            self._conn.sendall(sink)
+
+                except (OSError, ConnectionResetError):
+                    LOGGER.error("Client connection lost unexpectedly")
                     break
-                buffer += chunk
+        finally:
+            if binary_token is not None:
+                _BINARY.reset(binary_token)
 
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    if line:
-                        self._dispatch_command(line.strip())
+    def _lines(self, framer: LineFramer) -> Iterator[bytes]:
+        """The complete lines of framer, each line that is too long is
+        reported and the lines after it are still read."""
+        while True:
+            try:
+                yield from framer.lines()
+                return
+            except LineTooLongError as e:
+                self._error_helper(message="Bad request", error=e)
 
-            except (OSError, ConnectionResetError):
-                LOGGER.error("Client connection lost unexpectedly")
-                break
+    def _switch_to_binary(self, framer: LineFramer) -> BinaryFramer:
+        """Acknowledge the handshake in text and move the bytes already
+        received after it to a binary framer."""
+        self._send_response(BINARY_HANDSHAKE)
+        binary = BinaryFramer(self.buffer_size, self.max_frame_length)
+        binary.feed(framer.take_pending())
+        LOGGER.info("Client switched to binary frames")
+        return binary
 
     def _dispatch_command(self, line: bytes) -> None:
         """Parses raw input into command/argument pairs and executes the handler."""
-        if b"\t" in line:
-            cmd, arg = line.split(b"\t", 1)
-        else:
-            cmd, arg = line, b""
-
+        request_id, cmd, arg = _split_request(line)
+        token = _REQUEST_ID.set(request_id)
         try:
             self._handle_command(cmd, arg)
         except Exception as e:
             self._error_helper(message="Handler Error", error=e)
+        finally:
+            _REQUEST_ID.reset(token)
+
+    def _dispatch_frame(self, body: bytes) -> None:
+        """Decodes one binary frame and executes the handler."""
+        request = self._decode_frame(body)
+        if request is not None:
+            self._run_request(*request)
+
+    def _decode_frame(self, body: bytes) -> tuple[int, bytes, list[Argument]] | None:
+        """Request of a binary frame, None once a malformed frame is answered
+        with an error."""
+        try:
+            return decode_request(body)
+        except ValueError as e:
+            token = _REQUEST_ID.set(peek_request_id(body))
+            try:
+                self._error_helper(message="Bad request", error=e)
+            finally:
+                _REQUEST_ID.reset(token)
+            return None
+
+    def _run_request(
+        self, request_id: int, cmd: bytes, args: Sequence[Argument]
+    ) -> None:
+        token = _REQUEST_ID.set(request_id)
+        try:
+            self._call_command(cmd, args)
+        except Exception as e:
+            self._error_helper(message="Handler Error", error=e)
+        finally:
+            _REQUEST_ID.reset(token)
 
     def _send_ack(self) -> None:
         self._send_response()
 
     def _send_error(self, error_message: str) -> None:
-        if self._conn:
-            self._conn.sendall(b"0\t" + error_message.encode() + b"\n")
+        self._write(False, error_message.encode())
 
     def _send_response(self, response: bytes = b"") -> None:
-        if self._conn:
-            self._conn.sendall(b"1\t" + response + b"\n")
+        self._write(True, response)
 
-    def _handle_command(self, cmd: bytes, args: bytes) -> None:
-        """Executes logic for a specific instrument command."""
+    def _write(self, success: bool, payload: bytes) -> None:
+        """Send to the client of the current command in its protocol."""
+        request_id = _REQUEST_ID.get()
+        if _BINARY.get():
+            data = encode_response(
+                request_id if isinstance(request_id, int) else 0, success, payload
+            )
+        else:
+            data = (b"1\t" if success else b"0\t") + payload + b"\n"
+            if isinstance(request_id, bytes):
+                data = REQUEST_ID_PREFIX + request_id + b"\t" + data
+        sink = _RESPONSE_SINK.get()
+        if sink is not None:
+            sink += data
+        elif self._conn:
+            self._conn.sendall(data)
+
+    def _handle_command(self, cmd: bytes, args: bytes) -> bool:
+        """Executes logic for a specific instrument command, returns whether it
+        succeeded."""
+        return self._call_command(cmd, args.split(b"\t") if args else [])
+
+    def _call_command(self, cmd: bytes, args: Sequence[Argument]) -> bool:
+        """Runs the handler of cmd with arguments that are already split."""
         handler = self._command_registry.get(cmd)
         if not handler:
             self._error_helper(
-                message=f"Received unknown command: '{cmd.decode()}'",
+                message=f"Received unknown command: '{_command_name(cmd)}'",
                 error=Exception("Unknown command"),
                 level=logging.WARNING,
             )
+            return False
         else:
+            # Sub-commands of a batch share the deadline of the whole batch.
+            deadline = (
+                nullcontext()
+                if cmd in self.concurrent_commands or self._current_deadline is not None
+                else self._timeout_context(seconds=self._timeout_seconds)
+            )
             try:
-                with self._timeout_context(seconds=self._timeout_seconds):
-                    arg_list = args.split(b"\t") if args else []
-                    handler(*arg_list)
+                with deadline:
+                    handler(*args)
+                return True
 
             except TimeoutError as te:
                 self._error_helper(
-                    f"Error handling command: {cmd.decode()} - hardware not responding",
+                    f"Error handling command: {_command_name(cmd)}"
+                    " - hardware not responding",
                     te,
                 )
             except Exception as e:
                 self._error_helper(
-                    message=f"Error handling command '{cmd.decode()}'", error=e
+                    message=f"Error handling command '{_command_name(cmd)}'", error=e
                 )
+            return False
+
+    def _batch(self, *fields: Argument) -> None:
+        """
+        Run the sub-commands in one go, each gets its own response and those
+        after the first failure are skipped with an error. The whole batch has
+        one timeout. A batch is not atomic, commands that ran before a
+        failure are not rolled back.
+
+        e.g. "batch\tset_delay\t100\t;\tget_delay"
+        """
+        fields_of_commands: list[list[Argument]] = [[]]
+        for field in fields:
+            if field == BATCH_SEPARATOR:
+                fields_of_commands.append([])
+            else:
+                fields_of_commands[-1].append(field)
+        commands: list[tuple[bytes, list[Argument]]] = []
+        for cmd, *args in filter(None, fields_of_commands):
+            if not isinstance(cmd, bytes):
+                raise ValueError(f"batch command {cmd!r} is not a name")
+            if cmd == b"batch":
+                raise ValueError("batch cannot be nested")
+            commands.append((cmd, args))
+        LOGGER.info(f"Running batch of {len(commands)} commands")
+        failed = False
+        for cmd, args in commands:
+            if failed:
+                self._send_error(
+                    f"Skipped '{_command_name(cmd)}' after earlier failure"
+                )
+            else:
+                failed = not self._call_command(cmd, args)
 
     def _error_helper(
         self,
@@ -201,3 +505,18 @@ class AbstractInstrumentServer(ABC):
     @abstractmethod
     def disconnect_hardware(self) -> None:
         """Disconnect from the hardware device."""
+
+
+def _command_name(cmd: bytes) -> str:
+    """Command name for messages, clients may send bytes that are not UTF-8."""
+    return cmd.decode(errors="replace")
+
+
+def _split_request(line: bytes) -> tuple[bytes | None, bytes, bytes]:
+    """Request ID, if any, command and arguments of one line."""
+    request_id = None
+    if line.startswith(REQUEST_ID_PREFIX):
+        request_id, _, line = line.partition(b"\t")
+        request_id = request_id[len(REQUEST_ID_PREFIX) :]
+    cmd, _, args = line.partition(b"\t")
+    return request_id, cmd, args
@@ -0,0 +1,152 @@
+import struct
+from collections.abc import Iterator
+
+from sm_bluesky.common.server.line_framing import BUFFER_SIZE, StreamBuffer
+
+BINARY_HANDSHAKE = b"binary"
+MAX_FRAME_LENGTH = (1 << 16) - 1
+
+Argument = int | float | bytes
+
+_LENGTH = struct.Struct("!I")
+_REQUEST_HEAD = struct.Struct("!IB")
+_RESPONSE_HEAD = struct.Struct("!IB")
+_INT = struct.Struct("!q")
+_FLOAT = struct.Struct("!d")
+_INT_TAG, _FLOAT_TAG, _BYTES_TAG = b"i", b"f", b"b"
+
+
+class FrameTooLongError(ValueError):
+    """A frame announced a length beyond the maximum frame length."""
+
+
+class BinaryFramer(StreamBuffer):
+    """
+    Length-prefixed framing, the binary counterpart of LineFramer.
+
+    Each frame is a 4 byte big-endian length followed by that many bytes of
+    frame body, see encode_request and encode_response for the bodies. The
+    stream cannot be resynchronised after a frame that is too long, so the
+    connection should be closed on FrameTooLongError.
+
+    Example
+    -------
+    >>> framer = BinaryFramer()
+    >>> frame = encode_request(7, b"set_delay", 500)
+    >>> framer.feed(frame[:5])
+    >>> list(framer.frames())
+    []
+    >>> framer.feed(frame[5:])
+    >>> [decode_request(body) for body in framer.frames()]
+    [(7, b'set_delay', [500])]
+    """
+
+    def __init__(
+        self, buffer_size: int = BUFFER_SIZE, max_frame_length: int = MAX_FRAME_LENGTH
+    ) -> None:
+        super().__init__(buffer_size, max_frame_length + _LENGTH.size)
+        self.max_frame_length = max_frame_length
+
+    def frames(self) -> Iterator[bytes]:
+        """
+        The bodies of the complete frames received so far.
+
+        Raises
+        ------
+        FrameTooLongError
+            If a frame is longer than max_frame_length.
+        """
+        while self.pending >= _LENGTH.size:
+            (length,) = _LENGTH.unpack_from(self._buffer, self._start)
+            if length > self.max_frame_length:
+                raise FrameTooLongError(
+                    f"Frame of {length} bytes is longer than {self.max_frame_length}"
+                )
+            end = self._start + _LENGTH.size + length
+            if end > self._end:
+                return
+            body = bytes(self._view[self._start + _LENGTH.size : end])
+            self._start = self._scan = end
+            yield body
+
+
+def encode_request(request_id: int, cmd: bytes, *args: Argument) -> bytes:
+    """
+    Frame one command: request ID (uint32), command length (uint8), command,
+    then each argument as a type tag and its value. b"i" is an int64, b"f" a
+    float64 and b"b" a uint32 length followed by raw bytes.
+    """
+    parts = [_REQUEST_HEAD.pack(request_id, len(cmd)), cmd]
+    for arg in args:
+        if isinstance(arg, bool | int):
+            parts += [_INT_TAG, _INT.pack(arg)]
+        elif isinstance(arg, float):
+            parts += [_FLOAT_TAG, _FLOAT.pack(arg)]
+        elif isinstance(arg, bytes | bytearray | memoryview):
+            parts += [_BYTES_TAG, _LENGTH.pack(len(arg)), bytes(arg)]
+        else:
+            raise TypeError(f"Cannot send {type(arg).__name__} argument {arg!r}")
+    return _frame(b"".join(parts))
+
+
+def decode_request(body: bytes) -> tuple[int, bytes, list[Argument]]:
+    """
+    Request ID, command and typed arguments of a request frame body.
+
+    Raises
+    ------
+    ValueError
+        If the body is truncated or has an unknown type tag.
+    """
+    try:
+        request_id, cmd_length = _REQUEST_HEAD.unpack_from(body)
+        offset = _REQUEST_HEAD.size + cmd_length
+        cmd = body[_REQUEST_HEAD.size : offset]
+        args: list[Argument] = []
+        while offset < len(body):
+            tag = body[offset : offset + 1]
+            offset += 1
+            if tag == _INT_TAG:
+                args.append(_INT.unpack_from(body, offset)[0])
+                offset += _INT.size
+            elif tag == _FLOAT_TAG:
+                args.append(_FLOAT.unpack_from(body, offset)[0])
+                offset += _FLOAT.size
+            elif tag == _BYTES_TAG:
+                (length,) = _LENGTH.unpack_from(body, offset)
+                offset += _LENGTH.size + length
+                if offset > len(body):
+                    raise struct.error("bytes argument beyond end of frame")
+                args.append(body[offset - length : offset])
+            else:
+                raise ValueError(f"Unknown argument type {tag!r}")
+    except struct.error as e:
+        raise ValueError(f"Truncated request frame: {e}") from e
+    if len(cmd) != cmd_length:
+        raise ValueError("Truncated request frame: command beyond end of frame")
+    return request_id, cmd, args
+
+
+def encode_response(request_id: int, success: bool, payload: bytes = b"") -> bytes:
+    """Frame one response: request ID (uint32), status (uint8, 1 for success
+    and 0 for error) and the payload, the error message for errors."""
+    return _frame(_RESPONSE_HEAD.pack(request_id, int(success)) + payload)
+
+
+def decode_response(body: bytes) -> tuple[int, bool, bytes]:
+    """Request ID, success and payload of a response frame body."""
+    try:
+        request_id, status = _RESPONSE_HEAD.unpack_from(body)
+    except struct.error as e:
+        raise ValueError(f"Truncated response frame: {e}") from e
+    return request_id, bool(status), body[_RESPONSE_HEAD.size :]
+
+
+def peek_request_id(body: bytes) -> int:
+    """The request ID of a frame body that may fail to decode, 0 if even
+    that is missing."""
+    return _LENGTH.unpack_from(body)[0] if len(body) >= _LENGTH.size else 0
+
+
+def _frame(body: bytes) -> bytes:
+    return _LENGTH.pack(len(body)) + body
@@ -0,0 +1,97 @@
+from collections.abc import Callable, Mapping
+
+Replies = Mapping[bytes, bytes] | Callable[[bytes], bytes | None]
+
+
+class FakeSerial:
+    """
+    In-memory serial port that answers like an instrument, to test or run a
+    SerialInstrumentServer without the hardware.
+
+    Each command written, up to write_terminator, is recorded in written and
+    answered from replies, a mapping or a function of the command. A reply is
+    one or more lines ended by read_terminator, which is added if missing,
+    and b"" means no answer. A command without a reply is echoed back like a
+    loopback adapter. Reading returns b"" when there is nothing to read, as
+    a real port does at its timeout.
+
+    Example
+    -------
+    >>> port = FakeSerial({b"AT+DLSET=?": b"DLSET=500"})
+    >>> port.write(b"AT+DLSET=?\\r\\n")
+    12
+    >>> port.readline(), port.readline()
+    (b'DLSET=500\\n', b'')
+    """
+
+    def __init__(
+        self,
+        replies: Replies | None = None,
+        write_terminator: bytes = b"\r\n",
+        read_terminator: bytes = b"\n",
+        port: str | None = None,
+        baudrate: int = 9600,
+        timeout: float | None = None,
+    ) -> None:
+        self.replies: Replies = replies if replies is not None else {}
+        self.write_terminator = write_terminator
+        self.read_terminator = read_terminator
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+        self.written: list[bytes] = []
+        self._output = bytearray()
+        self._input = bytearray()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._input)
+
+    def write(self, data: bytes, /) -> int:
+        self._check_open()
+        self._output += data
+        while (index := self._output.find(self.write_terminator)) >= 0:
+            command = bytes(self._output[:index])
+            del self._output[: index + len(self.write_terminator)]
+            self.written.append(command)
+            self._answer(command)
+        return len(data)
+
+    def flush(self) -> None:
+        self._check_open()
+
+    def readline(self) -> bytes:
+        return self.read_until(b"\n")
+
+    def read_until(self, expected: bytes = b"\n") -> bytes:
+        self._check_open()
+        index = self._input.find(expected)
+        end = len(self._input) if index < 0 else index + len(expected)
+        line = bytes(self._input[:end])
+        del self._input[:end]
+        return line
+
+    def reset_input_buffer(self) -> None:
+        self._input.clear()
+
+    def reset_output_buffer(self) -> None:
+        self._output.clear()
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def _answer(self, command: bytes) -> None:
+        if callable(self.replies):
+            reply = self.replies(command)
+        else:
+            reply = self.replies.get(command)
+        if reply is None:
+            reply = command
+        if reply and not reply.endswith(self.read_terminator):
+            reply += self.read_terminator
+        self._input += reply
+
+    def _check_open(self) -> None:
+        if not self.is_open:
+            raise OSError(f"Fake serial port {self.port} is closed")
@@ -0,0 +1,145 @@
+import socket
+from collections.abc import Iterator
+
+BUFFER_SIZE = 1 << 17
+MAX_LINE_LENGTH = 1 << 16
+
+
+class LineTooLongError(ValueError):
+    """A line grew beyond the maximum line length and was dropped."""
+
+
+class StreamBuffer:
+    """
+    One preallocated bytearray that a stream is received straight into.
+
+    Consumed messages are only moved out of the way when the free space runs
+    low, by copying the unfinished message, at most max_length bytes, to the
+    front. Subclasses split the received bytes into messages.
+    """
+
+    def __init__(self, buffer_size: int, max_length: int) -> None:
+        if not 0 < max_length < buffer_size:
+            raise ValueError(
+                f"Maximum message length {max_length} must be positive and less"
+                f" than buffer_size {buffer_size}"
+            )
+        self.buffer_size = buffer_size
+        self.max_length = max_length
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._scan = 0
+        self._end = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of received bytes not yet returned as a message."""
+        return self._end - self._start
+
+    def room(self) -> memoryview:
+        """The free end of the buffer, after moving the unfinished message to
+        the front if the free space is smaller than a maximum message."""
+        if self._start == self._end:
+            self._start = self._scan = self._end = 0
+        elif self._start and self._end > self.max_length:
+            pending = self._end - self._start
+            self._buffer[:pending] = bytes(self._view[self._start : self._end])
+            self._scan -= self._start
+            self._start, self._end = 0, pending
+        return self._view[self._end :]
+
+    def commit(self, size: int) -> None:
+        """Mark size bytes written into room as received."""
+        self._end += size
+
+    def recv_into(self, conn: socket.socket) -> int:
+        """Receive from conn straight into the buffer, 0 means end of stream."""
+        received = conn.recv_into(self.room())
+        self.commit(received)
+        return received
+
+    def feed(self, data: bytes) -> None:
+        """Copy data that was received elsewhere into the buffer."""
+        room = self.room()
+        if len(data) > len(room):
+            raise ValueError(f"{len(data)} bytes do not fit in {len(room)} free")
+        room[: len(data)] = data
+        self.commit(len(data))
+
+    def take_pending(self) -> bytes:
+        """Remove and return the received bytes not yet returned, e.g. to hand
+        them to a different framing."""
+        pending = bytes(self._view[self._start : self._end])
+        self._start = self._scan = self._end
+        return pending
+
+
+class LineFramer(StreamBuffer):
+    """
+    Incremental newline framing over one preallocated bytearray.
+
+    Data is received straight into the free end of the buffer. The search for
+    the next newline starts where the last search stopped, so every byte is
+    scanned once however the stream is split into chunks, and each line is
+    copied out once.
+
+    A line longer than max_line_length is dropped up to its newline and
+    reported once with LineTooLongError, which ends lines. Calling lines
+    again goes on with the lines after it.
+
+    Example
+    -------
+    >>> framer = LineFramer(buffer_size=64, max_line_length=16)
+    >>> framer.feed(b"ping\\nset_delay\\t5")
+    >>> list(framer.lines())
+    [b'ping']
+    >>> framer.feed(b"00\\n")
+    >>> list(framer.lines())
+    [b'set_delay\\t500']
+    """
+
+    def __init__(
+        self, buffer_size: int = BUFFER_SIZE, max_line_length: int = MAX_LINE_LENGTH
+    ) -> None:
+        super().__init__(buffer_size, max_line_length)
+        self.max_line_length = max_line_length
+        self._discarding = False
+
+    def lines(self) -> Iterator[bytes]:
+        """
+        The complete lines received so far, stripped, empty lines skipped.
+
+        Raises
+        ------
+        LineTooLongError
+            After the lines before it, once for each line that is too long.
+        """
+        while True:
+            index = self._buffer.find(b"\n", self._scan, self._end)
+            if index < 0:
+                self._scan = self._end
+                if self.pending > self.max_line_length:
+                    self._drop(self._end)
+                return
+            too_long = index - self._start > self.max_line_length
+            discarding = self._discarding
+            line = b"" if too_long else bytes(self._view[self._start : index]).strip()
+            self._start = self._scan = index + 1
+            self._discarding = False
+            if too_long and not discarding:
+                raise self._too_long()
+            if line and not discarding:
+                yield line
+
+    def _drop(self, end: int) -> None:
+        """Forget the unfinished line and the rest of it still to come."""
+        self._start = self._scan = end
+        if not self._discarding:
+            self._discarding = True
+            raise self._too_long()
+
+    def _too_long(self) -> LineTooLongError:
+        return LineTooLongError(
+            f"Line longer than {self.max_line_length} bytes dropped"
+        )
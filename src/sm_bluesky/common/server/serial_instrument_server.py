@@ -0,0 +1,319 @@
+import logging
+from collections.abc import Callable, Sequence
+from functools import partial
+from time import monotonic
+from typing import Protocol, cast
+
+from serial import Serial
+
+from sm_bluesky.common.server.abstract_instrument_server import (
+    AbstractInstrumentServer,
+)
+from sm_bluesky.common.server.binary_protocol import Argument
+from sm_bluesky.common.server.serial_worker import SerialWorker
+from sm_bluesky.log import LOGGER
+
+ReplyParser = Callable[[list[bytes]], bytes]
+# Seconds a cached reply is served for, the instrument can change on its own,
+# e.g. from the front panel.
+CACHE_TTL = 1.0
+
+
+class SerialPort(Protocol):
+    """The part of serial.Serial that SerialInstrumentServer uses."""
+
+    is_open: bool
+
+    def write(self, data: bytes, /) -> int | None: ...
+
+    def flush(self) -> None: ...
+
+    def readline(self) -> bytes: ...
+
+    def read_until(self, expected: bytes = ...) -> bytes: ...
+
+    def reset_input_buffer(self) -> None: ...
+
+    def reset_output_buffer(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class SerialArgument:
+    """
+    One argument of a SerialCommand, converted to datatype and checked
+    against the inclusive bounds low and high before anything is sent.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        datatype: type[int] | type[float] | type[bytes] = bytes,
+        low: float | None = None,
+        high: float | None = None,
+    ) -> None:
+        self.name = name
+        self.datatype = datatype
+        self.low = low
+        self.high = high
+
+    def convert(self, value: Argument) -> int | float | bytes:
+        """
+        The value as datatype.
+
+        Raises
+        ------
+        ValueError
+            If the value is not a datatype or out of bounds.
+        """
+        if self.datatype is bytes:
+            return value if isinstance(value, bytes) else str(value).encode()
+        number = cast(type[int] | type[float], self.datatype)
+        try:
+            converted = number(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(
+                f"{self.name.capitalize()} {value!r} is not a {number.__name__}"
+            ) from e
+        if (self.low is not None and converted < self.low) or (
+            self.high is not None and converted > self.high
+        ):
+            raise ValueError(
+                f"{self.name.capitalize()} {converted} is out of bounds"
+                f" ({_bounds_text(self.low, self.high)})"
+            )
+        return converted
+
+
+class SerialCommand:
+    """
+    Declarative definition of a server command that is one exchange with a
+    serial instrument.
+
+    The instrument command is template formatted with the converted
+    arguments, e.g. b"AT+DLSET=%d", so numbers need %d, %f or %g and bytes
+    %s. reply_lines is the number of lines the instrument answers with, 0
+    for none, or the line that ends the reply, e.g. b"OK". parse turns the
+    reply lines, without that last line, into the response payload, by
+    default they are joined with tabs. The response of a cacheable command
+    is kept and served again until a command that is not cacheable is sent
+    or it is older than the cache_ttl of the server.
+
+    Example
+    -------
+    >>> set_delay = SerialCommand(
+    ...     b"set_delay", b"AT+DLSET=%d", [SerialArgument("delay", int, 0, 1023)]
+    ... )
+    >>> set_delay.format(b"500")
+    b'AT+DLSET=500'
+    >>> set_delay.format(b"1024")
+    Traceback (most recent call last):
+    ...
+    ValueError: Delay 1024 is out of bounds (0-1023)
+    """
+
+    def __init__(
+        self,
+        name: bytes,
+        template: bytes,
+        args: Sequence[SerialArgument] = (),
+        parse: ReplyParser | None = None,
+        cacheable: bool = False,
+        reply_lines: int | bytes = 1,
+    ) -> None:
+        self.name = name
+        self.template = template
+        self.args = tuple(args)
+        self.parse: ReplyParser = parse or b"\t".join
+        self.cacheable = cacheable
+        self.reply_lines = reply_lines
+
+    def format(self, *values: Argument) -> bytes:
+        """
+        The instrument command for the argument values of a request.
+
+        Raises
+        ------
+        ValueError
+            If there are too few or too many values or one is invalid.
+        """
+        if len(values) != len(self.args):
+            raise ValueError(
+                f"{self.name.decode(errors='replace')} takes {len(self.args)}"
+                f" arguments, got {len(values)}"
+            )
+        converted = tuple(
+            arg.convert(value) for arg, value in zip(self.args, values, strict=True)
+        )
+        return self.template % converted if converted else self.template
+
+
+PASS_COMMAND = SerialCommand(b"pass_command", b"%s", [SerialArgument("command")])
+
+
+class SerialInstrumentServer(AbstractInstrumentServer):
+    """
+    Server for an instrument on a serial port, e.g. USB, whose commands are
+    SerialCommand definitions.
+
+    Every exchange with the port runs on a SerialWorker thread and is given
+    up at the deadline of the command, see _timeout_context. Commands are
+    written followed by write_terminator and reply lines are read up to
+    read_terminator. Besides the given commands it serves pass_command,
+    which sends its argument as it is and replies with one line,
+    reset_serial_buffer and clear_cache, which drops all cached replies.
+    Cached replies are served for at most cache_ttl seconds.
+
+    serial_factory opens the port, serial.Serial by default, it is called
+    with port, baudrate and timeout, e.g. FakeSerial to run without the
+    instrument.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ipv6: bool = False,
+        usb_port: str = "COM4",
+        baud_rate: int = 9600,
+        timeout: float = 1.0,
+        commands: Sequence[SerialCommand] = (),
+        write_terminator: bytes = b"\r\n",
+        read_terminator: bytes = b"\n",
+        serial_factory: Callable[..., SerialPort] | None = None,
+        cache_ttl: float = CACHE_TTL,
+    ):
+        super().__init__(host, port, ipv6)
+        self.usb_port: str = usb_port
+        self.baud_rate: int = baud_rate
+        self.timeout: float = timeout
+        self.write_terminator: bytes = write_terminator
+        self.read_terminator: bytes = read_terminator
+        self.serial_factory = serial_factory
+        self.device: SerialPort | None = None
+        self.serial_commands: dict[bytes, SerialCommand] = {}
+        self._serial = SerialWorker(name=f"serial {usb_port}")
+        self.cache_ttl: float = cache_ttl
+        self._response_cache: dict[bytes, tuple[float, bytes]] = {}
+
+        self._command_registry[b"reset_serial_buffer"] = self._reset_serial_buffer
+        self._command_registry[b"clear_cache"] = self._clear_cache
+        for command in [PASS_COMMAND, *commands]:
+            self.add_serial_command(command)
+
+    def add_serial_command(self, command: SerialCommand) -> None:
+        """Serve command, replacing any command of the same name."""
+        self.serial_commands[command.name] = command
+        self._command_registry[command.name] = partial(
+            self._run_serial_command, command
+        )
+
+    def connect_hardware(self) -> bool:
+        """Open the serial port."""
+        self._response_cache.clear()
+        try:
+            self.device = (self.serial_factory or Serial)(
+                port=self.usb_port, baudrate=self.baud_rate, timeout=self.timeout
+            )
+            self._send_response(b"Hardware connected successfully")
+            return True
+        except Exception as e:
+            self._error_helper(message="Failed to connect to hardware", error=e)
+            return False
+
+    def disconnect_hardware(self) -> None:
+        """Safely release the serial port."""
+        self._serial.stop()
+        self._response_cache.clear()
+        if self.device and self.device.is_open:
+            try:
+                self.device.close()
+            except Exception as e:
+                self._error_helper(
+                    message="Error occurred while closing hardware connection", error=e
+                )
+            self._hardware_connected = False
+            self.device = None
+            LOGGER.info("Hardware disconnected successfully")
+            self._send_response(b"Hardware disconnected")
+        else:
+            self._error_helper(
+                message="Attempted to disconnect hardware that was not connected",
+                level=logging.WARNING,
+            )
+
+    def _run_serial_command(self, command: SerialCommand, *args: Argument) -> None:
+        self._send_hardware_command(command.format(*args), command)
+
+    def _reset_serial_buffer(self) -> None:
+        device = self._connected_device()
+        LOGGER.info("Reseting buffers")
+        self._serial.call(
+            lambda: (device.reset_input_buffer(), device.reset_output_buffer()),
+            self._current_deadline,
+        )
+
+    def _clear_cache(self) -> None:
+        LOGGER.info("Clearing cached responses")
+        self._response_cache.clear()
+        self._send_response(b"Cache cleared")
+
+    def _send_hardware_command(
+        self, cmd: bytes, command: SerialCommand = PASS_COMMAND
+    ) -> None:
+        """Send cmd and reply with the instrument's answer, read and parsed
+        as command defines."""
+        device = self._connected_device()
+        cached = self._response_cache.get(cmd) if command.cacheable else None
+        if cached is not None and monotonic() - cached[0] < self.cache_ttl:
+            LOGGER.debug(f"Cached response for {cmd!r}")
+            self._send_response(cached[1])
+            return
+        if not command.cacheable:
+            self._response_cache.clear()
+        LOGGER.debug(f"Sending {cmd!r} to {self.usb_port}")
+        lines = self._serial.call(
+            lambda: self._exchange(device, cmd, command.reply_lines),
+            self._current_deadline,
+        )
+        response = command.parse(lines)
+        if command.cacheable:
+            self._response_cache[cmd] = (monotonic(), response)
+        self._send_response(response)
+
+    def _exchange(
+        self, device: SerialPort, cmd: bytes, reply_lines: int | bytes
+    ) -> list[bytes]:
+        """Write one command and read its reply, runs on the serial worker."""
+        device.write(cmd + self.write_terminator)
+        device.flush()
+        if isinstance(reply_lines, int):
+            return [self._read_line(device, cmd) for _ in range(reply_lines)]
+        lines = []
+        while (line := self._read_line(device, cmd)) != reply_lines:
+            lines.append(line)
+        return lines
+
+    def _read_line(self, device: SerialPort, cmd: bytes) -> bytes:
+        if self.read_terminator == b"\n":
+            line = device.readline()
+        else:
+            line = device.read_until(self.read_terminator)
+        if not line:
+            raise TimeoutError(f"No reply to {cmd!r} from {self.usb_port}")
+        return line.removesuffix(self.read_terminator).strip()
+
+    def _connected_device(self) -> SerialPort:
+        if not self.device:
+            raise ConnectionError(
+                "Hardware not connected. Call connect_hardware first."
+            )
+        return self.device
+
+
+def _bounds_text(low: float | None, high: float | None) -> str:
+    if low is None:
+        return f"at most {high}"
+    if high is None:
+        return f"at least {low}"
+    return f"{low}-{high}"
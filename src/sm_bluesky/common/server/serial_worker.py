@@ -0,0 +1,110 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from queue import SimpleQueue
+from time import time
+from typing import Any, TypeVar
+
+from sm_bluesky.log import LOGGER
+
+T = TypeVar("T")
+
+_Request = tuple[Callable[[], Any], float | None, Future] | None
+
+
+class SerialWorker:
+    """
+    Thread that runs every serial port exchange of a server, one at a time
+    in the order they were queued.
+
+    Callers queue a function with an optional deadline and wait for its result
+    at most until the deadline, so a slow or silent instrument can no longer
+    hold the network side beyond it. An exchange that is still queued when its
+    deadline passes is never started. One that already started is left to
+    finish, which keeps its reply from being read by the next exchange.
+
+    The thread starts with the first call and after stop it starts again with
+    the next one.
+
+    Example
+    -------
+    >>> worker = SerialWorker()
+    >>> worker.call(lambda: threading.current_thread().name)
+    'serial worker'
+    >>> worker.stop()
+    """
+
+    def __init__(self, name: str = "serial worker") -> None:
+        self.name = name
+        self._queue: SimpleQueue[_Request] = SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(
+        self, function: Callable[[], T], deadline: float | None = None
+    ) -> Future[T]:
+        """Queue function, it fails with TimeoutError if it could not start
+        before deadline, a time.time() value."""
+        future: Future[T] = Future()
+        with self._start_lock:
+            if not self.is_alive:
+                # A fresh queue each time, so a stopping thread never takes
+                # requests meant for its successor.
+                self._queue = SimpleQueue()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), name=self.name, daemon=True
+                )
+                self._thread.start()
+            self._queue.put((function, deadline, future))
+        return future
+
+    def call(self, function: Callable[[], T], deadline: float | None = None) -> T:
+        """
+        Run function on the worker thread and return its result.
+
+        Raises
+        ------
+        TimeoutError
+            If the result is not ready by deadline.
+        Exception
+            Anything function raised.
+        """
+        future = self.submit(function, deadline)
+        timeout = None if deadline is None else max(deadline - time(), 0.0)
+        try:
+            return future.result(timeout)
+        except TimeoutError as e:
+            if future.done():
+                raise
+            future.cancel()
+            raise TimeoutError(f"{self.name} did not answer before the deadline") from e
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Finish the queued exchanges and end the thread."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+
+    def _run(self, queue: SimpleQueue[_Request]) -> None:
+        LOGGER.debug(f"{self.name} started")
+        while (item := queue.get()) is not None:
+            function, deadline, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            if deadline is not None and time() > deadline:
+                future.set_exception(
+                    TimeoutError(f"Deadline passed before {self.name} was free")
+                )
+                continue
+            try:
+                future.set_result(function())
+            except Exception as e:
+                future.set_exception(e)
+        LOGGER.debug(f"{self.name} stopped")
@@ -1,4 +1,11 @@
-from .sim_detectors import SimDetector
+from .sim_detectors import SimDetector, SimTriggeredDetector
 from .sim_stage import SimMotorExtra, SimStage
+from .sim_trajectory import SimTrajectoryController
 
-__all__ = ["SimDetector", "SimMotorExtra", "SimStage"]
+__all__ = [
+    "SimDetector",
+    "SimMotorExtra",
+    "SimStage",
+    "SimTrajectoryController",
+    "SimTriggeredDetector",
+]
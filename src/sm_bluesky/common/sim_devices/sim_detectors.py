@@ -1,8 +1,19 @@
+import asyncio
+
+from bluesky.protocols import Reading
 from ophyd_async.core import (
+    DetectorTriggerLogic,
+    PathProvider,
+    SignalR,
+    StandardDetector,
     StandardReadable,
+    TriggerInfo,
 )
 from ophyd_async.core import StandardReadableFormat as Format
 from ophyd_async.epics.core import epics_signal_rw
+from ophyd_async.sim import PatternGenerator
+from ophyd_async.sim._blob_acquire_logic import BlobAcquireLogic
+from ophyd_async.sim._blob_data_logic import BlobDataLogic
 
 
 class SimDetector(StandardReadable):
@@ -10,3 +21,95 @@ class SimDetector(StandardReadable):
         with self.add_children_as_readables(Format.HINTED_SIGNAL):
             self.value = epics_signal_rw(float, read_pv=prefix)
         super().__init__(name=name)
+
+
+class _TriggerInput:
+    """Edges from a frame counter, e.g. SimTrajectoryController.frames_done,
+    every new frame counted is one edge. When armed the pattern generator
+    waits for an edge before each image instead of sleeping."""
+
+    def __init__(self, source: SignalR[int] | None) -> None:
+        self.source = source
+        self.armed = False
+        self._edges: asyncio.Semaphore | None = None
+        self._count: int | None = None
+        self._subscribed = False
+
+    def arm(self) -> None:
+        if self.source is None:
+            raise ValueError("Edge triggers need a trigger_source.")
+        self._edges = asyncio.Semaphore(0)
+        self.armed = True
+        if not self._subscribed:
+            self.source.subscribe_reading(self._on_reading)
+            self._subscribed = True
+
+    def disarm(self) -> None:
+        self.armed = False
+
+    def _on_reading(self, reading: dict[str, Reading[int]]) -> None:
+        count = next(iter(reading.values()))["value"]
+        if self._count is not None and self._edges is not None:
+            for _ in range(count - self._count):
+                self._edges.release()
+        self._count = count
+
+    async def sleep(self, timeout: float) -> None:
+        if self.armed and self._edges is not None:
+            await self._edges.acquire()
+        else:
+            await asyncio.sleep(timeout)
+
+
+class _EdgeTriggerLogic(DetectorTriggerLogic):
+    """Blob trigger logic that also takes edge triggers from a _TriggerInput."""
+
+    def __init__(
+        self, pattern_generator: PatternGenerator, trigger_input: _TriggerInput
+    ) -> None:
+        self.pattern_generator = pattern_generator
+        self.trigger_input = trigger_input
+
+    async def prepare_internal(self, num: int, livetime: float, deadtime: float):
+        self.trigger_input.disarm()
+        self.pattern_generator.setup_acquisition_parameters(
+            exposure=livetime,
+            period=livetime + deadtime,
+            number_of_frames=num,
+        )
+
+    async def prepare_edge(self, num: int, livetime: float):
+        self.trigger_input.arm()
+        self.pattern_generator.setup_acquisition_parameters(
+            exposure=livetime,
+            period=livetime,
+            number_of_frames=num,
+        )
+
+    async def default_trigger_info(self) -> TriggerInfo:
+        return TriggerInfo()
+
+
+class SimTriggeredDetector(StandardDetector):
+    """
+    Blob detector that can be edge triggered by a frame counter, wired to
+    SimTrajectoryController.frames_done it is a stand in for a detector
+    triggered by the motion controller output.
+    """
+
+    def __init__(
+        self,
+        path_provider: PathProvider,
+        trigger_source: SignalR[int] | None = None,
+        name: str = "",
+    ) -> None:
+        trigger_input = _TriggerInput(trigger_source)
+        self.pattern_generator = PatternGenerator(sleep=trigger_input.sleep)
+        self.add_detector_logics(
+            _EdgeTriggerLogic(self.pattern_generator, trigger_input),
+            BlobAcquireLogic(pattern_generator=self.pattern_generator),
+            BlobDataLogic(
+                path_provider=path_provider, pattern_generator=self.pattern_generator
+            ),
+        )
+        super().__init__(name=name)
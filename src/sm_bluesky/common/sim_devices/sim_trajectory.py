@@ -0,0 +1,75 @@
+import asyncio
+
+from bluesky.protocols import Flyable, Preparable, Stageable
+from ophyd_async.core import (
+    AsyncStatus,
+    Device,
+    error_if_none,
+    soft_signal_r_and_setter,
+)
+from ophyd_async.epics.pmac import PmacScanInfo
+from scanspec.core import Path, Slice
+
+
+class SimTrajectoryController(Device, Stageable, Preparable, Flyable):
+    """
+    Simulated trajectory motion controller, a stand in for
+    PmacTrajectoryTriggerLogic that steps the motors in the scanspec
+    through every frame midpoint with the frame duration. frames_done counts
+    up once per frame and can edge trigger a SimTriggeredDetector.
+    """
+
+    def __init__(self, name: str = "") -> None:
+        self.frames_done, self._frames_done_set = soft_signal_r_and_setter(int, 0)
+        self._slice: Slice | None = None
+        self._trajectory_task: asyncio.Task | None = None
+        super().__init__(name=name)
+
+    @AsyncStatus.wrap
+    async def stage(self) -> None:
+        self._frames_done_set(0)
+
+    @AsyncStatus.wrap
+    async def unstage(self) -> None:
+        if self._trajectory_task is not None:
+            self._trajectory_task.cancel()
+            self._trajectory_task = None
+
+    @AsyncStatus.wrap
+    async def prepare(self, value: PmacScanInfo) -> None:
+        """Calculate the trajectory and move to the first frame."""
+        self._slice = Path(value.spec.calculate()).consume()
+        if self._slice.duration is None:
+            raise ValueError("Trajectory scan requires a spec with frame duration.")
+        self._frames_done_set(0)
+        await self._move_to_frame(self._slice, 0)
+
+    @AsyncStatus.wrap
+    async def kickoff(self) -> None:
+        trajectory = error_if_none(self._slice, "Cannot kickoff. Must prepare first.")
+        self._slice = None
+        self._trajectory_task = asyncio.create_task(self._execute(trajectory))
+
+    @AsyncStatus.wrap
+    async def complete(self) -> None:
+        trajectory_task = error_if_none(
+            self._trajectory_task, "Cannot complete. Must kickoff first."
+        )
+        await trajectory_task
+        self._trajectory_task = None
+
+    async def _execute(self, trajectory: Slice) -> None:
+        durations = error_if_none(trajectory.duration, "Missing frame duration.")
+        for index, duration in enumerate(durations):
+            await asyncio.sleep(duration)
+            await self._move_to_frame(trajectory, index)
+            self._frames_done_set(index + 1)
+
+    @staticmethod
+    async def _move_to_frame(trajectory: Slice, index: int) -> None:
+        await asyncio.gather(
+            *(
+                motor.set(float(points[index]))
+                for motor, points in trajectory.midpoints.items()
+            )
+        )
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import pytest
 from dodal.devices.beamlines.i10.rasor.rasor_current_amp import RasorFemto
 from dodal.devices.beamlines.i10.rasor.rasor_motors import (
@@ -12,6 +14,12 @@ from dodal.devices.motors import XYStage, XYZStage
 from ophyd_async.core import init_devices
 
 
+@pytest.fixture(autouse=True)
+def look_up_tables(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep the refined detector slit tables out of the home directory."""
+    monkeypatch.setenv("SM_BLUESKY_LOOK_UP_TABLE_DIR", str(tmp_path))
+
+
 @pytest.fixture
 def slits() -> I10Slits:
     with init_devices(mock=True):
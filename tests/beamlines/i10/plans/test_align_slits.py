@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import sleep
 from unittest.mock import ANY, MagicMock, patch
 
 import pytest
 from bluesky.simulators import RunEngineSimulator
+from dodal.devices.beamlines.i10.rasor.rasor_current_amp import RasorFemto
 from dodal.devices.beamlines.i10.rasor.rasor_motors import (
     DetSlits,
     Diffractometer,
@@ -9,18 +13,24 @@ from dodal.devices.beamlines.i10.rasor.rasor_motors import (
 from dodal.devices.beamlines.i10.slits import I10Slits
 from dodal.devices.current_amplifiers import CurrentAmpDet
 from dodal.devices.motors import XYZStage
-from ophyd_async.core import StandardReadable
+from ophyd_async.core import StandardReadable, get_mock_put
 
+from sm_bluesky.beamlines.i10.plans import align_slits
 from sm_bluesky.beamlines.i10.plans.align_slits import (
     DSD,
     DSU,
     align_pa_slit,
     align_s5s6,
     align_slit,
+    dsd_store,
+    dsu_store,
     move_dsd,
     move_dsu,
 )
-from tests.helpers import check_msg_set, check_msg_wait, check_mv_wait
+from sm_bluesky.common.helper import estimate_duration
+from sm_bluesky.common.plan_stubs import LookUpTableStore
+from sm_bluesky.common.plans import StatPosition
+from tests.helpers import check_msg_set, check_msg_wait
 
 
 def test_move_dsu(sim_run_engine: RunEngineSimulator, det_slits: DetSlits) -> None:
@@ -37,6 +47,45 @@ def test_move_dsd(sim_run_engine: RunEngineSimulator, det_slits: DetSlits) -> No
     assert len(msgs) == 1
 
 
+def test_move_dsu_interpolates_size_between_entries(
+    sim_run_engine: RunEngineSimulator, det_slits: DetSlits
+) -> None:
+    msgs = sim_run_engine.simulate_plan(move_dsu(300, det_slits=det_slits))
+    halfway = (DSU["100"] + DSU["500"]) / 2
+    msgs = check_msg_set(msgs=msgs, obj=det_slits.upstream, value=halfway)
+    assert dsu_store().table()(300) == pytest.approx(halfway)
+
+
+def test_move_dsd_reads_table_directory_when_run(
+    sim_run_engine: RunEngineSimulator,
+    det_slits: DetSlits,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    plan = move_dsd(50, det_slits=det_slits)
+    monkeypatch.setenv("SM_BLUESKY_LOOK_UP_TABLE_DIR", str(tmp_path / "later"))
+    dsd_store().record("50", 35.0)
+    msgs = sim_run_engine.simulate_plan(plan)
+    msgs = check_msg_set(msgs=msgs, obj=det_slits.downstream, value=35.0)
+    assert dsd_store().path == tmp_path / "later" / "i10_dsd.json"
+    assert dsd_store() is dsd_store()
+
+
+def test_dsd_store_opened_once_across_threads(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SM_BLUESKY_LOOK_UP_TABLE_DIR", str(tmp_path / "threads"))
+
+    def slow_store(*args, **kwargs) -> LookUpTableStore:
+        sleep(0.01)
+        return LookUpTableStore(*args, **kwargs)
+
+    monkeypatch.setattr(align_slits, "LookUpTableStore", slow_store)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        stores = list(pool.map(lambda _: dsd_store(), range(4)))
+    assert all(store is stores[0] for store in stores)
+
+
 @patch(
     "sm_bluesky.beamlines.i10.plans.align_slits.align_slit_with_look_up",
 )
@@ -52,10 +101,19 @@ def test_align_pa_slit(
         )
     )
     msgs = check_msg_set(msgs=msgs, obj=det_slits.downstream, value=DSD["5000"])
-    msgs = check_msg_wait(msgs=msgs, wait_group=ANY, wait=True)
-
-    assert len(msgs) == 1
+    assert msgs[0].kwargs["group"] == "pa slits group"
+    # The dsd move is only waited for by the dsu scan.
+    assert [msg for msg in msgs if msg.command == "wait"] == []
     assert fake_step_scan_and_move_fit.call_count == 2
+    assert fake_step_scan_and_move_fit.call_args_list[0].kwargs == {
+        "motor": det_slits.upstream,
+        "size": 50,
+        "slit_table": dsu_store(),
+        "det": rasor_femto_pa_scaler_det,
+        "centre_type": ANY,
+        "group": "pa slits group",
+    }
+    assert fake_step_scan_and_move_fit.call_args_list[1].kwargs["group"] is None
 
 
 @patch(
@@ -81,8 +139,15 @@ def test_align_s5s6(
     msgs = check_msg_set(msgs=msgs, obj=diffractometer.tth, value=0)
     msgs = check_msg_set(msgs=msgs, obj=diffractometer.th, value=0)
     msgs = check_msg_set(msgs=msgs, obj=sample_stage.y, value=-3)
-    msgs = check_msg_wait(msgs=msgs, wait_group="diff group A")
-    assert len(msgs) == 1
+    # Left running for the s5 set up, s5 final gaps for the s6 set up.
+    assert [msg for msg in msgs if msg.command == "wait"] == []
+    s5_call, s6_call = mock_align_slit.call_args_list
+    assert s5_call.kwargs["slit"] is slits.s5
+    assert s5_call.kwargs["wait"] is False
+    assert s5_call.kwargs["group"] == "s5s6 group"
+    assert s6_call.kwargs["slit"] is slits.s6
+    assert s6_call.kwargs["group"] == "s5s6 group"
+    assert "wait" not in s6_call.kwargs
 
 
 @patch(
@@ -134,9 +199,8 @@ def test_align_slit(
     )
     msgs = check_msg_set(msgs=msgs, obj=slit.x_gap, value=x_scan_size)
     msgs = check_msg_set(msgs=msgs, obj=slit.y_gap, value=y_open_size)
-    msgs = check_msg_wait(msgs=msgs, wait_group="slits group")
     msgs = check_msg_set(msgs=msgs, obj=slit.y_centre, value=y_cen)
-    msgs = check_mv_wait(msgs=msgs, wait_group=ANY)
+    msgs = check_msg_wait(msgs=msgs, wait_group="slits group")
     msgs = check_msg_set(msgs=msgs, obj=slit.y_gap, value=y_scan_size)
     msgs = check_msg_set(msgs=msgs, obj=slit.x_gap, value=x_open_size)
     msgs = check_msg_wait(msgs=msgs, wait_group="slits group")
@@ -146,3 +210,98 @@ def test_align_slit(
     assert len(msgs) == 1
     assert mock_step_scan.call_count == 2
     assert mock_cal_range.call_count == 2
+
+
+@patch("sm_bluesky.beamlines.i10.plans.align_slits.fast_raster_and_move_fit")
+def test_align_slit_raster(
+    mock_raster: MagicMock,
+    sim_run_engine: RunEngineSimulator,
+    rasor_femto_pa_scaler_det: StandardReadable,
+    slits: I10Slits,
+) -> None:
+    slit = slits.s5
+    msgs = sim_run_engine.simulate_plan(
+        align_slit(
+            rasor_femto_pa_scaler_det,
+            slit,
+            x_scan_size=0.1,
+            x_final_size=0.65,
+            x_open_size=2,
+            y_scan_size=0.2,
+            y_final_size=1.3,
+            y_open_size=4,
+            x_range=2,
+            x_cen=0.5,
+            y_range=1,
+            y_cen=0,
+            centre_type=StatPosition.GAUSS_CEN,
+            raster=True,
+        )
+    )
+    mock_raster.assert_called_once_with(
+        det=rasor_femto_pa_scaler_det,
+        step_motor=slit.y_centre,
+        scan_motor=slit.x_centre,
+        fitted_loc=StatPosition.GAUSS_CEN,
+        detname_suffix="value",
+        step_start=-1,
+        step_end=1,
+        num_step=11,
+        scan_start=-1.5,
+        scan_end=2.5,
+        motor_speed=None,
+        setup_moves={slit.x_gap: 0.1, slit.y_gap: 0.2},
+        group="slits group",
+    )
+    msgs = check_msg_set(msgs=msgs, obj=slit.x_gap, value=0.65)
+    msgs = check_msg_set(msgs=msgs, obj=slit.y_gap, value=1.3)
+    msgs = check_msg_wait(msgs=msgs, wait_group="slits group")
+    assert len(msgs) == 1
+
+
+def test_align_slit_no_wait_leaves_final_gaps_in_group(
+    sim_run_engine: RunEngineSimulator,
+    rasor_femto_pa_scaler_det: StandardReadable,
+    slits: I10Slits,
+) -> None:
+    with patch("sm_bluesky.beamlines.i10.plans.align_slits.step_scan_and_move_fit"):
+        msgs = sim_run_engine.simulate_plan(
+            align_slit(
+                rasor_femto_pa_scaler_det,
+                slits.s6,
+                0.1,
+                0.45,
+                4,
+                0.1,
+                0.6,
+                4,
+                2,
+                0,
+                2,
+                0,
+                wait=False,
+                group="s5s6 group",
+            )
+        )
+    waits = [msg.kwargs["group"] for msg in msgs if msg.command == "wait"]
+    assert waits == ["s5s6 group", "s5s6 group"]
+    msgs = check_msg_set(msgs=msgs, obj=slits.s6.x_gap, value=0.45)
+    msgs = check_msg_set(msgs=msgs, obj=slits.s6.y_gap, value=0.6)
+    assert msgs[0].kwargs["group"] == "s5s6 group"
+    assert len(msgs) == 1
+
+
+async def test_align_slit_estimate_stops_at_fit_without_setting_devices(
+    rasor_femto: RasorFemto,
+    rasor_femto_pa_scaler_det: CurrentAmpDet,
+    slits: I10Slits,
+) -> None:
+    slit = slits.s5
+    estimate = await estimate_duration(
+        align_slit(rasor_femto_pa_scaler_det, slit, 0.1, 1, 2, 0.1, 1, 2, 1, 0, 1, 0)
+    )
+    # The unmoved detector gives a flat x scan that cannot be fitted.
+    assert not estimate["finished"]
+    assert estimate["readout"] > 0
+    assert 0 == get_mock_put(rasor_femto.ca1.gain).call_count
+    assert 0 == get_mock_put(slit.x_gap.user_setpoint).call_count
@@ -35,6 +35,7 @@ async def test_centre_tth(
         num=21,
         detname_suffix=RASOR_DEFAULT_DET_NAME_EXTENSION,
         fitted_loc=StatPosition.CEN,
+        stop_fraction=None,
     )
 
 
@@ -55,6 +56,7 @@ async def test_centre_alpha(
         num=21,
         detname_suffix=RASOR_DEFAULT_DET_NAME_EXTENSION,
         fitted_loc=StatPosition.CEN,
+        stop_fraction=None,
     )
 
 
@@ -76,6 +78,7 @@ async def test_centre_det_angles(
         num=21,
         detname_suffix=RASOR_DEFAULT_DET_NAME_EXTENSION,
         fitted_loc=StatPosition.CEN,
+        stop_fraction=None,
     )
     assert fake_step_scan_and_move_fit.call_args_list[1] == call(
         det=rasor_femto_pa_scaler_det,
@@ -85,6 +88,7 @@ async def test_centre_det_angles(
         num=21,
         detname_suffix=RASOR_DEFAULT_DET_NAME_EXTENSION,
         fitted_loc=StatPosition.CEN,
+        stop_fraction=None,
     )
 
 
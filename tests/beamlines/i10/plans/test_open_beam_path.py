@@ -1,5 +1,6 @@
 from unittest.mock import Mock, patch
 
+import pytest
 from bluesky.run_engine import RunEngine
 from bluesky.simulators import RunEngineSimulator
 from dodal.devices.beamlines.i10.rasor.rasor_motors import DetSlits, PaStage
@@ -23,6 +24,7 @@ from sm_bluesky.beamlines.i10.plans import (
     open_s5s6,
     remove_pin_hole,
 )
+from sm_bluesky.common.helper import estimate_duration
 from tests.helpers import check_msg_set, check_msg_wait
 
 
@@ -173,3 +175,20 @@ async def test_clear_beam_path(
     open_dsd_dsu.assert_called_once()
     open_s5s6.assert_called_once()
     remove_pin_hole.assert_called_once()
+
+
+async def test_clear_beam_path_estimate(
+    slits: I10Slits, det_slits: DetSlits, pin_hole: XYStage, pa_stage: PaStage
+) -> None:
+    set_mock_value(pin_hole.x.velocity, 10)
+    set_mock_value(pin_hole.x.acceleration_time, 0)
+    estimate = await estimate_duration(
+        clear_beam_path(
+            slits=slits, det_slits=det_slits, pin_hole=pin_hole, pa_stage=pa_stage
+        )
+    )
+    assert estimate["finished"]
+    # Everything moves at once, the pin hole is the slowest.
+    assert estimate["total"] == pytest.approx(PIN_HOLE_OPEING_POS / 10)
+    assert estimate["moves"] == estimate["total"]
+    assert 0 == get_mock_put(pin_hole.x.user_setpoint).call_count
@@ -0,0 +1,183 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+from bluesky.run_engine import RunEngine, call_in_bluesky_event_loop
+from ophyd_async.core import get_mock_put, init_devices, set_mock_value
+from ophyd_async.plan_stubs import ensure_connected
+
+from sm_bluesky.common.devices import (
+    InstrumentServerConnection,
+    PulseGeneratorClient,
+)
+from sm_bluesky.common.plan_stubs.set_and_do_other_plan import (
+    set_and_wait_within_tolerance,
+)
+from sm_bluesky.common.server import AbstractInstrumentServer
+
+
+class FakePulseServer(AbstractInstrumentServer):
+    """Pulse generator server that keeps the delay in memory."""
+
+    def __init__(self) -> None:
+        super().__init__(host="127.0.0.1", port=0)
+        self.delay = 0
+        self.connections = 0
+        self._command_registry.update(
+            {b"set_delay": self._set_delay, b"get_delay": self._get_delay}
+        )
+
+    def connect_hardware(self) -> bool:
+        return True
+
+    def disconnect_hardware(self) -> None:
+        pass
+
+    async def _serve_client_async(self, reader, writer) -> None:
+        self.connections += 1
+        await super()._serve_client_async(reader, writer)
+
+    def _set_delay(self, value: bytes) -> None:
+        delay = int(value)
+        if not 0 <= delay < 1024:
+            raise ValueError(f"Delay {delay} is out of bounds (0-1023)")
+        self.delay = delay
+        self._send_response(b"set success: %d" % delay)
+
+    def _get_delay(self) -> None:
+        self._send_response(b"DLSET=%d" % self.delay)
+
+    def drop_clients(self) -> None:
+        assert self._loop is not None
+        for writer in list(self._clients):
+            self._loop.call_soon_threadsafe(writer.close)
+
+
+@pytest.fixture
+def fake_server():
+    server = FakePulseServer()
+    thread = threading.Thread(target=server.start_concurrent, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server._is_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield server
+    server.stop()
+    thread.join(5)
+    InstrumentServerConnection._pool.clear()
+
+
+@pytest.fixture
+async def pulse_generator(fake_server: FakePulseServer):
+    device = PulseGeneratorClient("127.0.0.1", fake_server.port, name="pulse")
+    await device.connect()
+    yield device
+    await device.connection.close()
+
+
+async def test_delay_signal_sets_and_reads_server(
+    pulse_generator: PulseGeneratorClient, fake_server: FakePulseServer
+):
+    await pulse_generator.delay.set(300)
+    assert fake_server.delay == 300
+    assert await pulse_generator.delay.get_value() == 300
+    assert (await pulse_generator.delay.read())["pulse-delay"]["value"] == 300
+    description = await pulse_generator.delay.describe()
+    assert description["pulse-delay"]["source"].endswith("/get_delay")
+
+
+async def test_devices_share_one_pipelined_connection(
+    pulse_generator: PulseGeneratorClient, fake_server: FakePulseServer
+):
+    other = PulseGeneratorClient("127.0.0.1", fake_server.port, name="other")
+    await other.connect()
+    assert other.connection is pulse_generator.connection
+    replies = await asyncio.gather(
+        *(pulse_generator.request("set_delay", i) for i in range(50)),
+        other.request("get_delay"),
+    )
+    assert replies[:50] == [b"set success: %d" % i for i in range(50)]
+    assert fake_server.connections == 1
+
+
+async def test_server_error_raised(pulse_generator: PulseGeneratorClient):
+    with pytest.raises(RuntimeError, match="Delay 5000 is out of bounds"):
+        await pulse_generator.delay.set(5000)
+
+
+async def test_reconnects_after_connection_drop(
+    pulse_generator: PulseGeneratorClient, fake_server: FakePulseServer
+):
+    pulse_generator.connection.reconnect_delay = 0.01
+    fake_server.drop_clients()
+    await asyncio.sleep(0.1)
+    await pulse_generator.delay.set(12)
+    assert await pulse_generator.delay.get_value() == 12
+    assert fake_server.connections == 2
+
+
+async def test_request_fails_without_server(fake_server: FakePulseServer):
+    connection = InstrumentServerConnection(
+        "127.0.0.1", fake_server.port, retries=1, reconnect_delay=0.01
+    )
+    fake_server.stop()
+    await asyncio.sleep(0.1)
+    with pytest.raises(ConnectionError, match="Instrument server 127.0.0.1"):
+        await connection.request("ping")
+
+
+async def test_mock_client_needs_no_server():
+    with init_devices(mock=True):
+        pulse = PulseGeneratorClient("127.0.0.1", _free_port())
+    set_mock_value(pulse.delay, 12)
+    await pulse.delay.set(40)
+    get_mock_put(pulse.delay).assert_called_once_with(40)
+    assert not pulse.connection.connected
+
+
+@pytest.mark.parametrize("argument", [b"1\t2", "1\n", b"\n"])
+async def test_request_rejects_field_separators(argument: bytes | str):
+    connection = InstrumentServerConnection("127.0.0.1", _free_port())
+    with pytest.raises(ValueError, match="contains a tab or newline"):
+        await connection.request(b"set_delay", argument)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def test_request_timeout_is_not_retried():
+    received: list[bytes] = []
+
+    async def never_reply(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        while line := await reader.readline():
+            received.append(line)
+        writer.close()
+
+    server = await asyncio.start_server(never_reply, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    connection = InstrumentServerConnection("127.0.0.1", port, timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError, match="No reply from instrument server"):
+            await connection.request("set_delay", 5)
+    finally:
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+    assert received == [b"#1\tset_delay\t5\n"]
+
+
+def test_delay_moves_in_set_and_wait_within_tolerance(
+    run_engine: RunEngine, fake_server: FakePulseServer
+):
+    device = PulseGeneratorClient("127.0.0.1", fake_server.port, name="pulse")
+    run_engine(ensure_connected(device))
+    run_engine(set_and_wait_within_tolerance(device.delay, 200, 0.5, time=0.01))
+    assert fake_server.delay == 200
+    call_in_bluesky_event_loop(device.connection.close())
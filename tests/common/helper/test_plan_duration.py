@@ -0,0 +1,155 @@
+import time
+
+import bluesky.plan_stubs as bps
+import pytest
+from dodal.devices.motors import XYZStage
+from dodal.devices.single_trigger_detector import SingleTriggerDetector
+from ophyd_async.core import get_mock_put, set_mock_value
+
+from sm_bluesky.common.helper import estimate_duration
+from sm_bluesky.common.plan_stubs import DEVICE_STATE_CACHE
+from sm_bluesky.common.plans import (
+    StatPosition,
+    fast_scan_1d,
+    grid_step_scan,
+    step_scan_and_move_fit,
+)
+from sm_bluesky.common.sim_devices import SimDetector
+
+
+def assert_buckets_add_up(estimate) -> None:
+    assert estimate["total"] == pytest.approx(
+        estimate["moves"]
+        + estimate["settling"]
+        + estimate["acquisition"]
+        + estimate["readout"]
+    )
+
+
+async def test_estimate_duration_sleep() -> None:
+    estimate = await estimate_duration(bps.sleep(2.5))
+    assert estimate["settling"] == pytest.approx(2.5)
+    assert estimate["total"] == pytest.approx(2.5)
+    assert estimate["finished"]
+
+
+async def test_estimate_duration_grid_step_scan(
+    sim_motor: XYZStage, andor2_point: SingleTriggerDetector
+) -> None:
+    set_mock_value(sim_motor.x.velocity, 1)
+    set_mock_value(sim_motor.y.velocity, 1)
+    set_mock_value(sim_motor.x.user_readback, 0)
+    estimate = await estimate_duration(
+        grid_step_scan(
+            dets=[andor2_point],
+            count_time=0.2,
+            x_step_motor=sim_motor.x,
+            x_step_start=0,
+            x_step_end=1,
+            x_step_size=0.5,
+            y_step_motor=sim_motor.y,
+            y_step_start=0,
+            y_step_end=1,
+            y_step_size=0.5,
+        ),
+        sim_motor.x,
+        sim_motor.y,
+    )
+    assert estimate["finished"]
+    assert estimate["acquisition"] == pytest.approx(9 * 0.2)
+    # 1 s along each of the 3 lines, y flies back while x steps, twice.
+    assert estimate["moves"] == pytest.approx(3 * 1 + 2 * 1)
+    assert_buckets_add_up(estimate)
+    assert 0 == get_mock_put(sim_motor.x.user_setpoint).call_count
+    assert 0 == get_mock_put(andor2_point.drv.acquire).call_count
+
+
+async def test_estimate_duration_fast_scan_1d(
+    sim_motor: XYZStage, fake_detector: SimDetector
+) -> None:
+    set_mock_value(sim_motor.x.acceleration_time, 0.5)
+    estimate = await estimate_duration(
+        fast_scan_1d([fake_detector], sim_motor.x, -2, 6, motor_speed=4), sim_motor.x
+    )
+    assert estimate["finished"]
+    assert estimate["acquisition"] == pytest.approx(2, abs=0.01)
+    assert estimate["total"] > 3
+    assert_buckets_add_up(estimate)
+    assert 2.78 == await sim_motor.x.velocity.get_value()
+
+
+async def test_estimate_duration_stops_on_failed_fit(
+    sim_motor: XYZStage, fake_detector: SimDetector
+) -> None:
+    set_mock_value(sim_motor.x.velocity, 1)
+    estimate = await estimate_duration(
+        step_scan_and_move_fit(
+            fake_detector, sim_motor.x, StatPosition.CEN, "value", 1, 2, 11
+        )
+    )
+    assert not estimate["finished"]
+    assert estimate["moves"] == pytest.approx(1)
+
+
+async def test_estimate_duration_raises_out_of_limit_scan(
+    sim_motor: XYZStage, fake_detector: SimDetector
+) -> None:
+    with pytest.raises(ValueError, match="sim_motor-x"):
+        await estimate_duration(
+            fast_scan_1d([fake_detector], sim_motor.x, 0, 20, motor_speed=1),
+            sim_motor.x,
+        )
+    assert 0 == get_mock_put(sim_motor.x.user_setpoint).call_count
+
+
+async def test_estimate_duration_leaves_session_cache_alone(
+    sim_motor: XYZStage, fake_detector: SimDetector
+) -> None:
+    session_ttl = DEVICE_STATE_CACHE.ttl
+    estimate = await estimate_duration(
+        fast_scan_1d([fake_detector], sim_motor.x, 0, 2, motor_speed=1), sim_motor.x
+    )
+    assert estimate["finished"]
+    assert DEVICE_STATE_CACHE.ttl == session_ttl
+    assert not DEVICE_STATE_CACHE._entries
+
+
+async def test_estimate_duration_paces_reads_on_simulated_clock(
+    sim_motor: XYZStage, fake_detector: SimDetector, caplog: pytest.LogCaptureFixture
+) -> None:
+    set_mock_value(sim_motor.x.acceleration_time, 0)
+    estimate = await estimate_duration(
+        fast_scan_1d(
+            [fake_detector], sim_motor.x, 0, 2, motor_speed=1, sample_period=0.5
+        ),
+        sim_motor.x,
+    )
+    assert estimate["finished"]
+    # The 2 s line after the run up to the start.
+    assert estimate["total"] == pytest.approx(2.36, abs=0.01)
+    assert "Achieved 2 Hz, requested 2 Hz, 4 reads, 0 skipped." in caplog.text
+
+
+async def test_estimate_duration_long_fly_line_is_quick(
+    sim_motor: XYZStage, fake_detector: SimDetector
+) -> None:
+    set_mock_value(sim_motor.x.acceleration_time, 0)
+    start = time.monotonic()
+    estimate = await estimate_duration(
+        fast_scan_1d([fake_detector], sim_motor.x, 0, 5, motor_speed=0.01),
+        sim_motor.x,
+    )
+    assert time.monotonic() - start < 1
+    assert estimate["finished"]
+    assert estimate["total"] == pytest.approx(500.36, abs=0.01)
+    assert_buckets_add_up(estimate)
+
+
+@pytest.mark.parametrize("error", [KeyError, TypeError])
+async def test_estimate_duration_raises_plan_bugs(error: type[Exception]) -> None:
+    def broken_plan():
+        yield from bps.sleep(1)
+        raise error("bug")
+
+    with pytest.raises(error):
+        await estimate_duration(broken_plan())
@@ -0,0 +1,68 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pytest
+from bluesky.run_engine import RunEngine
+from dodal.devices.motors import XYZStage
+from ophyd_async.sim import SimPointDetector
+
+from sm_bluesky.common.helper import StreamAligner
+from sm_bluesky.common.plans import fast_scan_1d
+
+
+def make_docs(aligner: StreamAligner) -> None:
+    aligner("start", {"uid": "start", "time": 0})  # type: ignore
+    aligner("descriptor", {"uid": "fast", "name": "primary"})  # type: ignore
+    aligner("descriptor", {"uid": "slow", "name": "slow"})  # type: ignore
+    for t in range(5):
+        aligner(
+            "event",
+            {"descriptor": "fast", "time": t, "data": {"x": t * 2.0, "a": t}},  # type: ignore
+        )
+    for t in (0, 4):
+        aligner(
+            "event",
+            {"descriptor": "slow", "time": t, "data": {"x": t * 2.0, "b": t * 10}},  # type: ignore
+        )
+
+
+@pytest.mark.parametrize("key", [None, "x"])
+def test_stream_aligner_align(key: str | None) -> None:
+    aligner = StreamAligner()
+    make_docs(aligner)
+    aligned = aligner.align(key=key)
+    assert aligned["a"] == pytest.approx([0, 1, 2, 3, 4])
+    assert aligned["b"] == pytest.approx([0, 10, 20, 30, 40])
+
+
+def test_stream_aligner_align_fail() -> None:
+    aligner = StreamAligner()
+    make_docs(aligner)
+    with pytest.raises(ValueError):
+        aligner.align(reference="baseline")
+    with pytest.raises(ValueError):
+        aligner.align(key="y")
+
+
+async def test_stream_aligner_with_fast_scan(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: XYZStage,
+) -> None:
+    det = SimPointDetector(name="rand", pattern_generator=None, num_channels=1)
+    aligner = StreamAligner()
+    run_engine.subscribe(aligner)
+    run_engine(
+        fast_scan_1d(
+            [sim_stage_delay.y],
+            sim_stage_delay.x,
+            1,
+            5,
+            10,
+            det_groups={"slow": {"dets": [det], "period": 0.1}},
+        )
+    )
+    aligned = aligner.align(key="sim_stage_delay-x")
+    num_primary = len(aligner.times["primary"])
+    assert len(aligned["rand-channel-1-value"]) == num_primary
+    assert np.all(np.isfinite(aligned["rand-channel-1-value"]))
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from bluesky.callbacks.fitting import PeakStats
+from tests.helpers import gaussian
+
+from sm_bluesky.common.helper import StreamingPeakStats
+
+
+def run_callback(callback, x_data, y_data) -> None:
+    callback("start", {"uid": "start", "time": 0})
+    for x, y in zip(x_data, y_data, strict=True):
+        callback("event", {"descriptor": "d", "data": {"x": x, "y": y}})
+
+
+def test_streaming_peak_stats_match_peak_stats() -> None:
+    x_data = np.linspace(-2, 3, 41)
+    y_data = gaussian(x_data, 0.4, 0.5) + 0.1
+    live = StreamingPeakStats("x", "y")
+    ps = PeakStats("x", "y")
+    run_callback(live, x_data, y_data)
+    run_callback(ps, x_data, y_data)
+    ps("stop", {"uid": "stop", "run_start": "start", "time": 1})
+    assert live.cen == pytest.approx(ps.cen)
+    assert live.fwhm == pytest.approx(ps.fwhm)
+    assert live.com == pytest.approx(0.4, abs=0.01)
+    assert live.max == pytest.approx(ps.max)
+    assert live.derivative_max is not None and live.derivative_min is not None
+    assert live.derivative_max[0] < 0.4 < live.derivative_min[0]
+    assert not live.done
+
+
+def test_streaming_peak_stats_stop_once_bracketed() -> None:
+    x_data = np.linspace(-2, 3, 41)
+    live = StreamingPeakStats("x", "y", stop_fraction=0.2)
+    for x, y in zip(x_data, gaussian(x_data, 0, 0.3), strict=True):
+        live.update(x, y)
+        if live.done:
+            break
+    # Below 20% of the peak from 0.625, plus one more point for patience.
+    assert live.x_data[-1] == pytest.approx(0.75)
+    assert live.cen == pytest.approx(0, abs=0.01)
+
+
+def test_streaming_peak_stats_stop_on_offset_peak() -> None:
+    x_data = np.linspace(-2, 3, 41)
+    peak = gaussian(x_data, 0, 0.3)
+    live = StreamingPeakStats("x", "y", stop_fraction=0.5)
+    # Peak of 1000 over a background of 900, it never drops below 500.
+    for x, y in zip(x_data, 900 + 100 * peak / peak.max(), strict=True):
+        live.update(x, y)
+        if live.done:
+            break
+    assert live.max == pytest.approx((0, 1000))
+    # Below 950 from 0.375, plus one more point for patience.
+    assert live.x_data[-1] == pytest.approx(0.5)
+
+
+def test_streaming_peak_stats_does_not_stop_on_a_flank() -> None:
+    x_data = np.linspace(0, 3, 31)
+    live = StreamingPeakStats("x", "y", stop_fraction=0.2)
+    # Starts on the peak so it is never bracketed on the left.
+    for x, y in zip(x_data, gaussian(x_data, 0, 0.3), strict=True):
+        live.update(x, y)
+    assert not live.done
+
+
+def test_streaming_peak_stats_bad_fraction() -> None:
+    with pytest.raises(ValueError, match="stop_fraction 1.5 is not between 0 and 1"):
+        StreamingPeakStats("x", "y", stop_fraction=1.5)
@@ -1,6 +1,6 @@
 import pytest
 
-from sm_bluesky.common.math_functions import cal_range_num
+from sm_bluesky.common.math_functions import cal_range_num, cal_trigger_table
 
 
 @pytest.mark.parametrize(
@@ -28,3 +28,15 @@ def test_slit_cal_range_num(
     test_input: list[float], expected_output: tuple[float]
 ) -> None:
     assert cal_range_num(*test_input) == pytest.approx(expected_output, 0.01)
+
+
+def test_cal_trigger_table() -> None:
+    positions, period = cal_trigger_table(start=5, end=-1, speed=2, num=3)
+    assert positions == pytest.approx([4, 2, 0])
+    assert period == pytest.approx(1)
+
+
+@pytest.mark.parametrize("speed, num", [(0, 3), (2, 0)])
+def test_cal_trigger_table_fail(speed: float, num: int) -> None:
+    with pytest.raises(ValueError):
+        cal_trigger_table(start=5, end=-1, speed=speed, num=num)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from sm_bluesky.common.math_functions import GoldenSectionSearch
+from tests.helpers import gaussian
+
+
+@pytest.mark.parametrize("centre", [-4.1, -0.3, 0, 1.234, 4.6])
+def test_golden_section_search_finds_peak(centre: float) -> None:
+    search = GoldenSectionSearch(-5, 5, tolerance=0.01)
+    while (x := search.ask()) is not None:
+        search.tell(x, float(gaussian(np.array([x]), centre, 0.5)[0]))
+    assert search.result == pytest.approx(centre, abs=0.01)
+    # 7 seeds and one point per golden step from a bracket of at most 10/3.
+    assert len(search.positions) <= 21
+
+
+def test_golden_section_search_bad_input() -> None:
+    with pytest.raises(ValueError, match="Tolerance must be positive"):
+        GoldenSectionSearch(0, 1, tolerance=0)
+    with pytest.raises(ValueError, match="Need at least 3 seed points"):
+        GoldenSectionSearch(0, 1, tolerance=0.1, seed_points=2)
+    with pytest.raises(ValueError, match="No points measured."):
+        _ = GoldenSectionSearch(0, 1, tolerance=0.1).result
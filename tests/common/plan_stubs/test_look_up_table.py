@@ -0,0 +1,157 @@
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+from bluesky.run_engine import RunEngine
+from dodal.devices.motors import XYZStage
+
+from sm_bluesky.common.plan_stubs import (
+    Interpolation,
+    LookUpTable,
+    LookUpTableStore,
+    as_look_up_table,
+    look_up_position,
+    move_motor_with_look_up,
+)
+
+DEFAULTS = {"5000": 1.8, "1000": 8, "50": -34.3}
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> LookUpTableStore:
+    return LookUpTableStore(tmp_path / "tables" / "dsu.json", DEFAULTS)
+
+
+def test_store_reads_defaults_without_file(store: LookUpTableStore) -> None:
+    assert dict(store) == {"50": -34.3, "1000": 8, "5000": 1.8}
+    assert store.version == 0
+    assert store.entry("50") is None
+    assert not store.path.exists()
+
+
+def test_store_record_persists(store: LookUpTableStore) -> None:
+    entry = store.record("50", -34.1, fwhm=0.02, cen_error=0.001)
+    assert entry["version"] == 1
+    assert store["50"] == -34.1
+    store.record("100", 12.5)
+    reloaded = LookUpTableStore(store.path, DEFAULTS)
+    assert reloaded.version == 2
+    assert reloaded.entry("50") == entry
+    assert list(reloaded) == ["50", "100", "1000", "5000"]
+    assert [p.name for p in store.path.parent.iterdir()] == ["dsu.json"]
+    content = json.loads(store.path.read_text())
+    assert content["schema"] == 1
+    assert content["entries"]["50"][0]["fwhm"] == 0.02
+
+
+def test_store_keeps_history(tmp_path: Path) -> None:
+    store = LookUpTableStore(tmp_path / "dsd.json", history_length=3)
+    for centre in range(5):
+        store.record("50", centre)
+    assert [entry["centre"] for entry in store.history("50")] == [2, 3, 4]
+    assert store.version == 5
+
+
+def test_store_picks_up_other_writer(store: LookUpTableStore) -> None:
+    assert store["1000"] == 8
+    LookUpTableStore(store.path, DEFAULTS).record("1000", 9)
+    assert store["1000"] == 9
+    assert store.record("1000", 10)["version"] == 2
+
+
+def test_store_corrupt_file(store: LookUpTableStore) -> None:
+    store.path.parent.mkdir()
+    store.path.write_text("{not json")
+    with pytest.raises(ValueError, match="is corrupt"):
+        store["50"]
+
+
+def test_store_thread_safe(store: LookUpTableStore) -> None:
+    def record(key: str) -> None:
+        for centre in range(10):
+            store.record(key, centre)
+
+    threads = [threading.Thread(target=record, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.version == 40
+    reloaded = LookUpTableStore(store.path)
+    assert all(len(reloaded.history(str(i))) == 10 for i in range(4))
+
+
+async def test_move_motor_with_look_up_store(
+    run_engine: RunEngine, sim_stage_step: XYZStage, store: LookUpTableStore
+) -> None:
+    store.record("1000", 7.5)
+    run_engine(move_motor_with_look_up(sim_stage_step.z, 1000, store))
+    assert await sim_stage_step.z.user_setpoint.get_value() == 7.5
+    with pytest.raises(ValueError, match="No slit with size=400"):
+        run_engine(move_motor_with_look_up(sim_stage_step.z, 400, store))
+
+
+def test_look_up_table_exact() -> None:
+    table = LookUpTable(DEFAULTS)
+    assert table(1000) == 8
+    assert look_up_position(table, 50.7) == -34.3
+    assert dict(table) == DEFAULTS
+    with pytest.raises(ValueError, match="No entry for 400"):
+        table(400)
+
+
+@pytest.mark.parametrize(
+    "interpolation, expected",
+    [(Interpolation.LINEAR, 8 - 6.2 * 1500 / 4000), (Interpolation.SPLINE, None)],
+)
+def test_look_up_table_interpolates(
+    interpolation: Interpolation, expected: float | None
+) -> None:
+    table = LookUpTable(DEFAULTS, interpolation)
+    assert table(5000) == 1.8
+    if expected is not None:
+        assert table(2500) == pytest.approx(expected)
+    assert look_up_position(table, 50.7) == pytest.approx(table(50.7))
+    with pytest.raises(ValueError, match="outside the look up table range"):
+        table(6000)
+    with pytest.raises(ValueError, match="outside the look up table range"):
+        table(10)
+
+
+def test_look_up_table_spline_follows_curve() -> None:
+    keys = np.linspace(0, 3, 13)
+    table = LookUpTable({str(k): float(np.sin(k)) for k in keys}, "spline")
+    linear = LookUpTable(dict(table), "linear")
+    between = keys[3:-3] + 0.125
+    spline_error = max(abs(table(k) - np.sin(k)) for k in between)
+    linear_error = max(abs(linear(k) - np.sin(k)) for k in between)
+    assert spline_error < 1e-4 < linear_error
+
+
+def test_look_up_table_bad_keys() -> None:
+    with pytest.raises(ValueError, match="keys must be numbers"):
+        LookUpTable({"big": 1.0})
+    with pytest.raises(ValueError, match="duplicate keys"):
+        LookUpTable({"50": 1.0, "50.0": 2.0})
+    with pytest.raises(ValueError):
+        LookUpTable({"50": "sdsf"})  # type: ignore
+
+
+def test_store_compiled_table_cached(tmp_path: Path) -> None:
+    store = LookUpTableStore(tmp_path / "dsu.json", DEFAULTS, interpolation="linear")
+    table = store.table()
+    assert as_look_up_table(store) is table
+    assert table.interpolation is Interpolation.LINEAR
+    store.record("1000", 9)
+    assert store.table() is not table
+    assert store.table()(1000) == 9
+
+
+async def test_move_motor_with_look_up_interpolates(
+    run_engine: RunEngine, sim_stage_step: XYZStage
+) -> None:
+    table = LookUpTable(DEFAULTS, "linear")
+    run_engine(move_motor_with_look_up(sim_stage_step.z, 3000, table))
+    assert await sim_stage_step.z.user_setpoint.get_value() == pytest.approx(4.9)
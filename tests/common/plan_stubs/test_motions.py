@@ -1,15 +1,30 @@
+import gc
+
+import bluesky.plan_stubs as bps
 import pytest
 from bluesky.run_engine import RunEngine
 from dodal.devices.motors import XYZStage
 from dodal.devices.slits import Slits
-from ophyd_async.core import callback_on_mock_put, init_devices, set_mock_value
+from ophyd_async.core import (
+    Device,
+    callback_on_mock_put,
+    init_devices,
+    set_mock_value,
+    soft_signal_rw,
+)
 from ophyd_async.epics.motor import Motor
 
 from sm_bluesky.common.plan_stubs import (
+    LIMIT_ATTRS,
+    DeviceStateCache,
     check_within_limit,
+    check_within_snapshot_limit,
     get_velocity_and_step_size,
     move_motor_with_look_up,
+    read_device_state,
+    read_signals,
     set_slit_size,
+    snapshot_motors,
 )
 
 fake_motor_look_up = {"5000": 1.8, "1000": 8, "-500": 8.8, "100": 55, "50": -34.3}
@@ -146,3 +161,136 @@ def test_get_velocity_and_step_size_speed_too_low_failed(
                 scan_motor=mock_motor, ideal_velocity=-1, ideal_step_size=0.1
             )
         )
+
+
+def test_read_signals_one_message(sim_motor: XYZStage, run_engine: RunEngine) -> None:
+    msgs = []
+    run_engine.msg_hook = msgs.append  # type: ignore
+    result = run_engine(
+        read_signals(
+            sim_motor.x.velocity,
+            sim_motor.x.max_velocity,
+            sim_motor.y.velocity,
+        )
+    )
+    run_engine.msg_hook = None  # type: ignore
+    assert result.plan_result == [2.78, 100, 2.88]  # type: ignore
+    assert [msg.command for msg in msgs] == ["wait_for"]
+
+
+def test_snapshot_motors(sim_motor: XYZStage, run_engine: RunEngine) -> None:
+    set_mock_value(sim_motor.y.acceleration_time, 0.2)
+    result = run_engine(snapshot_motors(sim_motor.x, sim_motor.y))
+    snapshot = result.plan_result  # type: ignore
+    assert snapshot[sim_motor.x.name] == {
+        "position": 1,
+        "velocity": 2.78,
+        "acceleration_time": 0,
+        "max_velocity": 100,
+        "low_limit_travel": -8.888,
+        "high_limit_travel": 8.168,
+    }
+    assert snapshot[sim_motor.y.name]["acceleration_time"] == 0.2
+
+
+def test_check_within_snapshot_limit_fail() -> None:
+    limits = {"low_limit_travel": -1.0, "high_limit_travel": 1.0}
+    check_within_snapshot_limit([0.5, -0.5], "motor", limits)
+    with pytest.raises(ValueError, match="motor move request of 2 is beyond limits"):
+        check_within_snapshot_limit([0.5, 2], "motor", limits)
+
+
+def test_read_device_state_cache_hit_skips_read(
+    sim_motor: XYZStage, run_engine: RunEngine
+) -> None:
+    cache = DeviceStateCache()
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    msgs = []
+    run_engine.msg_hook = msgs.append  # type: ignore
+    result = run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    run_engine.msg_hook = None  # type: ignore
+    assert msgs == []
+    assert result.plan_result == {  # type: ignore
+        sim_motor.x.name: {"low_limit_travel": -8.888, "high_limit_travel": 8.168}
+    }
+
+
+def test_read_device_state_invalidated_on_change(
+    sim_motor: XYZStage, run_engine: RunEngine
+) -> None:
+    cache = DeviceStateCache()
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    set_mock_value(sim_motor.x.high_limit_travel, 3)
+    assert cache.lookup(sim_motor.x, LIMIT_ATTRS) is None
+    with pytest.raises(ValueError, match="move request of 4 is beyond limits"):
+        run_engine(check_within_limit([4], sim_motor.x))
+
+
+def test_read_device_state_ttl_and_identity(
+    sim_motor: XYZStage, sim_stage_step: XYZStage, run_engine: RunEngine
+) -> None:
+    cache = DeviceStateCache()
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    assert cache.lookup(sim_motor.x, LIMIT_ATTRS) is not None
+    sim_stage_step.x.set_name(sim_motor.x.name)
+    assert cache.lookup(sim_stage_step.x, LIMIT_ATTRS) is None
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    cache.ttl = -1
+    assert cache.lookup(sim_motor.x, LIMIT_ATTRS) is None
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    assert cache.lookup(sim_motor.x, LIMIT_ATTRS) is None
+
+
+def test_snapshot_motors_reads_velocity_every_time(
+    sim_motor: XYZStage, run_engine: RunEngine
+) -> None:
+    cache = DeviceStateCache()
+    run_engine(snapshot_motors(sim_motor.x, cache=cache))
+    assert cache.lookup(sim_motor.x, ["velocity"]) is None
+    set_mock_value(sim_motor.x.velocity, 1.5)
+    result = run_engine(snapshot_motors(sim_motor.x, cache=cache))
+    assert result.plan_result[sim_motor.x.name]["velocity"] == 1.5  # type: ignore
+    assert cache.lookup(sim_motor.x, LIMIT_ATTRS) is not None
+
+
+def test_device_state_cache_unwatch_removes_subscriptions(
+    sim_motor: XYZStage, run_engine: RunEngine
+) -> None:
+    cache = DeviceStateCache()
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    cache.unwatch()
+    assert cache.lookup(sim_motor.x, LIMIT_ATTRS) is None
+    assert cache.unwatched(sim_motor.x, LIMIT_ATTRS) == LIMIT_ATTRS
+    # Nothing is subscribed any more, so a change no longer drops the entry.
+    cache.store(sim_motor.x, {"high_limit_travel": 8.168})
+    set_mock_value(sim_motor.x.high_limit_travel, 3)
+    assert cache.lookup(sim_motor.x, ["high_limit_travel"]) is not None
+
+
+class SoftLimits(Device):
+    def __init__(self, name: str = "") -> None:
+        self.low_limit_travel = soft_signal_rw(float, -1.0)
+        self.high_limit_travel = soft_signal_rw(float, 1.0)
+        super().__init__(name)
+
+
+async def test_device_state_cache_does_not_keep_devices(run_engine: RunEngine) -> None:
+    cache = DeviceStateCache()
+    limits = SoftLimits(name="gone")
+    await limits.connect()
+    run_engine(read_device_state([limits], LIMIT_ATTRS, cache=cache))
+    assert cache.lookup(limits, LIMIT_ATTRS) is not None
+    # The RunEngine keeps its last message, which holds the device.
+    run_engine(bps.null())
+    del limits
+    gc.collect()
+    assert not cache._entries
+    assert not cache._watched
+
+
+def test_read_device_state_without_ttl_does_not_watch(
+    sim_motor: XYZStage, run_engine: RunEngine
+) -> None:
+    cache = DeviceStateCache(ttl=0)
+    run_engine(read_device_state([sim_motor.x], LIMIT_ATTRS, cache=cache))
+    assert cache.unwatched(sim_motor.x, LIMIT_ATTRS) == LIMIT_ATTRS
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from bluesky.run_engine import RunEngine
+from dodal.devices.motors import XYZStage
+from ophyd_async.core import get_mock_put, set_mock_value
+from scanspec.specs import Fly, Linspace
+
+from sm_bluesky.common.plan_stubs import (
+    MotorTrajectory,
+    check_trajectory_within_limit,
+    check_trajectory_within_snapshot_limit,
+    fly_line_trajectory,
+    grid_trajectory,
+    spec_trajectory,
+)
+
+STATE = {
+    "velocity": 1.0,
+    "acceleration_time": 0.5,
+    "max_velocity": 4.0,
+    "low_limit_travel": -10.0,
+    "high_limit_travel": 10.0,
+}
+
+
+def test_fly_line_trajectory_adds_run_up_and_down() -> None:
+    trajectory = fly_line_trajectory(4, -2, 2, 0.5)
+    assert list(trajectory["positions"]) == [4.5, 4, -2, -2.5]
+    assert trajectory["velocities"][1] == -2
+
+
+def test_grid_trajectory_snake(sim_motor: XYZStage) -> None:
+    trajectory = grid_trajectory(
+        sim_motor.x, [0, 1, 2], sim_motor.y, -1, 1, 2, 1, snake_axes=True
+    )
+    assert list(trajectory[sim_motor.y]["positions"]) == [
+        -2,
+        -1,
+        1,
+        2,
+        2,
+        1,
+        -1,
+        -2,
+        -2,
+        -1,
+        1,
+        2,
+    ]
+    assert list(trajectory[sim_motor.x]["positions"]) == [0] * 4 + [1] * 4 + [2] * 4
+
+
+def test_check_trajectory_reports_first_point(sim_motor: XYZStage) -> None:
+    trajectory = grid_trajectory(sim_motor.x, [0, 5, 20], sim_motor.y, -8, 9, 2, 1)
+    states = {sim_motor.x.name: STATE, sim_motor.y.name: STATE}
+    with pytest.raises(
+        ValueError,
+        match="sim_motor-y trajectory point 3 position of 10.0 is beyond limits",
+    ):
+        check_trajectory_within_snapshot_limit(trajectory, states)
+
+
+def test_check_trajectory_velocity_and_acceleration(sim_motor: XYZStage) -> None:
+    states = {sim_motor.x.name: STATE}
+    fast = {sim_motor.x: fly_line_trajectory(0, 1, 5, 0)}
+    with pytest.raises(ValueError, match="segment 1 velocity of 5.0 is beyond max"):
+        check_trajectory_within_snapshot_limit(fast, states)
+    jerky = MotorTrajectory(
+        positions=np.array([0.0, 1.0]),
+        velocities=np.array([1.0]),
+        accelerations=np.array([1.0, np.nan, -9.0]),
+    )
+    with pytest.raises(ValueError, match="segment 2 acceleration of -9.0"):
+        check_trajectory_within_snapshot_limit({sim_motor.x: jerky}, states)
+    check_trajectory_within_snapshot_limit(
+        {sim_motor.x: jerky}, {sim_motor.x.name: {**STATE, "acceleration_time": 0}}
+    )
+
+
+def test_spec_trajectory_turnaround_overshoot(sim_motor: XYZStage) -> None:
+    spec = Fly(0.5 @ (Linspace(sim_motor.x, 0, 1, 2) * ~Linspace(sim_motor.y, 0, 2, 2)))
+    trajectory = spec_trajectory(spec, {sim_motor.y.name: 1})
+    # Frames 2 wide at 4/s, a 1 s ramp overshoots by 2 at each turnaround.
+    assert list(trajectory[sim_motor.y]["positions"]) == [
+        -3,
+        -1,
+        1,
+        1,
+        1,
+        1,
+        3,
+        5,
+        5,
+        3,
+        1,
+        1,
+        1,
+        1,
+        -1,
+        -3,
+    ]
+    # No acceleration within a line, the turnaround is left to the controller.
+    np.testing.assert_equal(trajectory[sim_motor.y]["accelerations"], [0, np.nan, 0])
+    assert list(trajectory[sim_motor.y]["velocities"][1::4]) == [4, 4, -4, -4]
+
+
+def test_check_trajectory_within_limit_spec(
+    sim_motor: XYZStage, run_engine: RunEngine
+) -> None:
+    spec = Fly(0.5 @ (Linspace(sim_motor.x, 0, 1, 2) * ~Linspace(sim_motor.y, 0, 4, 3)))
+    run_engine(check_trajectory_within_limit(spec))
+    set_mock_value(sim_motor.y.acceleration_time, 0.5)
+    with pytest.raises(ValueError, match="sim_motor-y trajectory point 11 position"):
+        run_engine(check_trajectory_within_limit(spec))
+    assert 0 == get_mock_put(sim_motor.y.user_setpoint).call_count
@@ -1,21 +1,30 @@
-from collections.abc import Mapping
-from unittest.mock import Mock
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from unittest.mock import Mock, patch
 
+import bluesky.plan_stubs as bps
 import numpy as np
 import pytest
 from bluesky.run_engine import RunEngine
+from bluesky.simulators import RunEngineSimulator
+from bluesky.utils import MsgGenerator
 from dodal.devices.motors import XYZStage
 from ophyd_async.core import callback_on_mock_put, set_mock_value
 
-from sm_bluesky.common.math_functions import cal_range_num
+from sm_bluesky.common.math_functions import cal_range_num, erf
+from sm_bluesky.common.plan_stubs import LookUpTable, LookUpTableStore
 from sm_bluesky.common.plans import (
     StatPosition,
     align_slit_with_look_up,
+    coarse_to_fine_align,
+    fast_raster_and_move_fit,
     fast_scan_and_move_fit,
+    golden_search_and_move,
     step_scan_and_move_fit,
 )
+from sm_bluesky.common.plans.alignments import ALIGNMENT_STREAM
 from sm_bluesky.common.sim_devices import SimDetector, SimStage
-from tests.helpers import gaussian
+from tests.helpers import check_msg_set, check_msg_wait, gaussian
 
 
 @pytest.mark.parametrize(
@@ -143,6 +152,40 @@ async def test_scan_and_move_cen_success_with_step(
     )
 
 
+@pytest.mark.parametrize(
+    "fitted_loc, signal",
+    [
+        (StatPosition.GAUSS_CEN, lambda x: gaussian(x, 0.37, 0.3)),
+        (StatPosition.LORENTZ_CEN, lambda x: gaussian(x, 0.37, 0.3)),
+        (StatPosition.VOIGT_CEN, lambda x: gaussian(x, 0.37, 0.3)),
+        (StatPosition.EDGE, lambda x: (1 + erf((x - 0.37) / 0.2)) / 2),
+    ],
+)
+async def test_step_scan_and_move_fit_least_squares(
+    run_engine: RunEngine,
+    sim_stage_step: SimStage,
+    fake_detector: SimDetector,
+    fitted_loc: StatPosition,
+    signal: Callable[[np.ndarray], np.ndarray],
+) -> None:
+    x_data = np.linspace(-2, 2, 41)
+    y_data = np.append(signal(x_data), [0] * 2)
+    rbv_mocks = Mock()
+    rbv_mocks.get.side_effect = y_data
+    callback_on_mock_put(
+        sim_stage_step.x.user_setpoint,
+        lambda *_, **__: set_mock_value(fake_detector.value, value=rbv_mocks.get()),
+    )
+    run_engine(
+        step_scan_and_move_fit(
+            fake_detector, sim_stage_step.x, fitted_loc, "value", -2, 2, 41
+        ),
+    )
+    assert await sim_stage_step.x.user_setpoint.get_value() == pytest.approx(
+        0.37, abs=0.02
+    )
+
+
 async def test_scan_and_move_cen_fail_to_with_wrong_name(
     run_engine: RunEngine,
     sim_motor: XYZStage,
@@ -274,6 +317,103 @@ async def test_align_slit_with_look_up(
     assert FAKEDSU[str(size)] == pytest.approx(expected_centre + offset, 0.01)
 
 
+def test_align_slit_with_look_up_waits_for_group(
+    sim_run_engine: RunEngineSimulator,
+    sim_motor: XYZStage,
+    fake_detector: SimDetector,
+) -> None:
+    start, _, _ = cal_range_num(cen=FAKEDSU["50"], range=50 / 1000 * 3, size=0.01)
+    sim_run_engine.add_read_handler_for(sim_motor.y.user_readback, 36.8)
+
+    def fake_scan_and_fit(*_, **__) -> MsgGenerator[tuple[float, float, None]]:
+        yield from bps.null()
+        return 36.8, 0.01, None
+
+    with patch(
+        "sm_bluesky.common.plans.alignments._scan_and_fit",
+        side_effect=fake_scan_and_fit,
+    ) as scan:
+        msgs = sim_run_engine.simulate_plan(
+            align_slit_with_look_up(
+                motor=sim_motor.y,
+                size=50,
+                slit_table=dict(FAKEDSU),
+                det=fake_detector,
+                centre_type=StatPosition.COM,
+                group="slits",
+            )
+        )
+    msgs = check_msg_set(msgs=msgs, obj=sim_motor.y, value=start)
+    assert msgs[0].kwargs["group"] == "slits"
+    msgs = check_msg_wait(msgs=msgs, wait_group="slits")
+    assert scan.call_count == 1
+    msgs = check_msg_set(msgs=msgs, obj=sim_motor.y, value=36.8)
+
+
+async def test_align_slit_with_look_up_store_refines(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_step: SimStage,
+    fake_detector: SimDetector,
+    tmp_path: Path,
+) -> None:
+    centre = FAKEDSU["50"] + 0.03
+
+    def detector_follows_motor(value: float, **_) -> None:
+        signal = gaussian(np.array([value]), centre, 0.02)[0]
+        set_mock_value(fake_detector.value, value=signal)
+
+    callback_on_mock_put(sim_stage_step.y.user_setpoint, detector_follows_motor)
+    store = LookUpTableStore(tmp_path / "dsu.json", FAKEDSU)
+    for _ in range(2):
+        run_engine(
+            align_slit_with_look_up(
+                motor=sim_stage_step.y,  # type: ignore
+                size=50,
+                slit_table=store,
+                det=fake_detector,
+                centre_type=StatPosition.CEN,
+            ),
+        )
+    first, second = store.history("50")
+    assert first["centre"] == pytest.approx(centre, abs=0.005)
+    assert first["fwhm"] == pytest.approx(2.355 * 0.02, rel=0.2)
+    assert second["centre"] == pytest.approx(centre, abs=0.005)
+    # The second scan only covers 3 FWHM around the refined centre.
+    first_run, second_run = (
+        [e for e in run_engine_documents["event"] if e["descriptor"] == d["uid"]]
+        for d in run_engine_documents["descriptor"]
+    )
+    assert (len(first_run), len(second_run)) == (61, 16)
+
+
+async def test_align_slit_with_look_up_interpolated_size(
+    run_engine: RunEngine,
+    sim_stage_step: SimStage,
+    fake_detector: SimDetector,
+) -> None:
+    table = LookUpTable(FAKEDSU, "linear")
+    # 300 um is between the 100 and 500 um entries.
+    centre = table(300) + 0.1
+
+    def detector_follows_motor(value: float, **_) -> None:
+        signal = gaussian(np.array([value]), centre, 0.1)[0]
+        set_mock_value(fake_detector.value, value=signal)
+
+    callback_on_mock_put(sim_stage_step.y.user_setpoint, detector_follows_motor)
+    result = run_engine(
+        align_slit_with_look_up(
+            motor=sim_stage_step.y,  # type: ignore
+            size=300,
+            slit_table=table,
+            det=fake_detector,
+            centre_type=StatPosition.CEN,
+        ),
+    )
+    assert result.plan_result == pytest.approx(centre, abs=0.01)  # type: ignore
+    assert "300" not in table
+
+
 async def test_align_slit_with_look_up_fail_wrong_key(
     run_engine: RunEngine,
     sim_stage_step: SimStage,
@@ -290,4 +430,205 @@ async def test_align_slit_with_look_up_fail_wrong_key(
                 centre_type=StatPosition.CEN,
             ),
         )
-    assert str(e.value) == f"Size of {size} is not in {FAKEDSU.keys}"
+    assert str(e.value) == f"Size of {size} is not in {list(FAKEDSU.keys())}"
+
+
+async def test_step_scan_and_move_fit_stops_early(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_step: SimStage,
+    fake_detector: SimDetector,
+) -> None:
+    x_data = np.linspace(-2, 3, 41, endpoint=True)
+    rbv_mocks = Mock()
+    rbv_mocks.get.side_effect = np.append(gaussian(x_data, 0.2, 0.3), [0] * 2)
+    callback_on_mock_put(
+        sim_stage_step.x.user_setpoint,
+        lambda *_, **__: set_mock_value(fake_detector.value, value=rbv_mocks.get()),
+    )
+    run_engine(
+        step_scan_and_move_fit(
+            fake_detector,
+            sim_stage_step.x,
+            StatPosition.CEN,
+            "value",
+            -2,
+            3,
+            41,
+            stop_fraction=0.2,
+        ),
+    )
+    # Stops two points past where the peak falls below 20%, not at 3.
+    assert len(run_engine_documents["event"]) == 24
+    assert run_engine_documents["stop"][0]["exit_status"] == "success"
+    assert await sim_stage_step.x.user_setpoint.get_value() == pytest.approx(
+        0.2, abs=0.01
+    )
+
+
+# SimMotor updates its readback at 10 Hz, so the coarse fast scan reads some
+# positions more than once, which PeakStats warns about.
+@pytest.mark.filterwarnings("ignore:divide by zero:RuntimeWarning")
+async def test_coarse_to_fine_align(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: SimStage,
+    fake_detector: SimDetector,
+) -> None:
+    centre = 1.23
+
+    def follow_motor(reading: dict) -> None:
+        (position,) = (r["value"] for r in reading.values())
+        value = gaussian(np.array([position]), centre, 0.4)[0]
+        set_mock_value(fake_detector.value, value=value)
+
+    sim_stage_delay.x.user_readback.subscribe_reading(follow_motor)
+    result = run_engine(
+        coarse_to_fine_align(
+            fake_detector,
+            sim_stage_delay.x,  # type: ignore
+            StatPosition.CEN,
+            "value",
+            -3,
+            4,
+            motor_speed=10,
+        ),
+    )
+    history = result.plan_result  # type: ignore
+    assert history[0]["scan"] == "coarse"
+    assert 2 <= len(history) <= 4
+    assert history[-1]["centre"] == pytest.approx(centre, abs=0.01)
+    assert history[-1]["fwhm"] == pytest.approx(2.355 * 0.4, rel=0.05)
+    # One run per pass and the move to the centre, which has the full history.
+    assert len(run_engine_documents["start"]) == len(history) + 1
+    assert run_engine_documents["start"][-2]["alignment"]["passes"] == history[:-1]
+    assert run_engine_documents["start"][-1]["alignment"]["passes"] == history
+    final_stream = run_engine_documents["descriptor"][-1]
+    assert final_stream["name"] == ALIGNMENT_STREAM
+    assert run_engine_documents["event"][-1]["data"][
+        sim_stage_delay.x.name
+    ] == pytest.approx(history[-1]["centre"])
+    assert await sim_stage_delay.x.user_readback.get_value() == pytest.approx(
+        history[-1]["centre"]
+    )
+
+
+async def test_golden_search_and_move(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_step: SimStage,
+    fake_detector: SimDetector,
+) -> None:
+    centre = -0.37
+
+    def detector_follows_motor(value: float, **_) -> None:
+        signal = gaussian(np.array([value]), centre, 0.1)[0]
+        set_mock_value(fake_detector.value, value=signal)
+
+    callback_on_mock_put(sim_stage_step.x.user_setpoint, detector_follows_motor)
+    result = run_engine(
+        golden_search_and_move(
+            fake_detector,
+            sim_stage_step.x,  # type: ignore
+            "value",
+            -1,
+            1,
+            tolerance=0.005,
+        ),
+    )
+    assert result.plan_result == pytest.approx(centre, abs=0.005)  # type: ignore
+    # Fewer reads than the 21 point scan it replaces, at 40 times the precision.
+    assert len(run_engine_documents["event"]) == 19
+    assert await sim_stage_step.x.user_setpoint.get_value() == pytest.approx(
+        result.plan_result  # type: ignore
+    )
+
+
+def test_golden_search_and_move_stops_at_max_reads(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_step: SimStage,
+    fake_detector: SimDetector,
+) -> None:
+    run_engine(
+        golden_search_and_move(
+            fake_detector,
+            sim_stage_step.x,  # type: ignore
+            "value",
+            -1,
+            1,
+            1e-6,
+            max_reads=9,
+        ),
+    )
+    assert len(run_engine_documents["event"]) == 9
+
+
+@pytest.mark.parametrize("fitted_loc", [StatPosition.COM, StatPosition.GAUSS_CEN])
+async def test_fast_raster_and_move_fit(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: SimStage,
+    fake_detector: SimDetector,
+    fitted_loc: StatPosition,
+) -> None:
+    y_centre, x_centre = -0.3, 0.4
+    position = {"x": 0.0, "y": 0.0}
+
+    def follow_motors(axis: str):
+        def update(reading: dict) -> None:
+            (position[axis],) = (r["value"] for r in reading.values())
+            value = (
+                gaussian(np.array([position["x"]]), x_centre, 0.3)[0]
+                * gaussian(np.array([position["y"]]), y_centre, 0.3)[0]
+            )
+            set_mock_value(fake_detector.value, value=value)
+
+        return update
+
+    sim_stage_delay.x.user_readback.subscribe_reading(follow_motors("x"))
+    sim_stage_delay.y.user_readback.subscribe_reading(follow_motors("y"))
+    result = run_engine(
+        fast_raster_and_move_fit(
+            fake_detector,
+            sim_stage_delay.y,  # type: ignore
+            sim_stage_delay.x,  # type: ignore
+            fitted_loc,
+            "value",
+            -1,
+            1,
+            9,
+            -1.5,
+            1.5,
+            motor_speed=10,
+            setup_moves={sim_stage_delay.z: 2},
+        ),
+    )
+    assert result.plan_result == pytest.approx(  # type: ignore
+        (y_centre, x_centre), abs=0.1
+    )
+    assert len(run_engine_documents["start"]) == 1
+    assert await sim_stage_delay.z.user_readback.get_value() == 2
+    assert await sim_stage_delay.y.user_readback.get_value() == pytest.approx(
+        result.plan_result[0]  # type: ignore
+    )
+
+
+def test_fast_raster_and_move_fit_unsupported_fit(
+    run_engine: RunEngine, sim_stage_step: SimStage, fake_detector: SimDetector
+) -> None:
+    with pytest.raises(ValueError, match="Raster alignment only supports"):
+        run_engine(
+            fast_raster_and_move_fit(
+                fake_detector,
+                sim_stage_step.y,  # type: ignore
+                sim_stage_step.x,  # type: ignore
+                StatPosition.D_CEN,
+                "value",
+                -1,
+                1,
+                3,
+                -1,
+                1,
+            ),
+        )
@@ -1,15 +1,35 @@
 from collections.abc import Mapping
 from unittest import mock
 
+import numpy as np
 import pytest
+from bluesky import Msg
 from bluesky.run_engine import RunEngine
+from bluesky.utils import MsgGenerator
 from dodal.devices.motors import XYZStage
 from numpy import linspace
-from ophyd_async.core import get_mock_put
-from ophyd_async.sim import SimPointDetector
+from ophyd_async.core import (
+    DetectorTrigger,
+    StaticPathProvider,
+    get_mock_put,
+    init_devices,
+    set_mock_value,
+)
+from ophyd_async.sim import SimBlobDetector, SimPointDetector
 from ophyd_async.testing import assert_emitted
 
-from sm_bluesky.common.plans.fast_scan import fast_scan_1d, fast_scan_grid
+from sm_bluesky.common.math_functions import cal_trigger_table
+from sm_bluesky.common.plan_stubs import PLAN_CLOCK
+from sm_bluesky.common.plans import fast_scan
+from sm_bluesky.common.plans.fast_scan import (
+    FLY_POSITIONS_STREAM,
+    _read_line,
+    fast_scan_1d,
+    fast_scan_grid,
+    make_sample_rate,
+    sample_rate_summary,
+)
+from sm_bluesky.common.sim_devices import SimTrajectoryController, SimTriggeredDetector
 
 # Long enough for multiple asyncio event loop cycles to run so
 # all the tasks have a chance to run
@@ -123,7 +143,8 @@ async def test_fast_scan_2d_success(
         assert motor_x == mock.call(steps[cnt])
 
     assert 2.88 == await sim_motor.y.velocity.get_value()
-    assert num_step * 3 == get_mock_put(sim_motor.y.velocity).call_count
+    # prepare sets max and scan speed per line, speed is restored once per grid
+    assert num_step * 2 + 1 == get_mock_put(sim_motor.y.velocity).call_count
     assert num_step * 2 == get_mock_put(sim_motor.y.user_setpoint).call_count
     # check scan axis set and end point
     for cnt, motor_y in enumerate(
@@ -176,7 +197,8 @@ async def test_fast_scan_2d_snake_success(
         assert motor_x == mock.call(steps[cnt])
 
     assert 2.88 == await sim_motor.y.velocity.get_value()
-    assert num_step * 3 == get_mock_put(sim_motor.y.velocity).call_count
+    # prepare sets max and scan speed per line, speed is restored once per grid
+    assert num_step * 2 + 1 == get_mock_put(sim_motor.y.velocity).call_count
     assert num_step * 2 == get_mock_put(sim_motor.y.user_setpoint).call_count
     """ build a list of expected scan motor position"""
     y_position = [y_start]
@@ -198,3 +220,687 @@ async def test_fast_scan_2d_snake_success(
     """Only 1 event per step as sim motor motor_done_move is set to True,
       so only 1 loop is ran"""
     assert_emitted(run_engine_documents, start=1, descriptor=1, event=num_step, stop=1)
+
+
+@pytest.fixture
+async def blob_det(static_path_provider: StaticPathProvider) -> SimBlobDetector:
+    async with init_devices():
+        blob_det = SimBlobDetector(static_path_provider, name="blob_det")
+    return blob_det
+
+
+async def test_fast_scan_1d_hardware_timed_success(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_motor: XYZStage,
+    blob_det: SimBlobDetector,
+) -> None:
+    num_points = 5
+    run_engine(fast_scan_1d([blob_det], sim_motor.x, 5, -1, 8.0, num_points))
+
+    assert 2.78 == await sim_motor.x.velocity.get_value()
+    assert 2 == get_mock_put(sim_motor.x.user_setpoint).call_count
+    assert [
+        mock.call(100.0),
+        mock.call(8.0),
+        mock.call(2.78),
+    ] == get_mock_put(sim_motor.x.velocity).call_args_list
+    assert_emitted(
+        run_engine_documents,
+        start=1,
+        descriptor=2,
+        stream_resource=2,
+        stream_datum=2,
+        event=1,
+        stop=1,
+    )
+    assert run_engine_documents["stream_datum"][0]["indices"] == {
+        "start": 0,
+        "stop": num_points,
+    }
+    assert run_engine_documents["descriptor"][1]["name"] == FLY_POSITIONS_STREAM
+    positions, period = cal_trigger_table(5, -1, 8.0, num_points)
+    data = run_engine_documents["event"][0]["data"]
+    assert data[f"{FLY_POSITIONS_STREAM}-{sim_motor.x.name}"] == pytest.approx(
+        positions
+    )
+    assert data[f"{FLY_POSITIONS_STREAM}-period"] == pytest.approx(period)
+
+
+async def test_fast_scan_1d_hardware_timed_fail_not_flyable(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    with pytest.raises(ValueError):
+        run_engine(fast_scan_1d([det], sim_motor.x, 5, -1, 8.0, 5))
+    assert_emitted(run_engine_documents)
+
+
+async def test_fast_scan_1d_hardware_timed_fail_deadtime(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    blob_det: SimBlobDetector,
+) -> None:
+    with mock.patch.object(
+        blob_det, "get_trigger_deadtime", mock.AsyncMock(return_value=(set(), 1.0))
+    ):
+        with pytest.raises(ValueError):
+            run_engine(fast_scan_1d([blob_det], sim_motor.x, 5, -1, 8.0, 5))
+    assert 0 == get_mock_put(sim_motor.x.user_setpoint).call_count
+
+
+async def test_fast_scan_2d_hardware_timed_snake_success(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_motor: XYZStage,
+    blob_det: SimBlobDetector,
+) -> None:
+    num_step = 3
+    num_points = 4
+    run_engine(
+        fast_scan_grid(
+            [blob_det],
+            sim_motor.x,
+            0,
+            2,
+            num_step,
+            sim_motor.y,
+            -5,
+            4,
+            10,
+            snake_axes=True,
+            num_points=num_points,
+        ),
+    )
+
+    assert num_step == get_mock_put(sim_motor.x.user_setpoint).call_count
+    assert num_step * 2 == get_mock_put(sim_motor.y.user_setpoint).call_count
+    assert 2.88 == await sim_motor.y.velocity.get_value()
+    assert_emitted(
+        run_engine_documents,
+        start=1,
+        descriptor=2,
+        stream_resource=2,
+        stream_datum=num_step * 2,
+        event=num_step,
+        stop=1,
+    )
+    assert run_engine_documents["stream_datum"][-1]["indices"] == {
+        "start": num_points * (num_step - 1),
+        "stop": num_points * num_step,
+    }
+    x_key = f"{FLY_POSITIONS_STREAM}-{sim_motor.x.name}"
+    y_key = f"{FLY_POSITIONS_STREAM}-{sim_motor.y.name}"
+    events = [event["data"] for event in run_engine_documents["event"]]
+    assert [data[x_key] for data in events] == pytest.approx([0, 1, 2])
+    # Snake lines are flown from scan_end back to scan_start.
+    forward, _ = cal_trigger_table(-5, 4, 2.88, num_points)
+    assert events[0][y_key] == pytest.approx(forward)
+    assert events[1][y_key] == pytest.approx(forward[::-1])
+    assert events[2][y_key] == pytest.approx(forward)
+
+
+async def test_fast_scan_2d_hardware_timed_reads_acceleration_time_once(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    blob_det: SimBlobDetector,
+) -> None:
+    msgs: list[Msg] = []
+    run_engine.msg_hook = msgs.append  # type: ignore
+    run_engine(
+        fast_scan_grid(
+            [blob_det], sim_motor.x, 0, 2, 4, sim_motor.y, -5, 4, 10, num_points=4
+        ),
+    )
+    acceleration_reads = [
+        msg
+        for msg in msgs
+        if msg.obj is sim_motor.y.acceleration_time
+        and msg.command in ("read", "locate")
+    ]
+    assert len(acceleration_reads) <= 1
+
+
+class SteppedClock:
+    """Plan clock that only moves when the plan sleeps or reads."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ClockedStatus:
+    """Motor move that is done once the clock reaches end."""
+
+    def __init__(self, clock: SteppedClock, end: float) -> None:
+        self.clock = clock
+        self.end = end
+
+    @property
+    def done(self) -> bool:
+        return self.clock() >= self.end
+
+
+def run_on_clock(
+    plan: MsgGenerator,
+    clock: SteppedClock,
+    line_time: float,
+    read_time: float,
+    exposures: Mapping[object, float] | None = None,
+) -> dict[str, list[float]]:
+    """Run plan without a RunEngine, each read takes read_time, a trigger
+    finishes after the exposure of its detector and the motor is done after
+    line_time. Returns the clock time of every read per stream."""
+    exposures = exposures or {}
+    read_times: dict[str, list[float]] = {}
+    finish: dict[str, float] = {}
+    stream = ""
+    token = PLAN_CLOCK.set(clock)
+    try:
+        reply = None
+        while True:
+            try:
+                msg = plan.send(reply)
+            except StopIteration:
+                return read_times
+            reply = None
+            if msg.command == "complete":
+                reply = ClockedStatus(clock, line_time)
+            elif msg.command == "trigger":
+                group = msg.kwargs["group"]
+                end = clock.now + exposures.get(msg.obj, 0.0)
+                finish[group] = max(finish.get(group, end), end)
+            elif msg.command == "wait":
+                end = finish.get(msg.kwargs["group"], clock.now)
+                timeout = msg.kwargs.get("timeout")
+                if timeout is not None:
+                    end = min(end, clock.now + timeout)
+                clock.now = max(clock.now, end)
+                reply = finish.get(msg.kwargs["group"], clock.now) <= clock.now
+            elif msg.command == "sleep":
+                clock.now += msg.args[0]
+            elif msg.command == "create":
+                stream = msg.kwargs["name"]
+            elif msg.command == "read":
+                reply = {}
+            elif msg.command == "save":
+                read_times.setdefault(stream, []).append(clock.now)
+                clock.now += read_time
+    finally:
+        PLAN_CLOCK.reset(token)
+
+
+def test_read_line_paces_reads_on_plan_clock(
+    sim_motor: XYZStage, det: SimPointDetector
+) -> None:
+    sample_rate = make_sample_rate({}, sample_period=0.05)
+    assert sample_rate is not None
+    read_times = run_on_clock(
+        _read_line([det], sim_motor.x, 1.0, sample_rate=sample_rate),
+        SteppedClock(),
+        line_time=0.2,
+        read_time=0.01,
+    )
+    assert read_times["primary"] == pytest.approx([0, 0.05, 0.1, 0.15])
+    assert sample_rate_summary(sample_rate) == pytest.approx(
+        {"achieved_hz": 20, "requested_hz": 20, "reads": 4, "skipped": 0}
+    )
+
+
+def test_read_line_skips_slots_of_slow_reads(
+    sim_motor: XYZStage, det: SimPointDetector
+) -> None:
+    sample_rate = make_sample_rate({}, sample_period=0.05)
+    assert sample_rate is not None
+    read_times = run_on_clock(
+        _read_line([det], sim_motor.x, 1.0, sample_rate=sample_rate),
+        SteppedClock(),
+        line_time=0.2,
+        read_time=0.12,
+    )
+    assert read_times["primary"] == pytest.approx([0, 0.15])
+    assert sample_rate["reads"] == 2
+    assert sample_rate["skipped"] == 2
+
+
+def test_read_line_target_spacing_sets_period(
+    sim_motor: XYZStage, det: SimPointDetector
+) -> None:
+    sample_rate = make_sample_rate({}, target_spacing=0.5)
+    assert sample_rate is not None
+    run_on_clock(
+        _read_line([det], sim_motor.x, 20.0, 0.5, sample_rate),
+        SteppedClock(),
+        line_time=0.1,
+        read_time=0.0,
+    )
+    assert sample_rate["requested_period"] == pytest.approx(0.025)
+    assert sample_rate["reads"] == 4
+
+
+def test_read_det_groups_slow_group_does_not_hold_up_primary(
+    sim_motor: XYZStage, det: SimPointDetector
+) -> None:
+    slow_det = SimPointDetector(name="slow", pattern_generator=None, num_channels=1)
+    sample_rate = make_sample_rate({}, sample_period=0.05)
+    msgs: list[Msg] = []
+
+    def recorded(plan: MsgGenerator) -> MsgGenerator:
+        reply = None
+        while True:
+            try:
+                msg = plan.send(reply)
+            except StopIteration as e:
+                return e.value
+            msgs.append(msg)
+            reply = yield msg
+
+    read_times = run_on_clock(
+        recorded(
+            _read_line(
+                [det],
+                sim_motor.x,
+                1.0,
+                sample_rate=sample_rate,
+                det_groups={"slow": {"dets": [slow_det], "period": 0.2}},
+            )
+        ),
+        SteppedClock(),
+        line_time=0.4,
+        read_time=0.0,
+        exposures={det: 0.01, slow_det: 0.3},
+    )
+    assert np.diff(read_times["primary"]) == pytest.approx(0.05)
+    assert read_times["primary"][-1] == pytest.approx(0.41)
+    # The slow trigger overruns its period, the next starts as soon as it is read.
+    assert read_times["slow"] == pytest.approx([0.3, 0.6])
+    # No polling, the plan blocks on pending triggers until the next is due.
+    blocking = [
+        msg for msg in msgs if msg.command == "wait" and msg.kwargs["timeout"] != 0
+    ]
+    assert len(blocking) <= 2 * len(read_times["primary"])
+    assert not [msg for msg in msgs if msg.command == "sleep"]
+
+
+def test_fast_scan_1d_leaves_caller_md_unchanged(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    md = {"sample": "test"}
+    run_engine(fast_scan_1d([det], sim_motor.x, 5, -1, 8.0, sample_period=0.1, md=md))
+    assert md == {"sample": "test"}
+    assert run_engine_documents["start"][0]["sample_period"] == 0.1
+
+
+def stream_events(
+    run_engine_documents: Mapping[str, list[dict]], stream: str
+) -> list[dict]:
+    descriptors = {
+        doc["uid"]
+        for doc in run_engine_documents["descriptor"]
+        if doc["name"] == stream
+    }
+    return [
+        event
+        for event in run_engine_documents["event"]
+        if event["descriptor"] in descriptors
+    ]
+
+
+async def test_fast_scan_1d_sample_period_reads_rate_stream(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: XYZStage,
+) -> None:
+    sample_period = 0.05
+    run_engine(
+        fast_scan_1d(
+            [sim_stage_delay.y],
+            sim_stage_delay.x,
+            1,
+            5,
+            20,
+            sample_period=sample_period,
+        )
+    )
+    assert run_engine_documents["start"][0]["sample_period"] == sample_period
+    primary = stream_events(run_engine_documents, "primary")
+    (rate,) = stream_events(run_engine_documents, "sample_rate")
+    assert rate["data"]["sample_rate-requested_hz"] == pytest.approx(20)
+    assert rate["data"]["sample_rate-reads"] == len(primary)
+    assert run_engine_documents["stop"][0]["exit_status"] == "success"
+
+
+async def test_fast_scan_1d_target_spacing(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: XYZStage,
+) -> None:
+    run_engine(
+        fast_scan_1d(
+            [sim_stage_delay.y],
+            sim_stage_delay.x,
+            1,
+            5,
+            20,
+            target_spacing=0.5,
+        )
+    )
+    assert run_engine_documents["start"][0]["target_spacing"] == 0.5
+    (rate,) = stream_events(run_engine_documents, "sample_rate")
+    assert rate["data"]["sample_rate-requested_hz"] == pytest.approx(40)
+
+
+def test_fast_scan_1d_sample_period_and_spacing_fail(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    with pytest.raises(ValueError):
+        run_engine(
+            fast_scan_1d(
+                [det], sim_motor.x, 5, -1, 8.0, sample_period=0.1, target_spacing=1
+            )
+        )
+
+
+async def test_fast_scan_2d_sample_period_success(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: XYZStage,
+) -> None:
+    num_step = 3
+    run_engine(
+        fast_scan_grid(
+            [sim_stage_delay.z],
+            sim_stage_delay.y,
+            0,
+            2,
+            num_step,
+            sim_stage_delay.x,
+            1,
+            2,
+            20,
+            snake_axes=True,
+            sample_period=0.02,
+        ),
+    )
+    num_events = len(stream_events(run_engine_documents, "primary"))
+    assert num_events >= num_step
+    (rate,) = stream_events(run_engine_documents, "sample_rate")
+    assert rate["data"]["sample_rate-reads"] == num_events
+
+
+async def test_fast_scan_1d_det_groups_read_concurrently(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_stage_delay: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    run_engine(
+        fast_scan_1d(
+            [sim_stage_delay.y],
+            sim_stage_delay.x,
+            1,
+            5,
+            10,
+            det_groups={"slow": {"dets": [det], "period": 0.2}},
+        )
+    )
+    descriptors = {
+        doc["uid"]: doc["name"] for doc in run_engine_documents["descriptor"]
+    }
+    assert sorted(descriptors.values()) == ["primary", "slow"]
+    events: dict[str, list[dict]] = {"primary": [], "slow": []}
+    for event in run_engine_documents["event"]:
+        events[descriptors[event["descriptor"]]].append(event)
+    assert events["slow"] and events["primary"]
+    for event in events["slow"]:
+        assert "sim_stage_delay-x" in event["data"]
+
+
+@pytest.mark.parametrize("stream", ["primary", "sample_rate"])
+def test_fast_scan_1d_det_groups_reserved_name_fail(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+    stream: str,
+) -> None:
+    with pytest.raises(ValueError):
+        run_engine(
+            fast_scan_1d(
+                [det],
+                sim_motor.x,
+                5,
+                -1,
+                8.0,
+                det_groups={stream: {"dets": [det], "period": 0.1}},
+            )
+        )
+
+
+async def test_fast_scan_2d_det_groups_success(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    num_step = 3
+    run_engine(
+        fast_scan_grid(
+            [sim_motor.z],
+            sim_motor.x,
+            0,
+            2,
+            num_step,
+            sim_motor.y,
+            -5,
+            4,
+            10,
+            det_groups={"slow": {"dets": [det], "period": 1}},
+        ),
+    )
+    assert_emitted(
+        run_engine_documents, start=1, descriptor=2, event=num_step * 2, stop=1
+    )
+
+
+async def test_fast_scan_2d_turnaround_is_pipelined(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    num_step = 4
+    msgs: list[Msg] = []
+    run_engine.msg_hook = msgs.append  # type: ignore
+    run_engine(
+        fast_scan_grid(
+            [det], sim_motor.x, 0, 2, num_step, sim_motor.y, -5, 4, 1, snake_axes=True
+        ),
+    )
+    velocity_reads = [
+        msg
+        for msg in msgs
+        if msg.obj is sim_motor.y.velocity and msg.command in ("read", "locate")
+    ]
+    assert len(velocity_reads) == 1
+    step_sets = [msg for msg in msgs if msg.command == "set" and msg.obj is sim_motor.x]
+    run_ups = [
+        msg for msg in msgs if msg.command == "prepare" and msg.obj is sim_motor.y
+    ]
+    assert len(step_sets) == len(run_ups) == num_step
+    for step_set, run_up in zip(step_sets, run_ups, strict=True):
+        assert step_set.kwargs["group"] == run_up.kwargs["group"]
+
+
+@pytest.fixture
+async def sim_trajectory() -> SimTrajectoryController:
+    async with init_devices():
+        sim_trajectory = SimTrajectoryController(name="sim_trajectory")
+    return sim_trajectory
+
+
+@pytest.fixture
+async def triggered_det(
+    static_path_provider: StaticPathProvider,
+    sim_trajectory: SimTrajectoryController,
+) -> SimTriggeredDetector:
+    async with init_devices():
+        triggered_det = SimTriggeredDetector(
+            static_path_provider, sim_trajectory.frames_done, name="det"
+        )
+    return triggered_det
+
+
+@pytest.mark.parametrize("snake_axes", [True, False])
+async def test_fast_scan_2d_trajectory_success(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    sim_motor: XYZStage,
+    triggered_det: SimTriggeredDetector,
+    sim_trajectory: SimTrajectoryController,
+    snake_axes: bool,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    num_step = 3
+    num_points = 4
+    # Collect once, when the trajectory is done, so the documents are fixed.
+    monkeypatch.setattr(fast_scan, "TRAJECTORY_FLUSH_PERIOD", 60)
+    run_engine(
+        fast_scan_grid(
+            [triggered_det],
+            sim_motor.x,
+            0,
+            2,
+            num_step,
+            sim_motor.y,
+            -4,
+            4,
+            80,
+            snake_axes=snake_axes,
+            num_points=num_points,
+            trajectory=sim_trajectory,
+        ),
+    )
+    y_puts = [
+        call.args[0] for call in get_mock_put(sim_motor.y.user_setpoint).mock_calls
+    ]
+    line = [-3.0, -1.0, 1.0, 3.0]
+    reverse = line[::-1] if snake_axes else line
+    # Move to the first frame then one set per frame, no run-up between lines.
+    assert y_puts == [-3.0] + line + reverse + line
+    assert num_step * num_points == await sim_trajectory.frames_done.get_value()
+    # The trajectory never changes the motor velocity, so it is not put back.
+    assert not get_mock_put(sim_motor.y.velocity).called
+    # One datum per resource, each covering every frame of every line.
+    assert_emitted(
+        run_engine_documents,
+        start=1,
+        descriptor=1,
+        stream_resource=2,
+        stream_datum=2,
+        stop=1,
+    )
+    for datum in run_engine_documents["stream_datum"]:
+        assert datum["indices"] == {"start": 0, "stop": num_step * num_points}
+
+
+def test_fast_scan_2d_trajectory_fail_without_num_points(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    blob_det: SimBlobDetector,
+    sim_trajectory: SimTrajectoryController,
+) -> None:
+    with pytest.raises(ValueError, match="Trajectory scan requires num_points."):
+        run_engine(
+            fast_scan_grid(
+                [blob_det],
+                sim_motor.x,
+                0,
+                2,
+                3,
+                sim_motor.y,
+                -4,
+                4,
+                80,
+                trajectory=sim_trajectory,
+            ),
+        )
+
+
+async def test_fast_scan_2d_trajectory_kicks_off_detectors_first(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    triggered_det: SimTriggeredDetector,
+    sim_trajectory: SimTrajectoryController,
+) -> None:
+    msgs: list[Msg] = []
+    run_engine.msg_hook = msgs.append  # type: ignore
+    run_engine(
+        fast_scan_grid(
+            [triggered_det],
+            sim_motor.x,
+            0,
+            2,
+            3,
+            sim_motor.y,
+            -4,
+            4,
+            80,
+            num_points=4,
+            trajectory=sim_trajectory,
+        ),
+    )
+    prepares = [msg.args[0] for msg in msgs if msg.command == "prepare"]
+    assert prepares[0].trigger == DetectorTrigger.EXTERNAL_EDGE
+    assert prepares[0].number_of_events == 3 * 4
+    kickoffs = [msg.obj for msg in msgs if msg.command == "kickoff"]
+    assert kickoffs == [triggered_det, sim_trajectory]
+
+
+def test_fast_scan_2d_trajectory_fail_without_edge_trigger(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    blob_det: SimBlobDetector,
+    sim_trajectory: SimTrajectoryController,
+) -> None:
+    with pytest.raises(
+        ValueError, match="blob_det does not support EXTERNAL_EDGE triggers."
+    ):
+        run_engine(
+            fast_scan_grid(
+                [blob_det],
+                sim_motor.x,
+                0,
+                2,
+                3,
+                sim_motor.y,
+                -4,
+                4,
+                80,
+                num_points=4,
+                trajectory=sim_trajectory,
+            ),
+        )
+    assert 0 == get_mock_put(sim_motor.y.user_setpoint).call_count
+
+
+def test_fast_scan_2d_fail_run_down_beyond_limit(
+    run_engine: RunEngine,
+    sim_motor: XYZStage,
+    det: SimPointDetector,
+) -> None:
+    """The line ends inside the limits but the run-down does not, nothing moves."""
+    set_mock_value(sim_motor.y.acceleration_time, 0.5)
+    with pytest.raises(
+        ValueError, match="sim_motor-y trajectory point 3 position of 5.5"
+    ):
+        run_engine(fast_scan_grid([det], sim_motor.x, 0, 2, 3, sim_motor.y, -4, 4.5, 4))
+    assert 0 == get_mock_put(sim_motor.x.user_setpoint).call_count
+    assert 0 == get_mock_put(sim_motor.y.user_setpoint).call_count
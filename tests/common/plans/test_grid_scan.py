@@ -6,17 +6,22 @@ from bluesky.run_engine import RunEngine
 from dodal.devices.motors import XYZStage
 from dodal.devices.single_trigger_detector import SingleTriggerDetector
 from numpy import random
-from ophyd_async.core import set_mock_value
+from ophyd_async.core import StaticPathProvider, init_devices, set_mock_value
 from ophyd_async.epics.adandor import AndorDetector
 from ophyd_async.testing import assert_emitted
 
 from sm_bluesky.common.math_functions import step_size_to_step_num
 from sm_bluesky.common.plans.grid_scan import (
+    estimate_axis_points,
     estimate_speed_steps,
     grid_fast_scan,
     grid_step_scan,
 )
-from sm_bluesky.common.sim_devices import SimStage
+from sm_bluesky.common.sim_devices import (
+    SimStage,
+    SimTrajectoryController,
+    SimTriggeredDetector,
+)
 
 
 async def test_grid_fast_zero_velocity_fail(
@@ -129,7 +134,8 @@ async def test_grid_fast_with_too_little_time_grid_cannot_have_any_points(
     andor2: AndorDetector,
     sim_motor: XYZStage,
 ) -> None:
-    plan_time = 10
+    # Shorter than a single line at max velocity.
+    plan_time = 0.05
     count_time = 0.1
     step_start = 2.0
     step_end = 4
@@ -562,3 +568,150 @@ async def test_grid_fast_sim_flyable_motor(
         run_engine_documents["event"].__len__()
         == run_engine_documents["stream_datum"].__len__()
     )
+
+
+async def test_grid_fast_trajectory(
+    run_engine: RunEngine,
+    run_engine_documents: Mapping[str, list[dict]],
+    static_path_provider: StaticPathProvider,
+    sim_motor: XYZStage,
+) -> None:
+    async with init_devices():
+        trajectory = SimTrajectoryController(name="trajectory")
+        triggered_det = SimTriggeredDetector(
+            static_path_provider, trajectory.frames_done, name="det"
+        )
+    step_size = 0.5
+    step_start = -1
+    step_end = 0
+    num_of_step = step_size_to_step_num(step_start, step_end, step_size)
+    num_points = step_size_to_step_num(1, 3, step_size)
+
+    run_engine(
+        grid_fast_scan(
+            dets=[triggered_det],
+            count_time=0.01,
+            step_motor=sim_motor.x,
+            step_start=step_start,
+            step_end=step_end,
+            scan_motor=sim_motor.y,
+            scan_start=1,
+            scan_end=3,
+            plan_time=5,
+            step_size=step_size,
+            trajectory=trajectory,
+        ),
+    )
+    assert num_of_step * num_points == await trajectory.frames_done.get_value()
+    assert run_engine_documents["stream_datum"][-1]["indices"]["stop"] == (
+        num_of_step * num_points
+    )
+
+
+@pytest.mark.parametrize("snake_axes", [True, False])
+def test_estimate_axis_points_fills_plan_time(snake_axes: bool) -> None:
+    plan_time = 120
+    estimate = estimate_axis_points(
+        plan_time=plan_time,
+        deadtime=0.1,
+        step_range=2,
+        step_acceleration=0.1,
+        step_speed=1,
+        scan_range=3,
+        scan_acceleration=0.2,
+        scan_speed=2,
+        snake_axes=snake_axes,
+        scan_max_vel=10,
+    )
+    assert estimate["grid_time"] <= plan_time
+    # Same rounding of the line count as estimate_speed_steps.
+    assert estimate["step_points"] == round(estimate["points_per_unit_dist"] * 2)
+    # Within one extra line of filling the plan time.
+    assert estimate["grid_time"] > plan_time - 2 * estimate["line_time"]
+
+
+@pytest.mark.parametrize("plan_time, scan_points", [(10, 1000), (5, 500)])
+def test_estimate_axis_points_1d(plan_time: float, scan_points: int) -> None:
+    estimate = estimate_axis_points(
+        plan_time=plan_time,
+        deadtime=0.01,
+        step_range=0,
+        step_acceleration=0.1,
+        step_speed=1,
+        scan_range=5,
+        scan_acceleration=0.0,
+        scan_speed=2,
+        scan_max_vel=1,
+    )
+    assert estimate["step_points"] == 1
+    assert estimate["scan_points"] == scan_points
+    assert estimate["line_time"] == pytest.approx(plan_time)
+
+
+@pytest.mark.parametrize(
+    "deadtime, scan_range, plan_time",
+    [(0, 1, 10), (0.1, -1, 10), (0.1, 1, 0.5), (0.1, 20, 1.5)],
+)
+def test_estimate_axis_points_fail(
+    deadtime: float, scan_range: float, plan_time: float
+) -> None:
+    with pytest.raises(ValueError):
+        estimate_axis_points(
+            plan_time=plan_time,
+            deadtime=deadtime,
+            step_range=1,
+            step_acceleration=0.1,
+            step_speed=1,
+            scan_range=scan_range,
+            scan_acceleration=0.5,
+            scan_speed=1,
+            scan_max_vel=10,
+        )
+
+
+@pytest.mark.parametrize(
+    "step_range, points_per_unit_dist, step_points",
+    [(2, 4.75, 9), (0, 1.0, 1)],
+)
+def test_estimate_axis_points_zero_scan_range(
+    step_range: float, points_per_unit_dist: float, step_points: int
+) -> None:
+    # A line without scan range is a single point.
+    estimate = estimate_axis_points(
+        plan_time=1,
+        deadtime=0.1,
+        step_range=step_range,
+        step_acceleration=0.0,
+        step_speed=100,
+        scan_range=0,
+        scan_acceleration=0.0,
+        scan_speed=1,
+    )
+    assert estimate["points_per_unit_dist"] == pytest.approx(points_per_unit_dist)
+    assert estimate["step_points"] == step_points
+    assert estimate["grid_time"] <= 1
+
+
+def test_estimate_speed_steps_scan_points_from_given_step_size() -> None:
+    # The time estimate alone allows 2 points per line, which would run at
+    # scan_max_vel, the given step size needs 10 and so a slower speed.
+    deadtime = 0.01
+    scan_acceleration = 0.01
+    velocity, step_size = estimate_speed_steps(
+        plan_time=10,
+        deadtime=deadtime,
+        step_start=-2,
+        step_end=2,
+        step_size=0.1,
+        step_acceleration=0.01,
+        step_speed=88.88,
+        scan_start=1,
+        scan_end=2,
+        scan_acceleration=scan_acceleration,
+        scan_speed=88.88,
+        scan_max_vel=1,
+        snake_axes=True,
+        correction=1,
+    )
+    assert step_size == 0.1
+    assert velocity == pytest.approx(1 / (10 * deadtime + 2 * scan_acceleration))
@@ -0,0 +1,69 @@
+import pytest
+
+from sm_bluesky.common.server import (
+    BinaryFramer,
+    FrameTooLongError,
+    decode_request,
+    decode_response,
+    encode_request,
+    encode_response,
+)
+
+
+def _body(frame: bytes) -> bytes:
+    framer = BinaryFramer(buffer_size=256, max_frame_length=128)
+    framer.feed(frame)
+    (body,) = framer.frames()
+    return body
+
+
+def test_request_round_trip_keeps_types():
+    payload = b"AT+X\t\n\x00\xff"
+    frame = encode_request(2**32 - 1, b"pass_command", 5, -2.5, payload, True)
+    assert decode_request(_body(frame)) == (
+        2**32 - 1,
+        b"pass_command",
+        [5, -2.5, payload, 1],
+    )
+
+
+def test_response_round_trip():
+    frame = encode_response(3, False, b"bad\tthing\n")
+    assert decode_response(_body(frame)) == (3, False, b"bad\tthing\n")
+
+
+def test_encode_request_rejects_unknown_type():
+    with pytest.raises(TypeError, match="Cannot send str argument"):
+        encode_request(1, b"set_delay", "500")  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        (b"\x00\x00", "Truncated request frame"),
+        (b"\x00\x00\x00\x01\x09ping", "command beyond end of frame"),
+        (b"\x00\x00\x00\x01\x04pingi\x00", "Truncated request frame"),
+        (b"\x00\x00\x00\x01\x04pingb\x00\x00\x00\x09abc", "beyond end of frame"),
+        (b"\x00\x00\x00\x01\x04pingx", "Unknown argument type"),
+    ],
+)
+def test_decode_request_rejects_malformed(body: bytes, message: str):
+    with pytest.raises(ValueError, match=message):
+        decode_request(body)
+
+
+def test_binary_framer_splits_stream_byte_by_byte():
+    framer = BinaryFramer(buffer_size=64, max_frame_length=32)
+    stream = b"".join(encode_request(i, b"get_delay") for i in range(20))
+    bodies = []
+    for i in range(len(stream)):
+        framer.feed(stream[i : i + 1])
+        bodies.extend(framer.frames())
+    assert [decode_request(body)[0] for body in bodies] == list(range(20))
+
+
+def test_binary_framer_rejects_long_frame():
+    framer = BinaryFramer(buffer_size=64, max_frame_length=32)
+    framer.feed(encode_request(1, b"pass_command", b"x" * 32))
+    with pytest.raises(FrameTooLongError, match="longer than 32"):
+        list(framer.frames())
@@ -0,0 +1,47 @@
+import pytest
+
+from sm_bluesky.common.server import FakeSerial
+
+
+def test_fake_serial_answers_each_command_written():
+    port = FakeSerial({b"A?": b"1", b"B?": b"2\n"})
+    port.write(b"A?\r\nB")
+    assert port.readline() == b"1\n"
+    assert port.readline() == b""
+    port.write(b"?\r\n")
+    assert port.readline() == b"2\n"
+    assert port.written == [b"A?", b"B?"]
+
+
+def test_fake_serial_echoes_unknown_command():
+    port = FakeSerial(read_terminator=b">")
+    port.write(b"HELLO\r\n")
+    assert port.read_until(b">") == b"HELLO>"
+
+
+def test_fake_serial_reply_function_and_silence():
+    port = FakeSerial(lambda command: b"" if command == b"quiet" else command.upper())
+    port.write(b"quiet\r\nloud\r\n")
+    assert port.in_waiting == len(b"LOUD\n")
+    assert port.readline() == b"LOUD\n"
+
+
+def test_fake_serial_read_returns_partial_line_at_timeout():
+    port = FakeSerial({b"X": b"1\n2"}, read_terminator=b"\n\n")
+    port.write(b"X\r\n")
+    assert port.readline() == b"1\n"
+    assert port.read_until(b"\n\n") == b"2\n\n"
+
+
+def test_fake_serial_reset_and_close():
+    port = FakeSerial()
+    port.write(b"pending")
+    port.write(b"X\r\n")
+    port.reset_input_buffer()
+    port.reset_output_buffer()
+    assert port.in_waiting == 0
+    port.write(b"Y\r\n")
+    assert port.written[-1] == b"Y"
+    port.close()
+    with pytest.raises(OSError, match="is closed"):
+        port.readline()
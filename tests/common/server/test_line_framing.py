@@ -0,0 +1,56 @@
+import pytest
+
+from sm_bluesky.common.server import LineFramer, LineTooLongError
+
+
+def test_line_framer_joins_lines_split_across_chunks():
+    framer = LineFramer(buffer_size=64, max_line_length=16)
+    lines = []
+    for chunk in [b"pi", b"ng\n\r\nset_", b"delay\t5", b"00\r\nget", b"_delay\n"]:
+        framer.feed(chunk)
+        lines.extend(framer.lines())
+    assert lines == [b"ping", b"set_delay\t500", b"get_delay"]
+    assert framer.pending == 0
+
+
+def test_line_framer_reuses_buffer_for_long_streams():
+    framer = LineFramer(buffer_size=32, max_line_length=12)
+    lines = []
+    for i in range(1000):
+        framer.feed(b"cmd\t%d\ncmd" % i)
+        lines.extend(framer.lines())
+        framer.feed(b"\n")
+        lines.extend(framer.lines())
+    assert lines == [x for i in range(1000) for x in (b"cmd\t%d" % i, b"cmd")]
+
+
+def test_line_framer_drops_unfinished_long_line_once():
+    framer = LineFramer(buffer_size=32, max_line_length=8)
+    framer.feed(b"ping\n0123456789")
+    lines = framer.lines()
+    assert next(lines) == b"ping"
+    with pytest.raises(LineTooLongError, match="Line longer than 8 bytes dropped"):
+        next(lines)
+    framer.feed(b"0123456789")
+    assert list(framer.lines()) == []
+    framer.feed(b"tail\nping\n")
+    assert list(framer.lines()) == [b"ping"]
+
+
+def test_line_framer_drops_complete_long_line():
+    framer = LineFramer(buffer_size=32, max_line_length=8)
+    framer.feed(b"0123456789\nping\n")
+    with pytest.raises(LineTooLongError):
+        list(framer.lines())
+    assert list(framer.lines()) == [b"ping"]
+
+
+def test_line_framer_rejects_max_line_not_below_buffer():
+    with pytest.raises(ValueError, match="must be positive and less than buffer_size"):
+        LineFramer(buffer_size=16, max_line_length=16)
+
+
+def test_line_framer_feed_beyond_room():
+    framer = LineFramer(buffer_size=16, max_line_length=8)
+    with pytest.raises(ValueError, match="do not fit"):
+        framer.feed(b"x" * 17)
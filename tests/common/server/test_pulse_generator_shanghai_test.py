@@ -13,7 +13,7 @@ from sm_bluesky.common.server import GeneratorServerShanghaiTech
 def mock_serial():
     """Patches Serial and returns the class mock."""
     with patch(
-        "sm_bluesky.common.server.pulse_generator_shanghai_tech.Serial", spec=True
+        "sm_bluesky.common.server.serial_instrument_server.Serial", spec=True
     ) as mock_serial:
         yield mock_serial
 
@@ -25,7 +25,8 @@ def mock_server(mock_serial: Serial):
         host="localhost", port=8888, usb_port="COM4", baud_rate=9600, timeout=1.0
     )
     mock_server.device = mock_serial
-    return mock_server
+    yield mock_server
+    mock_server._serial.stop()
 
 
 def test_connect_hardware_success(mock_server: GeneratorServerShanghaiTech):
@@ -36,7 +37,7 @@ def test_connect_hardware_failure(
     mock_server: GeneratorServerShanghaiTech, caplog: pytest.LogCaptureFixture
 ):
     with patch(
-        "sm_bluesky.common.server.pulse_generator_shanghai_tech.Serial"
+        "sm_bluesky.common.server.serial_instrument_server.Serial"
     ) as mock_serial_class:
         error_message = "Connection failed"
         mock_serial_class.side_effect = Exception(error_message)
@@ -98,11 +99,18 @@ def test_set_delay_success(
     with patch.object(mock_server, "device") as mock_device:
         mock_device.readline.return_value = mock_respond
         mock_server._send_response = MagicMock()
-        mock_server._set_delay(b"500")
+        mock_server._handle_command(b"set_delay", b"500")
         mock_server._send_response.assert_called_once_with(mock_respond)
         mock_device.readline.assert_called_once()
 
 
+def test_set_delay_accepts_binary_int(mock_server: GeneratorServerShanghaiTech):
+    with patch.object(mock_server, "device") as mock_device:
+        mock_device.readline.return_value = b"OK"
+        assert mock_server._call_command(b"set_delay", [500])
+    mock_device.write.assert_called_once_with(b"AT+DLSET=500\r\n")
+
+
 def test_set_delay_failed(mock_server: GeneratorServerShanghaiTech) -> None:
     with patch.object(mock_server, "device") as mock_device:
         mock_device.write.side_effect = Exception("Write_failed")
@@ -132,7 +140,7 @@ def test_get_delay_success(mock_server: GeneratorServerShanghaiTech) -> None:
     with patch.object(mock_server, "device") as mock_device:
         mock_device.readline.return_value = test_reading
         mock_server._send_response = MagicMock()
-        mock_server._get_delay()
+        mock_server._handle_command(b"get_delay", b"")
     mock_device.write.assert_called_once_with(b"AT+DLSET=?\r\n")
     mock_server._send_response.assert_called_once_with(test_reading)
 
@@ -184,7 +192,7 @@ def test_passthrough_success(mock_server: GeneratorServerShanghaiTech):
         mock_server._send_response = MagicMock()
         mock_server.device = mock_device
         mock_server.device.readline.return_value = multi_line_responds
-        mock_server._passthrough(command)
+        mock_server._handle_command(b"pass_command", command)
         mock_server.device.write.assert_called_once_with(command + b"\r\n")
         mock_server._send_response.assert_called_once_with(multi_line_responds)
 
@@ -208,10 +216,68 @@ def test_send_hardware_command_fail_no_device(mock_server: GeneratorServerShangh
         mock_server._send_hardware_command(cmd=b"some command")
 
 
+def test_serial_exchange_runs_on_worker_thread(
+    mock_server: GeneratorServerShanghaiTech,
+):
+    threads = []
+    with patch.object(mock_server, "device") as mock_device:
+        mock_device.write.side_effect = lambda _: threads.append(
+            threading.current_thread().name
+        )
+        mock_device.readline.return_value = b"OK"
+        mock_server._handle_command(b"set_delay", b"5")
+        mock_server._handle_command(b"reset_serial_buffer", b"")
+    assert threads == ["serial COM4"]
+    mock_device.reset_input_buffer.assert_called_once()
+
+
+def test_get_delay_cached_until_next_command(
+    mock_server: GeneratorServerShanghaiTech,
+):
+    with patch.object(mock_server, "device") as mock_device:
+        mock_device.readline.side_effect = [b"DL=5", b"set", b"DL=6"]
+        mock_server._send_response = MagicMock()
+        for cmd, args in [
+            (b"get_delay", b""),
+            (b"get_delay", b""),
+            (b"set_delay", b"6"),
+            (b"get_delay", b""),
+            (b"get_delay", b""),
+        ]:
+            assert mock_server._handle_command(cmd, args)
+    assert [c.args[0] for c in mock_server._send_response.call_args_list] == [
+        b"DL=5",
+        b"DL=5",
+        b"set",
+        b"DL=6",
+        b"DL=6",
+    ]
+    assert mock_device.readline.call_count == 3
+
+
+def test_hardware_command_times_out_at_deadline(
+    mock_server: GeneratorServerShanghaiTech,
+):
+    release = threading.Event()
+    mock_server._timeout_seconds = 0.1
+    mock_server._send_error = MagicMock()
+    with patch.object(mock_server, "device") as mock_device:
+        mock_device.readline.side_effect = lambda: release.wait(5) and b"late"
+        start = time.time()
+        assert not mock_server._handle_command(b"get_delay", b"")
+        assert time.time() - start < 1
+        release.set()
+    mock_server._send_error.assert_called_once_with(
+        "Error handling command: get_delay - hardware not responding:"
+        " serial COM4 did not answer before the deadline"
+    )
+    assert mock_server._response_cache == {}
+
+
 @pytest.fixture
 def running_server():
     with patch(
-        "sm_bluesky.common.server.pulse_generator_shanghai_tech.Serial"
+        "sm_bluesky.common.server.serial_instrument_server.Serial"
     ) as mock_serial_class:
         mock_device = MagicMock()
         mock_serial_class.return_value = mock_device
@@ -0,0 +1,246 @@
+import socket
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from sm_bluesky.common.server import (
+    FakeSerial,
+    SerialArgument,
+    SerialCommand,
+    SerialInstrumentServer,
+)
+
+
+class PowerSupply:
+    """Instrument behind the fake port, answers with \\r ended lines."""
+
+    def __init__(self) -> None:
+        self.voltage = 0.0
+
+    def __call__(self, command: bytes) -> bytes | None:
+        if command.startswith(b"VSET "):
+            self.voltage = float(command.removeprefix(b"VSET "))
+            return b"OK"
+        if command == b"VSET?":
+            return b"V=%.3f" % self.voltage
+        if command == b"STATUS?":
+            return b"VOLT=%.3f\rMODE=CV\rEND" % self.voltage
+        if command == b"IDN?":
+            return b"FAKE\rPSU"
+        if command == b"*RST":
+            self.voltage = 0.0
+            return b""
+        if command == b"SLEEP":
+            return b""
+        return None
+
+
+@pytest.fixture
+def instrument() -> PowerSupply:
+    return PowerSupply()
+
+
+@pytest.fixture
+def port(instrument: PowerSupply) -> FakeSerial:
+    return FakeSerial(instrument, write_terminator=b"\r", read_terminator=b"\r")
+
+
+@pytest.fixture
+def server(port: FakeSerial):
+    server = SerialInstrumentServer(
+        host="127.0.0.1",
+        port=0,
+        usb_port="fake",
+        commands=[
+            SerialCommand(
+                b"set_voltage",
+                b"VSET %.3f",
+                [SerialArgument("voltage", float, 0, 30)],
+            ),
+            SerialCommand(
+                b"get_voltage",
+                b"VSET?",
+                parse=lambda lines: lines[0].removeprefix(b"V="),
+                cacheable=True,
+            ),
+            SerialCommand(b"status", b"STATUS?", reply_lines=b"END"),
+            SerialCommand(b"identify", b"IDN?", reply_lines=2),
+            SerialCommand(b"reset", b"*RST", reply_lines=0),
+            SerialCommand(b"sleep", b"SLEEP"),
+        ],
+        write_terminator=b"\r",
+        read_terminator=b"\r",
+        serial_factory=lambda **kwargs: port,
+    )
+    assert server.connect_hardware()
+    server._send_response = MagicMock()
+    server._send_error = MagicMock()
+    yield server
+    server._serial.stop()
+
+
+def _responses(server: SerialInstrumentServer) -> list[bytes]:
+    send_response = server._send_response
+    assert isinstance(send_response, MagicMock)
+    return [call.args[0] for call in send_response.call_args_list]
+
+
+def _errors(server: SerialInstrumentServer) -> list[str]:
+    send_error = server._send_error
+    assert isinstance(send_error, MagicMock)
+    return [call.args[0] for call in send_error.call_args_list]
+
+
+def test_serial_commands_exchange_with_instrument(
+    server: SerialInstrumentServer, port: FakeSerial, instrument: PowerSupply
+):
+    assert server._handle_command(b"set_voltage", b"12.5")
+    assert server._handle_command(b"get_voltage", b"")
+    assert server._handle_command(b"identify", b"")
+    assert server._handle_command(b"reset", b"")
+    assert port.written == [b"VSET 12.500", b"VSET?", b"IDN?", b"*RST"]
+    assert _responses(server) == [b"OK", b"12.500", b"FAKE\tPSU", b""]
+    assert instrument.voltage == 0.0
+
+
+def test_serial_command_reads_until_end_line(server: SerialInstrumentServer):
+    assert server._handle_command(b"status", b"")
+    assert _responses(server) == [b"VOLT=0.000\tMODE=CV"]
+    assert server._handle_command(b"ping", b"")
+
+
+def test_serial_command_cached_until_uncacheable_command(
+    server: SerialInstrumentServer, port: FakeSerial
+):
+    for cmd, args in [
+        (b"get_voltage", b""),
+        (b"get_voltage", b""),
+        (b"set_voltage", b"3"),
+        (b"get_voltage", b""),
+    ]:
+        assert server._handle_command(cmd, args)
+    assert _responses(server) == [b"0.000", b"0.000", b"OK", b"3.000"]
+    assert port.written.count(b"VSET?") == 2
+
+
+def test_cached_response_expires_after_ttl(
+    server: SerialInstrumentServer, port: FakeSerial, monkeypatch: pytest.MonkeyPatch
+):
+    now = 100.0
+    monkeypatch.setattr(
+        "sm_bluesky.common.server.serial_instrument_server.monotonic", lambda: now
+    )
+    assert server._handle_command(b"get_voltage", b"")
+    now += server.cache_ttl / 2
+    assert server._handle_command(b"get_voltage", b"")
+    assert port.written.count(b"VSET?") == 1
+    now += server.cache_ttl
+    assert server._handle_command(b"get_voltage", b"")
+    assert port.written.count(b"VSET?") == 2
+
+
+def test_clear_cache_command(server: SerialInstrumentServer, port: FakeSerial):
+    for cmd in [b"get_voltage", b"clear_cache", b"get_voltage"]:
+        assert server._handle_command(cmd, b"")
+    assert _responses(server) == [b"0.000", b"Cache cleared", b"0.000"]
+    assert port.written.count(b"VSET?") == 2
+
+
+def test_serial_command_takes_binary_arguments(
+    server: SerialInstrumentServer, port: FakeSerial
+):
+    assert server._call_command(b"set_voltage", [7])
+    assert port.written == [b"VSET 7.000"]
+
+
+@pytest.mark.parametrize(
+    "args, error",
+    [
+        (b"31", "Voltage 31.0 is out of bounds (0-30)"),
+        (b"-1", "Voltage -1.0 is out of bounds (0-30)"),
+        (b"high", "Voltage b'high' is not a float"),
+        (b"1\t2", "set_voltage takes 1 arguments, got 2"),
+    ],
+)
+def test_serial_command_rejects_bad_arguments(
+    server: SerialInstrumentServer, port: FakeSerial, args: bytes, error: str
+):
+    assert not server._handle_command(b"set_voltage", args)
+    assert _errors(server) == [f"Error handling command 'set_voltage': {error}"]
+    assert port.written == []
+
+
+def test_silent_instrument_reported_as_not_responding(
+    server: SerialInstrumentServer,
+):
+    assert not server._handle_command(b"sleep", b"")
+    assert _errors(server) == [
+        "Error handling command: sleep - hardware not responding:"
+        " No reply to b'SLEEP' from fake"
+    ]
+
+
+def test_pass_command_and_reset_serial_buffer(
+    server: SerialInstrumentServer, port: FakeSerial
+):
+    assert server._handle_command(b"pass_command", b"VSET?")
+    assert _responses(server) == [b"V=0.000"]
+    port.write(b"IDN?\r")
+    assert port.in_waiting
+    assert server._handle_command(b"reset_serial_buffer", b"")
+    assert port.in_waiting == 0
+
+
+def test_add_serial_command_replaces_definition(
+    server: SerialInstrumentServer, port: FakeSerial
+):
+    server.add_serial_command(SerialCommand(b"reset", b"*RST", reply_lines=1))
+    assert server.serial_commands[b"reset"].reply_lines == 1
+    assert not server._handle_command(b"reset", b"")
+    assert port.written == [b"*RST"]
+
+
+def test_disconnect_closes_port(server: SerialInstrumentServer, port: FakeSerial):
+    server.disconnect_hardware()
+    assert not port.is_open
+    assert server.device is None
+    assert not server._serial.is_alive
+
+
+def test_serial_instrument_over_tcp(port: FakeSerial):
+    server = SerialInstrumentServer(
+        host="127.0.0.1",
+        port=0,
+        usb_port="fake",
+        commands=[
+            SerialCommand(
+                b"set_voltage", b"VSET %g", [SerialArgument("voltage", float, 0)]
+            ),
+            SerialCommand(b"status", b"STATUS?", reply_lines=b"END"),
+        ],
+        write_terminator=b"\r",
+        read_terminator=b"\r",
+        serial_factory=lambda **kwargs: port,
+    )
+    thread = threading.Thread(target=server.start_concurrent, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server._is_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        with socket.create_connection(("127.0.0.1", server.port), timeout=5) as client:
+            client.sendall(b"#1\tset_voltage\t2.5\n#2\tstatus\n#3\tset_voltage\t-1\n")
+            received = b""
+            while received.count(b"\n") < 3:
+                received += client.recv(1024)
+    finally:
+        server.stop()
+        thread.join(5)
+    assert received.splitlines() == [
+        b"#1\t1\tOK",
+        b"#2\t1\tVOLT=2.500\tMODE=CV",
+        b"#3\t0\tError handling command 'set_voltage': Voltage -1.0 is out of bounds"
+        b" (at least 0)",
+    ]
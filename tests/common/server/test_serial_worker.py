@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from sm_bluesky.common.server import SerialWorker
+
+
+@pytest.fixture
+def worker():
+    worker = SerialWorker(name="test worker")
+    yield worker
+    worker.stop()
+
+
+def test_serial_worker_runs_in_queue_order(worker: SerialWorker):
+    order = []
+    futures = [worker.submit(lambda i=i: order.append(i) or i) for i in range(5)]
+    assert [future.result(1) for future in futures] == list(range(5))
+    assert order == list(range(5))
+
+
+def test_serial_worker_raises_function_error(worker: SerialWorker):
+    def fail():
+        raise OSError("port gone")
+
+    with pytest.raises(OSError, match="port gone"):
+        worker.call(fail)
+
+
+def test_serial_worker_skips_request_past_deadline(worker: SerialWorker):
+    release = threading.Event()
+    worker.submit(lambda: release.wait(5))
+    skipped = []
+    with pytest.raises(TimeoutError, match="test worker did not answer"):
+        worker.call(lambda: skipped.append(1), time.time() + 0.05)
+    release.set()
+    assert worker.call(lambda: "next") == "next"
+    assert skipped == []
+
+
+def test_serial_worker_restarts_after_stop(worker: SerialWorker):
+    first = worker.call(threading.current_thread)
+    worker.stop()
+    assert not worker.is_alive
+    second = worker.call(threading.current_thread)
+    assert first is not second
+    assert not first.is_alive()
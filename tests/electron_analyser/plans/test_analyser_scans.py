@@ -12,6 +12,7 @@ from dodal.devices.electron_analyser.base import (
 )
 from ophyd_async.sim import SimMotor
 
+from sm_bluesky.common.helper import estimate_duration
 from sm_bluesky.electron_analyser.plans.analyser_scans import (
     analysercount,
     analyserscan,
@@ -207,3 +208,19 @@ async def test_grid_analyserscan(
         motors,
         motor_iterations,
     )
+
+
+async def test_analyserscan_estimate(
+    sim_analyser: GenericElectronAnalyserDetector, sequence: BaseSequence
+) -> None:
+    motor = SimMotor("motor1")
+    await motor.velocity.set(10)
+    estimate = await estimate_duration(
+        analyserscan(sim_analyser, sequence, [], [motor, -10, 10], num=3)
+    )
+    assert estimate["finished"]
+    # Three 10 mm moves with 0.5 s acceleration, one event per region per step.
+    assert estimate["moves"] == pytest.approx(3 * 1.5)
+    regions = len(sequence.get_enabled_regions())
+    assert estimate["readout"] == pytest.approx(3 * regions * 0.001)
+    assert 0 == await motor.user_readback.get_value()